@@ -0,0 +1,254 @@
+"""
+Benchmark the report procedures: cursor loops vs. set-based queries
+
+Cursor versions: the original generate_low_stock_report, calculate_monthly_sales
+                 and batch_update_prices_by_category (explicit cursor, FETCH and
+                 RETURN NEXT per row, one UPDATE per product), recreated as
+                 temporary functions for the comparison
+Set-based:       the current versions in database_schema.sql (RETURN QUERY,
+                 a single UPDATE ... RETURNING)
+
+A synthetic catalog and order history (100,000 products and 1,000,000 order
+items by default) is generated inside a transaction that is rolled back at
+the end, so nothing is left behind. The transaction disables the per-row
+inventory trigger on orders_orderitem while it loads the items, which locks
+that table until the benchmark finishes: run it against a development
+database. Deploy database_schema.sql first.
+
+Usage: python benchmark_report_procedures.py [products] [order_items] [runs]
+"""
+
+import os
+import sys
+import time
+import django
+from statistics import median
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'mediguide.settings')
+django.setup()
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+
+# Month the synthetic orders are placed in
+SALES_MONTH, SALES_YEAR = 1, 2020
+ITEMS_PER_ORDER = 5
+
+CURSOR_PROCEDURES = """
+CREATE FUNCTION pg_temp.cursor_low_stock_report()
+RETURNS TABLE (
+    product_id INTEGER,
+    product_name VARCHAR(200),
+    current_stock INTEGER,
+    threshold INTEGER,
+    category_name VARCHAR(100)
+) AS $$
+DECLARE
+    product_cursor CURSOR FOR
+        SELECT p.id, p.name, p.stock_quantity, p.low_stock_threshold, c.name
+        FROM products_product p
+        JOIN products_category c ON p.category_id = c.id
+        WHERE p.stock_quantity <= p.low_stock_threshold
+        AND p.is_active = TRUE
+        ORDER BY p.stock_quantity ASC;
+    product_record RECORD;
+BEGIN
+    OPEN product_cursor;
+    LOOP
+        FETCH product_cursor INTO product_record;
+        EXIT WHEN NOT FOUND;
+        product_id := product_record.id;
+        product_name := product_record.name;
+        current_stock := product_record.stock_quantity;
+        threshold := product_record.low_stock_threshold;
+        category_name := product_record.name;
+        RETURN NEXT;
+    END LOOP;
+    CLOSE product_cursor;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pg_temp.cursor_monthly_sales(target_month INTEGER, target_year INTEGER)
+RETURNS TABLE (
+    product_id INTEGER,
+    product_name VARCHAR(200),
+    total_quantity INTEGER,
+    total_revenue DECIMAL(10, 2)
+) AS $$
+DECLARE
+    sales_cursor CURSOR FOR
+        SELECT p.id, p.name, SUM(oi.quantity) as qty, SUM(oi.subtotal) as revenue
+        FROM products_product p
+        JOIN orders_orderitem oi ON p.id = oi.product_id
+        JOIN orders_order o ON oi.order_id = o.id
+        WHERE EXTRACT(MONTH FROM o.created_at) = target_month
+        AND EXTRACT(YEAR FROM o.created_at) = target_year
+        AND o.status != 'cancelled'
+        GROUP BY p.id, p.name
+        ORDER BY revenue DESC;
+    sales_record RECORD;
+BEGIN
+    OPEN sales_cursor;
+    LOOP
+        FETCH sales_cursor INTO sales_record;
+        EXIT WHEN NOT FOUND;
+        product_id := sales_record.id;
+        product_name := sales_record.name;
+        total_quantity := sales_record.qty;
+        total_revenue := sales_record.revenue;
+        RETURN NEXT;
+    END LOOP;
+    CLOSE sales_cursor;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION pg_temp.cursor_update_prices(target_category_id INTEGER, percentage_change DECIMAL(5, 2))
+RETURNS INTEGER AS $$
+DECLARE
+    product_cursor CURSOR FOR
+        SELECT id, price FROM products_product
+        WHERE category_id = target_category_id AND is_active = TRUE;
+    product_record RECORD;
+    updated_count INTEGER := 0;
+    new_price DECIMAL(10, 2);
+BEGIN
+    OPEN product_cursor;
+    LOOP
+        FETCH product_cursor INTO product_record;
+        EXIT WHEN NOT FOUND;
+        new_price := product_record.price * (1 + percentage_change / 100);
+        UPDATE products_product SET price = new_price WHERE id = product_record.id;
+        updated_count := updated_count + 1;
+    END LOOP;
+    CLOSE product_cursor;
+    RETURN updated_count;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Rollback(Exception):
+    pass
+
+
+def print_section(title):
+    """Print a formatted section header"""
+    print("\n" + "=" * 70)
+    print(f"  {title}")
+    print("=" * 70)
+
+
+def seed(cursor, user_id, product_count, item_count):
+    """Load the synthetic catalog and orders; returns the benchmark category id"""
+    cursor.execute("""
+        INSERT INTO products_category (name, description, created_at, updated_at)
+        VALUES ('Benchmark category', '', NOW(), NOW())
+        RETURNING id
+    """)
+    category_id = cursor.fetchone()[0]
+
+    # About one product in nine is at or below its low stock threshold
+    cursor.execute("""
+        INSERT INTO products_product (
+            name, description, price, stock_quantity, low_stock_threshold, manufacturer, dosage,
+            requires_prescription, image, is_active, created_at, updated_at, category_id,
+            ingredients, recommended_usage, content_hash
+        )
+        SELECT 'Benchmark product ' || g, '', 1 + g %% 50, g %% 90, 10, '', '',
+               FALSE, '', TRUE, NOW(), NOW(), %s, '', '', ''
+        FROM generate_series(1, %s) g
+        RETURNING id
+    """, [category_id, product_count])
+    product_ids = [row[0] for row in cursor.fetchall()]
+
+    order_count = -(-item_count // ITEMS_PER_ORDER)
+    cursor.execute("""
+        INSERT INTO orders_order (
+            user_id, status, shipping_name, shipping_address, shipping_city, shipping_state,
+            shipping_zip, shipping_phone, payment_intent_id, subtotal, tax, shipping_cost, total,
+            notes, created_at, updated_at
+        )
+        SELECT %s, CASE WHEN g %% 20 = 0 THEN 'cancelled' ELSE 'delivered' END,
+               'Benchmark', '1 Benchmark St', 'Test City', 'TS', '12345', '1234567890', '',
+               0, 0, 5, 5, '', make_date(%s, %s, 1) + (g %% 28) * INTERVAL '1 day', NOW()
+        FROM generate_series(1, %s) g
+        RETURNING id
+    """, [user_id, SALES_YEAR, SALES_MONTH, order_count])
+    order_ids = [row[0] for row in cursor.fetchall()]
+
+    # Stock is not the point here; skip the per-row inventory trigger
+    cursor.execute("ALTER TABLE orders_orderitem DISABLE TRIGGER trigger_update_inventory")
+    cursor.execute("""
+        INSERT INTO orders_orderitem (order_id, product_id, quantity, price, subtotal, created_at)
+        SELECT o.ids[1 + g / %s], p.ids[1 + (g::bigint * 7919) %% %s], 1 + g %% 3, 4.99, 4.99 * (1 + g %% 3), NOW()
+        FROM generate_series(0, %s - 1) g,
+             (SELECT %s::bigint[] AS ids) o,
+             (SELECT %s::bigint[] AS ids) p
+    """, [ITEMS_PER_ORDER, product_count, item_count, order_ids, product_ids])
+
+    for table in ('products_product', 'orders_order', 'orders_orderitem'):
+        cursor.execute(f"ANALYZE {table}")
+    return category_id
+
+
+def measure(cursor, sql, params, runs):
+    """Median ms over runs; every run is rolled back to a savepoint"""
+    timings = []
+    for _ in range(runs):
+        try:
+            with transaction.atomic():
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append((time.perf_counter() - started) * 1000)
+                raise Rollback
+        except Rollback:
+            pass
+    return median(timings)
+
+
+def main():
+    product_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    item_count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    runs = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print_section(f"Report procedures: {product_count:,} products, {item_count:,} order items, {runs} runs each")
+
+    user, _ = User.objects.get_or_create(
+        username='benchmark_report_user',
+        defaults={'email': 'benchmark@example.com'}
+    )
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            started = time.perf_counter()
+            category_id = seed(cursor, user.id, product_count, item_count)
+            cursor.execute(CURSOR_PROCEDURES)
+            print(f"🧪 Synthetic data loaded in {time.perf_counter() - started:.1f}s (rolled back at the end)")
+
+            cases = [
+                ('Low stock report',
+                 'SELECT * FROM pg_temp.cursor_low_stock_report()', [],
+                 'SELECT * FROM generate_low_stock_report()', []),
+                ('Monthly sales',
+                 'SELECT * FROM pg_temp.cursor_monthly_sales(%s, %s)', [SALES_MONTH, SALES_YEAR],
+                 'SELECT * FROM calculate_monthly_sales(%s, %s)', [SALES_MONTH, SALES_YEAR]),
+                ('Batch price update',
+                 'SELECT pg_temp.cursor_update_prices(%s, 10.0)', [category_id],
+                 'SELECT batch_update_prices_by_category(%s, 10.0)', [category_id]),
+            ]
+            for title, cursor_sql, cursor_params, set_sql, set_params in cases:
+                cursor_ms = measure(cursor, cursor_sql, cursor_params, runs)
+                set_ms = measure(cursor, set_sql, set_params, runs)
+                print(f"\n📊 {title}")
+                print(f"   🐢 Cursor loop: {cursor_ms:10.1f} ms")
+                print(f"   ⚡ Set-based:   {set_ms:10.1f} ms  ({cursor_ms / set_ms:.1f}x)")
+            raise Rollback
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,15 @@
 -- ============================================
 
 -- 1. Trigger: Auto-update inventory when order is placed
+-- Orders placed through the API decrement stock for all lines in one statement
+-- (orders/inventory.py) and mark themselves in mediguide.stock_applied_order
 CREATE OR REPLACE FUNCTION update_inventory_on_order()
 RETURNS TRIGGER AS $$
 BEGIN
+    IF current_setting('mediguide.stock_applied_order', true) = NEW.order_id::text THEN
+        RETURN NEW;
+    END IF;
+    
     -- Decrease product stock when order item is created
     UPDATE products_product
     SET stock_quantity = stock_quantity - NEW.quantity
@@ -34,26 +40,44 @@ CREATE TRIGGER trigger_update_inventory
 
 
 -- 2. Trigger: Restore inventory when order is cancelled
+-- Statement-level with transition tables: however many orders one UPDATE
+-- cancels (see orders/transitions.py), their lines are summed per product and
+-- stock is restored by a single UPDATE. Transition tables cannot be combined
+-- with UPDATE OF status, so updates that leave the status alone find nothing
+-- to restore.
 CREATE OR REPLACE FUNCTION restore_inventory_on_cancel()
 RETURNS TRIGGER AS $$
 BEGIN
-    -- Only restore if status changed to 'cancelled'
-    IF NEW.status = 'cancelled' AND OLD.status != 'cancelled' THEN
-        -- Restore stock for all items in the order
-        UPDATE products_product p
-        SET stock_quantity = stock_quantity + oi.quantity
-        FROM orders_orderitem oi
-        WHERE oi.order_id = NEW.id AND p.id = oi.product_id;
-    END IF;
+    WITH restored AS (
+        -- Only orders whose status actually became 'cancelled' in this statement
+        SELECT oi.product_id, SUM(oi.quantity) AS quantity
+        FROM new_orders n
+        JOIN old_orders o ON o.id = n.id
+        JOIN orders_orderitem oi ON oi.order_id = n.id
+        WHERE n.status = 'cancelled' AND o.status IS DISTINCT FROM 'cancelled'
+        GROUP BY oi.product_id
+    ),
+    locked AS (
+        -- Lock in id order, like checkouts do, so the two cannot deadlock
+        SELECT p.id FROM products_product p
+        JOIN restored r ON r.product_id = p.id
+        ORDER BY p.id
+        FOR UPDATE OF p
+    )
+    UPDATE products_product p
+    SET stock_quantity = p.stock_quantity + r.quantity
+    FROM restored r, locked l
+    WHERE p.id = r.product_id AND l.id = p.id;
     
-    RETURN NEW;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 DROP TRIGGER IF EXISTS trigger_restore_inventory ON orders_order;
 CREATE TRIGGER trigger_restore_inventory
     AFTER UPDATE ON orders_order
-    FOR EACH ROW
+    REFERENCING OLD TABLE AS old_orders NEW TABLE AS new_orders
+    FOR EACH STATEMENT
     EXECUTE FUNCTION restore_inventory_on_cancel();
 
 
@@ -85,11 +109,164 @@ CREATE TRIGGER trigger_log_price_change
     EXECUTE FUNCTION log_price_change();
 
 
+-- 4. Trigger: Maintain the weighted full-text search vector of products
+-- Weights must match SEARCH_FIELD_WEIGHTS in products/search.py
+CREATE OR REPLACE FUNCTION update_product_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.manufacturer, '')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.ingredients, '')), 'C') ||
+        setweight(to_tsvector('english', COALESCE(NEW.description, '')), 'D');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_product_search_vector ON products_product;
+CREATE TRIGGER trigger_update_product_search_vector
+    BEFORE INSERT OR UPDATE OF name, manufacturer, ingredients, description ON products_product
+    FOR EACH ROW
+    EXECUTE FUNCTION update_product_search_vector();
+
+-- Backfill existing rows after deploying: python manage.py reindex_search
+
+
+-- 5. Triggers: Daily sales rollup
+-- reports_dailyproductsales (reports/models.py) holds units and revenue per
+-- product per UTC day for orders that are not cancelled, so sales reports
+-- read one row per product and day instead of every order line. Both
+-- triggers are statement-level and apply the net change of the whole
+-- statement with one upsert (rows in product order, to avoid deadlocks).
+-- Rebuild or backfill any range with: python manage.py rebuild_sales_rollup
+CREATE OR REPLACE FUNCTION apply_item_sales_rollup()
+RETURNS TRIGGER AS $$
+DECLARE
+    delta_query TEXT;
+BEGIN
+    -- Archiving moves lines to the archive; they stay counted
+    IF TG_OP = 'DELETE' AND current_setting('mediguide.archiving_orders', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    
+    -- Each event only has its own transition tables
+    delta_query := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT order_id, product_id, quantity, subtotal FROM new_items'
+        WHEN 'DELETE' THEN 'SELECT order_id, product_id, -quantity, -subtotal FROM old_items'
+        ELSE 'SELECT order_id, product_id, quantity, subtotal FROM new_items
+              UNION ALL
+              SELECT order_id, product_id, -quantity, -subtotal FROM old_items'
+    END;
+    
+    EXECUTE format($sql$
+        INSERT INTO reports_dailyproductsales AS r (day, product_id, quantity, revenue)
+        SELECT (o.created_at AT TIME ZONE 'UTC')::date, d.product_id, SUM(d.quantity), SUM(d.subtotal)
+        FROM (%s) d (order_id, product_id, quantity, subtotal)
+        JOIN orders_order o ON o.id = d.order_id
+        WHERE o.status != 'cancelled'
+        GROUP BY 1, 2
+        HAVING SUM(d.quantity) <> 0 OR SUM(d.subtotal) <> 0
+        ORDER BY 2, 1
+        ON CONFLICT (day, product_id) DO UPDATE
+        SET quantity = r.quantity + EXCLUDED.quantity,
+            revenue = r.revenue + EXCLUDED.revenue
+    $sql$, delta_query);
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_sales_rollup_insert ON orders_orderitem;
+CREATE TRIGGER trigger_sales_rollup_insert
+    AFTER INSERT ON orders_orderitem
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION apply_item_sales_rollup();
+
+DROP TRIGGER IF EXISTS trigger_sales_rollup_update ON orders_orderitem;
+CREATE TRIGGER trigger_sales_rollup_update
+    AFTER UPDATE ON orders_orderitem
+    REFERENCING OLD TABLE AS old_items NEW TABLE AS new_items
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION apply_item_sales_rollup();
+
+DROP TRIGGER IF EXISTS trigger_sales_rollup_delete ON orders_orderitem;
+CREATE TRIGGER trigger_sales_rollup_delete
+    AFTER DELETE ON orders_orderitem
+    REFERENCING OLD TABLE AS old_items
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION apply_item_sales_rollup();
+
+-- Cancelling an order takes its lines out of the rollup (un-cancelling puts them back)
+CREATE OR REPLACE FUNCTION apply_order_sales_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO reports_dailyproductsales AS r (day, product_id, quantity, revenue)
+    SELECT
+        (n.created_at AT TIME ZONE 'UTC')::date,
+        oi.product_id,
+        SUM(CASE WHEN n.status = 'cancelled' THEN -oi.quantity ELSE oi.quantity END),
+        SUM(CASE WHEN n.status = 'cancelled' THEN -oi.subtotal ELSE oi.subtotal END)
+    FROM new_orders n
+    JOIN old_orders o ON o.id = n.id
+    JOIN orders_orderitem oi ON oi.order_id = n.id
+    WHERE (n.status = 'cancelled') <> (o.status = 'cancelled')
+    GROUP BY 1, 2
+    ORDER BY 2, 1
+    ON CONFLICT (day, product_id) DO UPDATE
+    SET quantity = r.quantity + EXCLUDED.quantity,
+        revenue = r.revenue + EXCLUDED.revenue;
+    
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_sales_rollup_status ON orders_order;
+CREATE TRIGGER trigger_sales_rollup_status
+    AFTER UPDATE ON orders_order
+    REFERENCING OLD TABLE AS old_orders NEW TABLE AS new_orders
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION apply_order_sales_rollup();
+
+
+-- 6. Trigger: Forget the import content hash when a product is edited elsewhere
+-- The column list must match HASHED_FIELDS in products/importing.py. The
+-- importers set a new hash in the same UPDATE, which leaves it in place; any
+-- other change (admin, batch_update_prices_by_category, stock moved by
+-- orders) clears it so the next import rewrites the product.
+CREATE OR REPLACE FUNCTION clear_product_content_hash()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.content_hash IS NOT DISTINCT FROM OLD.content_hash
+       AND (NEW.name, NEW.description, NEW.category_id, NEW.price, NEW.stock_quantity,
+            NEW.manufacturer, NEW.dosage, NEW.ingredients, NEW.image, NEW.is_active,
+            NEW.requires_prescription)
+           IS DISTINCT FROM
+           (OLD.name, OLD.description, OLD.category_id, OLD.price, OLD.stock_quantity,
+            OLD.manufacturer, OLD.dosage, OLD.ingredients, OLD.image, OLD.is_active,
+            OLD.requires_prescription) THEN
+        NEW.content_hash := '';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_clear_product_content_hash ON products_product;
+CREATE TRIGGER trigger_clear_product_content_hash
+    BEFORE UPDATE ON products_product
+    FOR EACH ROW
+    EXECUTE FUNCTION clear_product_content_hash();
+
+
 -- ============================================
--- STORED PROCEDURES WITH CURSORS (Course Requirement)
+-- REPORT PROCEDURES (Course Requirement)
 -- ============================================
+-- These used to walk an explicit cursor and RETURN NEXT one row at a time
+-- (and UPDATE one product at a time). They are set-based now: one query or
+-- one UPDATE each, with the same signatures and result columns. Compare the
+-- two styles with: python benchmark_report_procedures.py
 
--- 1. Procedure: Generate low stock report using cursor
+-- 1. Procedure: Generate low stock report
 CREATE OR REPLACE FUNCTION generate_low_stock_report()
 RETURNS TABLE (
     product_id INTEGER,
@@ -98,41 +275,28 @@ RETURNS TABLE (
     threshold INTEGER,
     category_name VARCHAR(100)
 ) AS $$
-DECLARE
-    product_cursor CURSOR FOR
-        SELECT p.id, p.name, p.stock_quantity, p.low_stock_threshold, c.name
-        FROM products_product p
-        JOIN products_category c ON p.category_id = c.id
-        WHERE p.stock_quantity <= p.low_stock_threshold
-        AND p.is_active = TRUE
-        ORDER BY p.stock_quantity ASC;
-    
-    product_record RECORD;
 BEGIN
-    OPEN product_cursor;
-    
-    LOOP
-        FETCH product_cursor INTO product_record;
-        EXIT WHEN NOT FOUND;
-        
-        product_id := product_record.id;
-        product_name := product_record.name;
-        current_stock := product_record.stock_quantity;
-        threshold := product_record.low_stock_threshold;
-        category_name := product_record.name;
-        
-        RETURN NEXT;
-    END LOOP;
-    
-    CLOSE product_cursor;
+    RETURN QUERY
+    SELECT p.id::INTEGER, p.name, p.stock_quantity, p.low_stock_threshold, c.name
+    FROM products_product p
+    JOIN products_category c ON p.category_id = c.id
+    WHERE p.stock_quantity <= p.low_stock_threshold
+    AND p.is_active = TRUE
+    ORDER BY p.stock_quantity ASC;
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql STABLE;
 
 -- Usage: SELECT * FROM generate_low_stock_report();
 
 
--- 2. Procedure: Calculate monthly sales using cursor
-CREATE OR REPLACE FUNCTION calculate_monthly_sales(target_month INTEGER, target_year INTEGER)
+-- 2. Procedure: Calculate monthly sales
+-- Archived orders (orders/archive.py) are only read with include_archived
+DROP FUNCTION IF EXISTS calculate_monthly_sales(INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION calculate_monthly_sales(
+    target_month INTEGER,
+    target_year INTEGER,
+    include_archived BOOLEAN DEFAULT FALSE
+)
 RETURNS TABLE (
     product_id INTEGER,
     product_name VARCHAR(200),
@@ -140,79 +304,58 @@ RETURNS TABLE (
     total_revenue DECIMAL(10, 2)
 ) AS $$
 DECLARE
-    sales_cursor CURSOR FOR
-        SELECT 
-            p.id,
-            p.name,
-            SUM(oi.quantity) as qty,
-            SUM(oi.subtotal) as revenue
-        FROM products_product p
-        JOIN orders_orderitem oi ON p.id = oi.product_id
+    month_start TIMESTAMPTZ := make_date(target_year, target_month, 1);
+BEGIN
+    RETURN QUERY
+    SELECT 
+        p.id::INTEGER,
+        p.name,
+        SUM(s.quantity)::INTEGER AS qty,
+        SUM(s.subtotal)::DECIMAL(10, 2) AS revenue
+    FROM products_product p
+    JOIN (
+        SELECT oi.product_id, oi.quantity, oi.subtotal
+        FROM orders_orderitem oi
         JOIN orders_order o ON oi.order_id = o.id
-        WHERE EXTRACT(MONTH FROM o.created_at) = target_month
-        AND EXTRACT(YEAR FROM o.created_at) = target_year
+        WHERE o.created_at >= month_start
+        AND o.created_at < month_start + INTERVAL '1 month'
         AND o.status != 'cancelled'
-        GROUP BY p.id, p.name
-        ORDER BY revenue DESC;
-    
-    sales_record RECORD;
-BEGIN
-    OPEN sales_cursor;
-    
-    LOOP
-        FETCH sales_cursor INTO sales_record;
-        EXIT WHEN NOT FOUND;
-        
-        product_id := sales_record.id;
-        product_name := sales_record.name;
-        total_quantity := sales_record.qty;
-        total_revenue := sales_record.revenue;
-        
-        RETURN NEXT;
-    END LOOP;
-    
-    CLOSE sales_cursor;
+        UNION ALL
+        SELECT ai.product_id, ai.quantity, ai.subtotal
+        FROM orders_archivedorderitem ai
+        JOIN orders_archivedorder ao ON ai.order_id = ao.id
+        WHERE include_archived
+        AND ao.created_at >= month_start
+        AND ao.created_at < month_start + INTERVAL '1 month'
+        AND ao.status != 'cancelled'
+    ) s ON p.id = s.product_id
+    GROUP BY p.id, p.name
+    ORDER BY revenue DESC;
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql STABLE;
 
 -- Usage: SELECT * FROM calculate_monthly_sales(11, 2024);
+--        SELECT * FROM calculate_monthly_sales(11, 2022, TRUE); -- including archived orders
 
 
--- 3. Procedure: Batch update product prices by category
+-- 3. Procedure: Batch update prices by category
+-- One UPDATE for the whole category (the price audit trigger still logs every row)
 CREATE OR REPLACE FUNCTION batch_update_prices_by_category(
     target_category_id INTEGER,
     percentage_change DECIMAL(5, 2)
 )
 RETURNS INTEGER AS $$
 DECLARE
-    product_cursor CURSOR FOR
-        SELECT id, price
-        FROM products_product
-        WHERE category_id = target_category_id
-        AND is_active = TRUE;
-    
-    product_record RECORD;
-    updated_count INTEGER := 0;
-    new_price DECIMAL(10, 2);
+    updated_count INTEGER;
 BEGIN
-    OPEN product_cursor;
-    
-    LOOP
-        FETCH product_cursor INTO product_record;
-        EXIT WHEN NOT FOUND;
-        
-        -- Calculate new price
-        new_price := product_record.price * (1 + percentage_change / 100);
-        
-        -- Update product price
+    WITH updated AS (
         UPDATE products_product
-        SET price = new_price
-        WHERE id = product_record.id;
-        
-        updated_count := updated_count + 1;
-    END LOOP;
-    
-    CLOSE product_cursor;
+        SET price = ROUND(price * (1 + percentage_change / 100), 2)
+        WHERE category_id = target_category_id
+        AND is_active = TRUE
+        RETURNING id
+    )
+    SELECT COUNT(*) INTO updated_count FROM updated;
     
     RETURN updated_count;
 END;
@@ -226,29 +369,59 @@ $$ LANGUAGE plpgsql;
 -- ============================================
 
 -- Function: Get customer order history
-CREATE OR REPLACE FUNCTION get_customer_order_history(customer_id INTEGER)
+-- One page, newest first. Pass the date and id of the last row seen to get the
+-- next page; the (user_id, created_at, id) index serves every page equally fast.
+-- With include_archived the page is merged with the user's archived orders.
+DROP FUNCTION IF EXISTS get_customer_order_history(INTEGER);
+DROP FUNCTION IF EXISTS get_customer_order_history(BIGINT, INTEGER, TIMESTAMPTZ, BIGINT);
+CREATE OR REPLACE FUNCTION get_customer_order_history(
+    customer_id BIGINT,
+    page_size INTEGER DEFAULT NULL,
+    before_date TIMESTAMPTZ DEFAULT NULL,
+    before_id BIGINT DEFAULT NULL,
+    include_archived BOOLEAN DEFAULT FALSE
+)
 RETURNS TABLE (
-    order_id INTEGER,
-    order_date TIMESTAMP,
+    order_id BIGINT,
+    order_date TIMESTAMPTZ,
     status VARCHAR(20),
     total DECIMAL(10, 2),
     item_count BIGINT
 ) AS $$
-BEGIN
-    RETURN QUERY
-    SELECT 
-        o.id,
-        o.created_at,
-        o.status,
-        o.total,
-        COUNT(oi.id)
-    FROM orders_order o
-    LEFT JOIN orders_orderitem oi ON o.id = oi.order_id
-    WHERE o.user_id = customer_id
-    GROUP BY o.id, o.created_at, o.status, o.total
-    ORDER BY o.created_at DESC;
-END;
-$$ LANGUAGE plpgsql;
+    (
+        SELECT 
+            o.id,
+            o.created_at,
+            o.status,
+            o.total,
+            (SELECT COUNT(*) FROM orders_orderitem oi WHERE oi.order_id = o.id)
+        FROM orders_order o
+        WHERE o.user_id = customer_id
+          AND (before_date IS NULL OR (o.created_at, o.id) < (before_date, before_id))
+        ORDER BY o.created_at DESC, o.id DESC
+        LIMIT page_size
+    )
+    UNION ALL
+    (
+        SELECT 
+            ao.id,
+            ao.created_at,
+            ao.status,
+            ao.total,
+            (SELECT COUNT(*) FROM orders_archivedorderitem ai WHERE ai.order_id = ao.id)
+        FROM orders_archivedorder ao
+        WHERE include_archived
+          AND ao.user_id = customer_id
+          AND (before_date IS NULL OR (ao.created_at, ao.id) < (before_date, before_id))
+        ORDER BY ao.created_at DESC, ao.id DESC
+        LIMIT page_size
+    )
+    ORDER BY 2 DESC, 1 DESC
+    LIMIT page_size;
+$$ LANGUAGE sql STABLE;
+
+-- Usage: SELECT * FROM get_customer_order_history(1, 20);
+--        SELECT * FROM get_customer_order_history(1, 20, include_archived => TRUE);
 
 
 -- Function: Check product availability
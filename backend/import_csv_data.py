@@ -14,6 +14,7 @@ django.setup()
 
 import csv
 from products.models import Category, Product
+from products.importing import compute_content_hash
 from datetime import datetime
 
 # First, create categories based on the CSV
@@ -42,26 +43,35 @@ for cat_id, cat_name in categories_map.items():
 print("\nImporting products from CSV...")
 csv_file = 'Products_Final.csv'
 
+# Hashes of what every product was last imported from, loaded in one query
+existing_hashes = dict(Product.objects.values_list('id', 'content_hash'))
+unchanged_count = 0
+
 with open(csv_file, 'r', encoding='utf-8') as file:
     reader = csv.DictReader(file)
     
     for row in reader:
-        product, created = Product.objects.update_or_create(
-            id=int(row['Product_ID']),
-            defaults={
-                'name': row['Name'],
-                'description': row['Description'],
-                'category_id': int(row['Category_ID']),
-                'price': float(row['Price']),
-                'stock_quantity': int(row['Stock']),
-                'manufacturer': row['Brand'],
-                'dosage': row['Size'],
-                'ingredients': row['Ingredients'],  # This is the key field!
-                'image': row['Image_URL'],
-                'is_active': row['is_active'].upper() == 'TRUE',
-                'requires_prescription': False,  # Add logic if needed
-            }
-        )
+        product_id = int(row['Product_ID'])
+        values = {
+            'name': row['Name'],
+            'description': row['Description'],
+            'category_id': int(row['Category_ID']),
+            'price': float(row['Price']),
+            'stock_quantity': int(row['Stock']),
+            'manufacturer': row['Brand'],
+            'dosage': row['Size'],
+            'ingredients': row['Ingredients'],  # This is the key field!
+            'image': row['Image_URL'],
+            'is_active': row['is_active'].upper() == 'TRUE',
+            'requires_prescription': False,  # Add logic if needed
+        }
+        values['content_hash'] = compute_content_hash(values)
+
+        if existing_hashes.get(product_id) == values['content_hash']:
+            unchanged_count += 1
+            continue
+
+        product, created = Product.objects.update_or_create(id=product_id, defaults=values)
         
         if created:
             print(f"✓ Created product: {product.name}")
@@ -69,5 +79,6 @@ with open(csv_file, 'r', encoding='utf-8') as file:
             print(f"↻ Updated product: {product.name}")
 
 print("\n✅ CSV import complete!")
+print(f"Unchanged (skipped): {unchanged_count}")
 print(f"Total categories: {Category.objects.count()}")
 print(f"Total products: {Product.objects.count()}")
@@ -0,0 +1,182 @@
+"""
+Keyset (cursor) pagination shared by the catalog and order listings
+
+Page-number pagination runs a COUNT(*) and an OFFSET scan that grows with the
+page number. KeysetPagination instead remembers the position of the last row
+it returned (the value of the ordering field plus the primary key as a
+tie-breaker) in an opaque cursor and resumes with an indexed range condition,
+so every page costs the same and pages stay stable while rows are inserted.
+
+Requests that pass ?page= (the admin UI) keep the classic page-number mode.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    # Passing this parameter switches the request to page-number mode
+    page_query_param = 'page'
+    fallback_class = PageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+
+        order_field, descending = self.get_order_field(queryset)
+        if order_field is None or self.page_query_param in request.query_params:
+            self.fallback = self.fallback_class()
+            self.fallback.page_size = self.page_size
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.base_url = request.build_absolute_uri()
+        self.order_field = order_field
+        self.descending = descending
+        position, reverse = self.decode_cursor(request)
+
+        # Walking backwards means flipping the ordering and the range condition
+        walk_descending = descending != reverse
+        prefix = '-' if walk_descending else ''
+        queryset = queryset.order_by(f'{prefix}{order_field.name}', f'{prefix}pk')
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(position, walk_descending))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = rows
+        return rows
+
+    def get_order_field(self, queryset):
+        """
+        Return (model field, descending) for the first ordering term, or
+        (None, False) when the ordering cannot be keyed (annotations such as
+        the search rank, related lookups or nullable columns).
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if not ordering:
+            return None, False
+
+        term = ordering[0]
+        if not isinstance(term, str) or '__' in term:
+            return None, False
+
+        name = term.lstrip('-')
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None, False
+        if not field.concrete or field.null:
+            return None, False
+        return field, term.startswith('-')
+
+    def get_position_filter(self, position, descending):
+        """Rows strictly after (value, pk) in the walking direction"""
+        value, pk = position
+        name = self.order_field.name
+        if descending:
+            # The redundant range lets PostgreSQL start the index scan at the cursor
+            return Q(**{f'{name}__lte': value}) & (
+                Q(**{f'{name}__lt': value}) | Q(**{name: value, 'pk__lt': pk})
+            )
+        return Q(**{f'{name}__gte': value}) & (
+            Q(**{f'{name}__gt': value}) | Q(**{name: value, 'pk__gt': pk})
+        )
+
+    def decode_cursor(self, request):
+        """Return ((value, pk), reverse) from the cursor parameter"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if data['o'] != self.order_field.name:
+                raise ValueError('cursor belongs to another ordering')
+            value = self.order_field.to_python(data['v'])
+            pk = int(data['k'])
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return (value, pk), reverse
+
+    def encode_cursor(self, row, reverse):
+        value = getattr(row, self.order_field.attname)
+        data = {
+            'o': self.order_field.name,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else str(value),
+            'k': row.pk,
+        }
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(data, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor taken from the next/previous links',
+                'schema': {'type': 'string'},
+            },
+            *self.fallback_class().get_schema_operation_parameters(view),
+        ]
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from corsheaders.defaults import default_headers
 import os
 from dotenv import load_dotenv
 
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -102,6 +104,74 @@ DATABASES = {
 }
 
 
+# Cache
+# Cache versions (products/cache.py) are kept in the database, so invalidations
+# reach every process whatever the backend. The local-memory default keeps a
+# copy of each cached response per process; point CACHE_BACKEND/CACHE_LOCATION
+# at a shared backend (e.g. django.core.cache.backends.redis.RedisCache) to
+# share the entries themselves between workers.
+# Report results (reports/cache.py) are rendered by the web workers and by the
+# run_report_jobs worker, so they default to the database cache, which every
+# process shares. Its table is created by the reports migrations.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'mediguide'),
+    },
+    'reports': {
+        'BACKEND': os.getenv('REPORT_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.getenv('REPORT_CACHE_LOCATION', 'reports_result_cache'),
+    },
+}
+
+# Seconds a rendered catalog response stays cached (the catalog version bump invalidates earlier)
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '600'))
+
+# Minimum seconds between rebuilds of the in-process autocomplete index
+AUTOCOMPLETE_REBUILD_INTERVAL = int(os.getenv('AUTOCOMPLETE_REBUILD_INTERVAL', '30'))
+
+# Seconds a cached order history page stays cached (order changes invalidate it earlier)
+ORDER_HISTORY_CACHE_TIMEOUT = int(os.getenv('ORDER_HISTORY_CACHE_TIMEOUT', '600'))
+
+# Delivered and cancelled orders older than this many months are moved to the archive (archive_orders)
+ORDER_ARCHIVE_AFTER_MONTHS = int(os.getenv('ORDER_ARCHIVE_AFTER_MONTHS', '12'))
+
+# Rows fetched per round trip when streaming a CSV/NDJSON report export
+REPORT_EXPORT_FETCH_SIZE = int(os.getenv('REPORT_EXPORT_FETCH_SIZE', '2000'))
+
+# Background report jobs (run_report_jobs): where results are written, how long
+# a job may run before another worker takes it over, and how long results are kept
+REPORT_RESULTS_DIR = Path(os.getenv('REPORT_RESULTS_DIR', BASE_DIR / 'report_results'))
+REPORT_JOB_TIMEOUT = int(os.getenv('REPORT_JOB_TIMEOUT', '1800'))
+REPORT_JOB_POLL_INTERVAL = float(os.getenv('REPORT_JOB_POLL_INTERVAL', '2'))
+REPORT_RESULTS_MAX_AGE_DAYS = int(os.getenv('REPORT_RESULTS_MAX_AGE_DAYS', '7'))
+
+# Seconds a cached report result is kept (stock, price and order changes invalidate it earlier)
+# and the largest result, in rows, that is cached at all
+REPORT_CACHE_TIMEOUT = int(os.getenv('REPORT_CACHE_TIMEOUT', '3600'))
+REPORT_CACHE_MAX_ROWS = int(os.getenv('REPORT_CACHE_MAX_ROWS', '20000'))
+
+# Seconds a signed checkout quote (orders/pricing.py) can be turned into an order
+QUOTE_MAX_AGE = int(os.getenv('QUOTE_MAX_AGE', '1800'))
+
+# Seconds the in-process checkout price map (orders/pricing.py) is kept even if the price version does not move
+PRICE_MAP_TTL = int(os.getenv('PRICE_MAP_TTL', '60'))
+
+# Seconds stock stays reserved for a checkout (release_expired_holds returns it afterwards)
+INVENTORY_HOLD_TTL = int(os.getenv('INVENTORY_HOLD_TTL', '1800'))
+# Most units one checkout may hold per product and in total
+INVENTORY_HOLD_MAX_LINE_QUANTITY = int(os.getenv('INVENTORY_HOLD_MAX_LINE_QUANTITY', '10'))
+INVENTORY_HOLD_MAX_QUANTITY = int(os.getenv('INVENTORY_HOLD_MAX_QUANTITY', '50'))
+
+# Seconds a checkout Idempotency-Key keeps replaying its stored response (purge_idempotency_keys cleans up)
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+# Seconds a key stays claimed by a request that is still running (frees keys of crashed requests),
+# and seconds a concurrent duplicate waits for that request's response before getting 409
+IDEMPOTENCY_CLAIM_TIMEOUT = int(os.getenv('IDEMPOTENCY_CLAIM_TIMEOUT', '120'))
+IDEMPOTENCY_CLAIM_WAIT = int(os.getenv('IDEMPOTENCY_CLAIM_WAIT', '10'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -171,6 +241,9 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Checkout retries send an Idempotency-Key header (orders/idempotency.py)
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 # Supabase Configuration (Optional - for direct client usage)
 SUPABASE_URL = os.getenv('SUPABASE_URL', '')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY', '')
@@ -182,6 +255,16 @@ GOOGLE_AI_API_KEY = os.getenv('GOOGLE_AI_API_KEY', '')
 STRIPE_SECRET_KEY = os.getenv('STRIPE_SECRET_KEY', '')
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY', '')
 
+# Stripe gateway (mediguide/stripe_utils.py)
+# Point STRIPE_API_BASE at the local stub (python manage.py stripe_stub) for load tests
+STRIPE_API_BASE = os.getenv('STRIPE_API_BASE', '')
+STRIPE_CONNECT_TIMEOUT = float(os.getenv('STRIPE_CONNECT_TIMEOUT', '2'))
+STRIPE_READ_TIMEOUT = float(os.getenv('STRIPE_READ_TIMEOUT', '8'))
+STRIPE_MAX_RETRIES = int(os.getenv('STRIPE_MAX_RETRIES', '2'))
+# Consecutive failures that open the circuit, and seconds before a trial call is let through
+STRIPE_BREAKER_THRESHOLD = int(os.getenv('STRIPE_BREAKER_THRESHOLD', '5'))
+STRIPE_BREAKER_RESET_TIMEOUT = float(os.getenv('STRIPE_BREAKER_RESET_TIMEOUT', '30'))
+
 # Trigger reload to apply settings
 
 
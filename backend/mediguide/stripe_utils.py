@@ -1,32 +1,197 @@
 """
 Stripe configuration and helper functions
+
+All calls go through one shared StripeClient (the payment gateway), so HTTP
+connections are reused and every call has a bounded latency:
+
+- connect/read timeouts from STRIPE_CONNECT_TIMEOUT / STRIPE_READ_TIMEOUT
+- up to STRIPE_MAX_RETRIES retries of connection errors, 409/429 and 5xx
+  responses, with Stripe's exponential backoff and jitter (retries reuse the
+  idempotency key, so they never create a second object)
+- a circuit breaker: after STRIPE_BREAKER_THRESHOLD consecutive failures
+  calls fail fast with PaymentGatewayUnavailable for
+  STRIPE_BREAKER_RESET_TIMEOUT seconds, then a single trial call decides
+  whether the circuit closes again
+
+create_payment_intent_async() is the variant for ASGI (async) views. It uses
+httpx when installed and a worker thread otherwise.
 """
+import threading
+import time
+
 import stripe
-import os
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
-# Initialize Stripe with secret key
-stripe.api_key = settings.STRIPE_SECRET_KEY
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class PaymentGatewayError(Exception):
+    """Stripe rejected or failed the request"""
+
+
+class PaymentGatewayUnavailable(PaymentGatewayError):
+    """Stripe is unreachable or the circuit breaker is open; the request was not sent or timed out"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open after `reset_timeout` seconds"""
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_timeout or self.trial_running:
+                raise PaymentGatewayUnavailable('Payment service temporarily unavailable, please try again shortly')
+            # Half-open: let exactly one call find out whether Stripe is back
+            self.trial_running = True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+# Errors that say something about Stripe's health, not about the request
+GATEWAY_FAILURES = (stripe.error.APIConnectionError, stripe.error.APIError, stripe.error.RateLimitError)
+
+breaker = CircuitBreaker(settings.STRIPE_BREAKER_THRESHOLD, settings.STRIPE_BREAKER_RESET_TIMEOUT)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_stripe_client():
+    """Return the process-wide StripeClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                async_client = None
+                if httpx is not None:
+                    async_client = stripe.HTTPXClient(timeout=httpx.Timeout(
+                        settings.STRIPE_READ_TIMEOUT, connect=settings.STRIPE_CONNECT_TIMEOUT
+                    ))
+                options = {}
+                if settings.STRIPE_API_BASE:
+                    options['base_addresses'] = {'api': settings.STRIPE_API_BASE}
+                _client = stripe.StripeClient(
+                    settings.STRIPE_SECRET_KEY,
+                    http_client=stripe.RequestsClient(
+                        timeout=(settings.STRIPE_CONNECT_TIMEOUT, settings.STRIPE_READ_TIMEOUT),
+                        async_fallback_client=async_client,
+                    ),
+                    max_network_retries=settings.STRIPE_MAX_RETRIES,
+                    **options
+                )
+    return _client
+
 
-def create_payment_intent(amount, currency='usd', metadata=None):
+def _payment_intent_params(amount, currency, metadata):
+    return {
+        'amount': amount,
+        'currency': currency,
+        'metadata': metadata or {},
+        'automatic_payment_methods': {'enabled': True},
+    }
+
+
+def _request_options(idempotency_key):
+    return {'idempotency_key': idempotency_key} if idempotency_key else {}
+
+
+def _gateway_error(error):
+    if isinstance(error, GATEWAY_FAILURES):
+        breaker.record_failure()
+        return PaymentGatewayUnavailable(f"Stripe error: {str(error)}")
+    # Declines and invalid requests mean Stripe itself is healthy
+    breaker.record_success()
+    return PaymentGatewayError(f"Stripe error: {str(error)}")
+
+
+def create_payment_intent(amount, currency='usd', metadata=None, idempotency_key=None):
     """
     Create a Stripe PaymentIntent
-    
+
     Args:
         amount: Amount in cents (e.g., 1000 = $10.00)
         currency: Currency code (default: 'usd')
         metadata: Optional dict of metadata to attach to the payment
-    
+        idempotency_key: Optional key; Stripe returns the original intent for repeats
+
     Returns:
         PaymentIntent object
     """
+    breaker.before_call()
+    try:
+        intent = get_stripe_client().v1.payment_intents.create(
+            params=_payment_intent_params(amount, currency, metadata),
+            options=_request_options(idempotency_key),
+        )
+    except stripe.error.StripeError as e:
+        raise _gateway_error(e)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return intent
+
+
+def cancel_payment_intent(intent_id):
+    """Cancel a PaymentIntent that will never be paid (best effort; failures are only reported)"""
+    try:
+        breaker.before_call()
+    except PaymentGatewayUnavailable:
+        return False
+    # The outcome is recorded like any other call, so a half-open trial always ends
+    try:
+        get_stripe_client().v1.payment_intents.cancel(intent_id)
+    except stripe.error.StripeError as e:
+        _gateway_error(e)
+        return False
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return True
+
+
+async def create_payment_intent_async(amount, currency='usd', metadata=None, idempotency_key=None):
+    """Async version of create_payment_intent() for ASGI views"""
+    if httpx is None:
+        return await sync_to_async(create_payment_intent, thread_sensitive=False)(
+            amount, currency, metadata, idempotency_key
+        )
+
+    breaker.before_call()
     try:
-        intent = stripe.PaymentIntent.create(
-            amount=amount,
-            currency=currency,
-            metadata=metadata or {},
-            automatic_payment_methods={'enabled': True},
+        intent = await get_stripe_client().v1.payment_intents.create_async(
+            params=_payment_intent_params(amount, currency, metadata),
+            options=_request_options(idempotency_key),
         )
-        return intent
     except stripe.error.StripeError as e:
-        raise Exception(f"Stripe error: {str(e)}")
+        raise _gateway_error(e)
+    except Exception:
+        breaker.record_failure()
+        raise
+    breaker.record_success()
+    return intent
@@ -1,5 +1,6 @@
-from django.contrib import admin
-from .models import Order, OrderItem
+from django.contrib import admin, messages
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .transitions import transition_orders
 
 
 class OrderItemInline(admin.TabularInline):
@@ -33,19 +34,41 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
     
-    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered']
+    actions = ['mark_as_processing', 'mark_as_shipped', 'mark_as_delivered', 'mark_as_cancelled']
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Edited item lines change the totals
+        form.instance.calculate_totals()
+    
+    def transition_selected(self, request, queryset, new_status):
+        """Move the selected orders with one statement and report the per-status counts"""
+        result = transition_orders(queryset.values_list('id', flat=True), new_status)
+        label = dict(Order.STATUS_CHOICES)[new_status]
+        
+        updated = sum(result['updated'].values())
+        self.message_user(request, f"{updated} order(s) marked as {label}.", messages.SUCCESS)
+        if result['skipped']:
+            details = ', '.join(f"{count} {status}" for status, count in sorted(result['skipped'].items()))
+            self.message_user(
+                request, f"Skipped orders that cannot become {label}: {details}.", messages.WARNING
+            )
     
     def mark_as_processing(self, request, queryset):
-        queryset.update(status='processing')
+        self.transition_selected(request, queryset, 'processing')
     mark_as_processing.short_description = "Mark selected orders as Processing"
     
     def mark_as_shipped(self, request, queryset):
-        queryset.update(status='shipped')
+        self.transition_selected(request, queryset, 'shipped')
     mark_as_shipped.short_description = "Mark selected orders as Shipped"
     
     def mark_as_delivered(self, request, queryset):
-        queryset.update(status='delivered')
+        self.transition_selected(request, queryset, 'delivered')
     mark_as_delivered.short_description = "Mark selected orders as Delivered"
+    
+    def mark_as_cancelled(self, request, queryset):
+        self.transition_selected(request, queryset, 'cancelled')
+    mark_as_cancelled.short_description = "Cancel selected orders (restores stock)"
 
 
 @admin.register(OrderItem)
@@ -54,3 +77,29 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ['order__status', 'created_at']
     search_fields = ['product__name', 'order__id']
     readonly_fields = ['subtotal', 'created_at']
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = ArchivedOrderItem
+    extra = 0
+    can_delete = False
+    fields = ['product', 'quantity', 'price', 'subtotal']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    """Read-only view of orders moved out by the archive_orders command"""
+    list_display = ['id', 'user', 'status', 'total', 'created_at', 'archived_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['user__username', 'user__email', 'shipping_address']
+    inlines = [ArchivedOrderItemInline]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,100 @@
+"""
+Order archive
+
+Years of delivered and cancelled orders slow down every query on the hot
+tables (per-user listings, monthly reports) and bloat their indexes.
+archive_orders() moves finished orders created before a cutoff, with their
+items, into orders_archivedorder / orders_archivedorderitem: one statement
+per batch deletes them from the hot tables and inserts them, ids unchanged,
+into the archive. Stock is not touched (the cancel trigger only fires on
+status updates), and neither is the daily sales rollup, which keeps counting
+archived orders (the archiving flag below tells its delete trigger to skip).
+
+Reads that should include archived orders ask for them explicitly:
+/api/orders/history/?archived=include, /api/orders/{id}/ for an archived id,
+and the include_archived argument of calculate_monthly_sales(). The sales
+reports read the daily rollup (reports/rollup.py), which always includes them.
+"""
+from datetime import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .history import invalidate_order_history
+
+
+# Transaction-local setting read by apply_item_sales_rollup() (database_schema.sql)
+ARCHIVING_SETTING = 'mediguide.archiving_orders'
+
+# Only orders that can no longer change are archived
+ARCHIVABLE_STATUSES = ('delivered', 'cancelled')
+
+ORDER_COLUMNS = (
+    'id, user_id, status, shipping_name, shipping_address, shipping_city, shipping_state, '
+    'shipping_zip, shipping_phone, payment_intent_id, subtotal, tax, shipping_cost, total, '
+    'notes, created_at, updated_at'
+)
+ITEM_COLUMNS = 'id, order_id, product_id, quantity, price, subtotal, created_at'
+
+# The foreign keys are deferred, so items and orders can move in either order
+ARCHIVE_ORDERS_SQL = f"""
+    WITH batch AS (
+        SELECT id FROM orders_order
+        WHERE status = ANY(%(statuses)s) AND created_at < %(cutoff)s
+        ORDER BY id
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    ),
+    moved_items AS (
+        DELETE FROM orders_orderitem oi
+        USING batch b
+        WHERE oi.order_id = b.id
+        RETURNING oi.*
+    ),
+    archived_items AS (
+        INSERT INTO orders_archivedorderitem ({ITEM_COLUMNS})
+        SELECT {ITEM_COLUMNS} FROM moved_items
+        RETURNING id
+    ),
+    moved_orders AS (
+        DELETE FROM orders_order o
+        USING batch b
+        WHERE o.id = b.id
+        RETURNING o.*
+    ),
+    archived_orders AS (
+        INSERT INTO orders_archivedorder ({ORDER_COLUMNS}, archived_at)
+        SELECT {ORDER_COLUMNS}, %(now)s FROM moved_orders
+        RETURNING user_id
+    )
+    SELECT
+        (SELECT COUNT(*) FROM archived_orders),
+        (SELECT COUNT(*) FROM archived_items),
+        ARRAY(SELECT DISTINCT user_id FROM archived_orders)
+"""
+
+
+def get_archive_cutoff(months, now=None):
+    """Start of the month `months` months before now (whole months stay together)"""
+    now = timezone.localtime(now)
+    month_index = now.year * 12 + now.month - 1 - months
+    return timezone.make_aware(datetime(month_index // 12, month_index % 12 + 1, 1))
+
+
+def archive_orders(cutoff, batch_size):
+    """
+    Archive one batch of finished orders created before cutoff
+    Returns (orders archived, items archived); (0, 0) means nothing is left.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT set_config(%s, %s, true)', [ARCHIVING_SETTING, 'on'])
+            cursor.execute(ARCHIVE_ORDERS_SQL, {
+                'statuses': list(ARCHIVABLE_STATUSES),
+                'cutoff': cutoff,
+                'batch_size': batch_size,
+                'now': timezone.now(),
+            })
+            order_count, item_count, user_ids = cursor.fetchone()
+        invalidate_order_history(*user_ids)
+    return order_count, item_count
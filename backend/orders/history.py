@@ -0,0 +1,89 @@
+"""
+Cached per-customer order history
+
+The account page only needs date, status, total and item count per order.
+get_order_history() reads one page of that from the get_customer_order_history
+database function (database_schema.sql), which walks the
+(user_id, created_at, id) index from a keyset cursor, and caches the page.
+
+Cached pages are keyed on a per-user history version. Every change to one of
+the user's orders bumps that version once the transaction commits (see
+orders/signals.py and the bulk order commands), so a repeat visit costs a
+version lookup by primary key and a cache read, and older pages simply
+expire from the cache.
+Archived orders (orders/archive.py) are merged in only when asked for.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+
+from products.cache import bump_version, get_version
+
+
+ORDER_HISTORY_SQL = 'SELECT * FROM get_customer_order_history(%s, %s, %s, %s, %s)'
+
+
+class InvalidCursor(Exception):
+    """The history cursor was not produced by encode_cursor()"""
+
+
+def get_history_version_key(user_id):
+    return f'orders:history-version:{user_id}'
+
+
+def invalidate_order_history(*user_ids):
+    """Bump the history version of each user once the current transaction commits"""
+    for user_id in set(user_ids):
+        key = get_history_version_key(user_id)
+        transaction.on_commit(lambda key=key: bump_version(key))
+
+
+def encode_cursor(row):
+    data = {'d': row['created_at'].isoformat(), 'k': row['id']}
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(',', ':')).encode('utf-8')
+    ).decode('ascii').rstrip('=')
+
+
+def decode_cursor(encoded):
+    """Return (created_at, id) of the last row of the previous page"""
+    try:
+        padded = encoded + '=' * (-len(encoded) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        created_at = parse_datetime(data['d'])
+        order_id = int(data['k'])
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidCursor()
+    if created_at is None:
+        raise InvalidCursor()
+    return created_at, order_id
+
+
+def fetch_order_history(user_id, page_size, cursor=None, include_archived=False):
+    """One page straight from the database: ([row, ...], next cursor or None)"""
+    before_date, before_id = decode_cursor(cursor) if cursor else (None, None)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(ORDER_HISTORY_SQL, [user_id, page_size + 1, before_date, before_id, include_archived])
+        rows = [
+            {'id': order_id, 'created_at': created_at, 'status': status, 'total': total, 'item_count': item_count}
+            for order_id, created_at, status, total, item_count in db_cursor.fetchall()
+        ]
+
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
+
+
+def get_order_history(user_id, page_size, cursor=None, include_archived=False):
+    """Cached fetch_order_history(); raises InvalidCursor"""
+    version = get_version(get_history_version_key(user_id))
+    scope = 'all' if include_archived else 'hot'
+    key = f'orders:history:{user_id}:{version}:{scope}:{page_size}:{cursor or ""}'
+    page = cache.get(key)
+    if page is None:
+        page = fetch_order_history(user_id, page_size, cursor, include_archived)
+        cache.set(key, page, settings.ORDER_HISTORY_CACHE_TIMEOUT)
+    return page
@@ -0,0 +1,155 @@
+"""
+Idempotency-Key support for the checkout endpoints
+
+Checkout retries on flaky networks must not create a second order or a second
+Stripe PaymentIntent. A request that carries an Idempotency-Key header runs
+once; its successful response is stored (IdempotencyKey) and replayed for any
+repeat of the same key within IDEMPOTENCY_KEY_TTL seconds, without running the
+view again. Endpoints whose responses go stale sooner pass a shorter ttl
+(create-payment-intent replays its quote for half of QUOTE_MAX_AGE only).
+Failed requests are not stored and can be retried with the same key.
+
+The view itself never runs inside a transaction opened here, so whatever it
+locks (stock rows for a hold, say) is released by its own short transactions
+and never held across the Stripe calls. The key is claimed first, in a short
+transaction serialized by an advisory lock: an in-progress row is written
+that expires after IDEMPOTENCY_CLAIM_TIMEOUT seconds, in case the process
+dies. The response is stored in a second short statement. A concurrent
+duplicate finds the claim and polls for the stored response for up to
+IDEMPOTENCY_CLAIM_WAIT seconds, then gives up with 409 Conflict.
+"""
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+# Seconds between checks of a key that another request is still processing
+CLAIM_POLL_INTERVAL = 0.2
+
+
+def get_request_hash(request):
+    payload = json.dumps(
+        [request.method, request.path, request.data],
+        sort_keys=True, cls=DjangoJSONEncoder
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_scope(request, name):
+    user_id = request.user.pk if request.user.is_authenticated else 'anonymous'
+    return f'{name}:{user_id}'
+
+
+def claim_key(scope, key, request_hash):
+    """
+    Claim the key for this request in one short transaction
+    Returns (claimed row, None) when the view should run, (None, response)
+    when the stored response or an error should be sent instead, and
+    (None, None) while another request is still processing the key.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', [f'{scope}:{key}'])
+
+        stored = IdempotencyKey.objects.filter(scope=scope, key=key, expires_at__gt=now).first()
+        if stored is not None:
+            if stored.request_hash != request_hash:
+                return None, Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} was already used for a different request'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                )
+            if stored.status_code is None:
+                return None, None
+            return None, Response(
+                stored.response_body,
+                status=stored.status_code,
+                headers={REPLAYED_HEADER: 'true'}
+            )
+
+        # Missing, expired, or a claim left behind by a request that died
+        claimed, _ = IdempotencyKey.objects.update_or_create(
+            scope=scope, key=key,
+            defaults={
+                'request_hash': request_hash,
+                'status_code': None,
+                'response_body': None,
+                'expires_at': now + timedelta(seconds=settings.IDEMPOTENCY_CLAIM_TIMEOUT),
+            }
+        )
+    return claimed, None
+
+
+def idempotent(name, ttl=None):
+    """
+    Decorator for DRF views (functions or viewset methods taking the request)
+    Requests without the header are passed straight through. ttl is a
+    callable returning the seconds a stored response is replayed
+    (IDEMPOTENCY_KEY_TTL by default); afterwards the key runs the view again.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {'error': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            scope = get_scope(request, name)
+            request_hash = get_request_hash(request)
+
+            give_up_at = time.monotonic() + settings.IDEMPOTENCY_CLAIM_WAIT
+            while True:
+                claimed, response = claim_key(scope, key, request_hash)
+                if claimed is not None or response is not None:
+                    break
+                if time.monotonic() >= give_up_at:
+                    return Response(
+                        {'error': f'A request with this {IDEMPOTENCY_HEADER} is still being processed, please retry'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                time.sleep(CLAIM_POLL_INTERVAL)
+            if response is not None:
+                return response
+
+            try:
+                response = view(*args, **kwargs)
+            except BaseException:
+                IdempotencyKey.objects.filter(pk=claimed.pk).delete()
+                raise
+
+            # Only successes are stored; a failed attempt wrote nothing and may be retried
+            if status.is_success(response.status_code):
+                IdempotencyKey.objects.filter(pk=claimed.pk).update(
+                    status_code=response.status_code,
+                    response_body=response.data,
+                    expires_at=timezone.now() + timedelta(
+                        seconds=ttl() if ttl else settings.IDEMPOTENCY_KEY_TTL
+                    ),
+                )
+            else:
+                IdempotencyKey.objects.filter(pk=claimed.pk).delete()
+            return response
+        return wrapper
+    return decorator
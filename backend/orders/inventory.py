@@ -0,0 +1,296 @@
+"""
+Set-based order placement and inventory holds
+
+Inserting order items one by one fires the row-level update_inventory_on_order
+trigger for every line (an UPDATE plus a SELECT each). place_order_items()
+instead decrements stock for all lines with one conditional UPDATE, fails
+the whole order if any line is short, and inserts the items with a single
+bulk INSERT. The trigger recognises orders handled here through the
+mediguide.stock_applied_order setting and skips them.
+
+Prices are checked on the same locked rows. Carts are priced from an
+in-process price map (orders/pricing.py); a price written without a version
+bump (raw SQL, for instance) could leave it stale for a while, so taking
+stock for a priced line also requires the catalog price to still match and
+the product to still be active, or it fails with PriceChanged.
+
+Holds (InventoryReservation) reserve stock when a payment intent is created:
+the units are taken out of stock_quantity right away, so the catalog only
+ever shows what is still available, and a flash-sale shopper who cannot get
+the last units is told so before paying. Placing the order converts the hold
+(its rows are deleted, the stock stays taken); holds that are never converted
+are put back by the release_expired_holds command. Taking a hold is a single
+conditional UPDATE per checkout, so hot products are only locked for the
+duration of that statement's short transaction.
+
+Each shopper (signed-in user, or session) has at most one hold: a new
+checkout first releases the previous hold (release_owner_holds), so
+reloading the checkout page does not pile up reservations. A single hold is
+capped at INVENTORY_HOLD_MAX_LINE_QUANTITY units per product and
+INVENTORY_HOLD_MAX_QUANTITY units in total.
+"""
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import InventoryReservation, OrderItem
+
+
+# Transaction-local setting read by update_inventory_on_order() (database_schema.sql)
+STOCK_APPLIED_SETTING = 'mediguide.stock_applied_order'
+
+# A NULL price skips the price check for that line
+DECREMENT_STOCK_SQL = """
+    WITH wanted (product_id, quantity, price) AS (VALUES {values}),
+    locked AS (
+        -- Lock in id order so concurrent checkouts cannot deadlock
+        SELECT p.id, p.price, p.is_active FROM products_product p
+        JOIN wanted w ON w.product_id = p.id
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ),
+    checked AS (
+        SELECT w.product_id, w.quantity, (w.price IS NULL OR (l.price = w.price AND l.is_active)) AS price_ok
+        FROM wanted w
+        JOIN locked l ON l.id = w.product_id
+    ),
+    taken AS (
+        UPDATE products_product p
+        SET stock_quantity = p.stock_quantity - c.quantity
+        FROM checked c
+        WHERE p.id = c.product_id AND c.price_ok AND p.stock_quantity >= c.quantity
+        RETURNING p.id
+    )
+    SELECT c.product_id, c.price_ok, t.id IS NOT NULL
+    FROM checked c
+    LEFT JOIN taken t ON t.id = c.product_id
+"""
+
+CONSUME_HOLD_SQL = """
+    DELETE FROM orders_inventoryreservation
+    WHERE hold_id = %s
+    RETURNING product_id, quantity
+"""
+
+# Deletes the owner's holds and puts their units back; returns the payment
+# intents they were for. The products of the new hold are locked together
+# with the released ones, all in id order, so taking the new hold in the same
+# transaction acquires no further locks and cannot deadlock.
+RELEASE_OWNER_HOLDS_SQL = """
+    WITH released AS (
+        DELETE FROM orders_inventoryreservation
+        WHERE owner = %s
+        RETURNING product_id, quantity, payment_intent_id
+    ),
+    totals AS (
+        SELECT product_id, SUM(quantity) AS quantity FROM released GROUP BY product_id
+    ),
+    locked AS (
+        SELECT p.id FROM products_product p
+        WHERE p.id IN (SELECT product_id FROM totals) OR p.id = ANY(%s::integer[])
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ),
+    restocked AS (
+        UPDATE products_product p
+        SET stock_quantity = p.stock_quantity + t.quantity
+        FROM totals t, locked l
+        WHERE p.id = t.product_id AND l.id = p.id
+    )
+    SELECT DISTINCT payment_intent_id FROM released WHERE payment_intent_id <> ''
+"""
+
+# One statement per batch: delete expired holds and put their units back.
+# SKIP LOCKED leaves holds that are being converted right now to the order.
+# Products are locked in id order, like the other stock updates, so concurrent
+# sweeps and checkouts cannot deadlock on them.
+RELEASE_EXPIRED_HOLDS_SQL = """
+    WITH expired AS (
+        DELETE FROM orders_inventoryreservation
+        WHERE id IN (
+            SELECT id FROM orders_inventoryreservation
+            WHERE expires_at <= %s
+            ORDER BY expires_at
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING product_id, quantity
+    ),
+    released AS (
+        SELECT product_id, SUM(quantity) AS quantity FROM expired GROUP BY product_id
+    ),
+    locked AS (
+        SELECT p.id FROM products_product p
+        WHERE p.id IN (SELECT product_id FROM released)
+        ORDER BY p.id
+        FOR UPDATE OF p
+    ),
+    restocked AS (
+        UPDATE products_product p
+        SET stock_quantity = p.stock_quantity + r.quantity
+        FROM released r, locked l
+        WHERE p.id = r.product_id AND l.id = p.id
+    )
+    SELECT COUNT(*) FROM expired
+"""
+
+
+class InsufficientStock(Exception):
+    """Raised when at least one order line cannot be covered by current stock"""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f'Insufficient stock for product ID {", ".join(map(str, self.product_ids))}')
+
+
+class HoldTooLarge(Exception):
+    """Raised when a checkout asks to hold more units than INVENTORY_HOLD_MAX_* allow"""
+
+
+class PriceChanged(Exception):
+    """Raised when a priced line no longer matches the catalog price, or its product was withdrawn"""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(
+            f'Price or availability changed for product ID {", ".join(map(str, self.product_ids))}, '
+            'please review your cart'
+        )
+
+
+def sum_quantities(items_data):
+    """{product_id: total quantity} for a list of order lines"""
+    quantities = OrderedDict()
+    for item_data in items_data:
+        product_id = item_data['product_id']
+        quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+    return quantities
+
+
+def take_stock(quantities, prices=None):
+    """
+    Take {product_id: quantity} out of stock in one statement
+    With prices ({product_id: price}) the products must also still sell at
+    those prices. Must run inside a transaction; raises PriceChanged or
+    InsufficientStock (and changes nothing that survives the rollback).
+    """
+    if not quantities:
+        return
+
+    prices = prices or {}
+    values = ', '.join(['(%s::integer, %s::integer, %s::numeric)'] * len(quantities))
+    params = [
+        value
+        for product_id, quantity in quantities.items()
+        for value in (product_id, quantity, prices.get(product_id))
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(DECREMENT_STOCK_SQL.format(values=values), params)
+        rows = cursor.fetchall()
+
+    repriced = {product_id for product_id, price_ok, _ in rows if not price_ok}
+    if repriced:
+        raise PriceChanged(repriced)
+    taken = {product_id for product_id, _, was_taken in rows if was_taken}
+    if len(taken) != len(quantities):
+        raise InsufficientStock(set(quantities) - taken)
+
+
+def get_prices(items_data):
+    """{product_id: price} for a list of priced order lines"""
+    return {item_data['product_id']: item_data['price'] for item_data in items_data}
+
+
+def check_hold_size(items_data):
+    """Raise HoldTooLarge unless the lines fit within the per-product and per-cart hold limits"""
+    quantities = sum_quantities(items_data)
+    over_limit = [
+        product_id for product_id, quantity in quantities.items()
+        if quantity > settings.INVENTORY_HOLD_MAX_LINE_QUANTITY
+    ]
+    if over_limit:
+        raise HoldTooLarge(
+            f'At most {settings.INVENTORY_HOLD_MAX_LINE_QUANTITY} units per product can be ordered '
+            f'(product ID {", ".join(map(str, over_limit))})'
+        )
+    if sum(quantities.values()) > settings.INVENTORY_HOLD_MAX_QUANTITY:
+        raise HoldTooLarge(f'At most {settings.INVENTORY_HOLD_MAX_QUANTITY} units can be ordered at once')
+
+
+def place_hold(items_data, owner='', payment_intent_id=''):
+    """
+    Reserve the quoted lines for INVENTORY_HOLD_TTL seconds and return the hold id
+    Must run inside a transaction; raises PriceChanged or InsufficientStock.
+    """
+    quantities = sum_quantities(items_data)
+    take_stock(quantities, get_prices(items_data))
+
+    hold_id = uuid.uuid4()
+    expires_at = timezone.now() + timedelta(seconds=settings.INVENTORY_HOLD_TTL)
+    InventoryReservation.objects.bulk_create([
+        InventoryReservation(
+            hold_id=hold_id, product_id=product_id, quantity=quantity, expires_at=expires_at,
+            owner=owner, payment_intent_id=payment_intent_id
+        )
+        for product_id, quantity in quantities.items()
+    ])
+    return hold_id
+
+
+def release_owner_holds(owner, items_data):
+    """
+    Return the owner's holds to stock before the lines of their new hold are taken
+    Must run in the transaction that then calls place_hold(). Returns the
+    payment intent ids the released holds were taken for.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RELEASE_OWNER_HOLDS_SQL, [owner, list(sum_quantities(items_data))])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def consume_hold(hold_id):
+    """Delete a hold and return the {product_id: quantity} it still had reserved"""
+    with connection.cursor() as cursor:
+        cursor.execute(CONSUME_HOLD_SQL, [str(hold_id)])
+        held = {}
+        for product_id, quantity in cursor.fetchall():
+            held[product_id] = held.get(product_id, 0) + quantity
+    return held
+
+
+def release_expired_holds(batch_size):
+    """Return one batch of expired holds to stock; returns the number of released rows"""
+    with connection.cursor() as cursor:
+        cursor.execute(RELEASE_EXPIRED_HOLDS_SQL, [timezone.now(), batch_size])
+        return cursor.fetchone()[0]
+
+
+def place_order_items(order, items_data, hold_id=None):
+    """
+    Take stock for and bulk-insert the items of a freshly created order
+    items_data: [{'product_id': 1, 'quantity': 2, 'price': Decimal('8.99')}, ...]
+    Units reserved by the hold are converted; only the rest is taken from stock
+    (all of it when the hold has already expired and been released). The
+    prices of a held quote were checked when the hold was taken; without a
+    hold they are checked now.
+    """
+    quantities = sum_quantities(items_data)
+    held = consume_hold(hold_id) if hold_id else {}
+    take_stock(OrderedDict(
+        (product_id, quantity - held.get(product_id, 0))
+        for product_id, quantity in quantities.items()
+        if quantity > held.get(product_id, 0)
+    ), None if hold_id else get_prices(items_data))
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT set_config(%s, %s, true)', [STOCK_APPLIED_SETTING, str(order.pk)])
+
+    # bulk_create skips OrderItem.save(), so the subtotal is computed here
+    return OrderItem.objects.bulk_create([
+        OrderItem(order=order, subtotal=item_data['price'] * item_data['quantity'], **item_data)
+        for item_data in items_data
+    ])
@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from orders.archive import ARCHIVABLE_STATUSES, archive_orders, get_archive_cutoff
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Move delivered and cancelled orders older than N months into the order archive (run monthly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=settings.ORDER_ARCHIVE_AFTER_MONTHS,
+            help=f'Archive orders created before the start of the month this many months ago '
+                 f'(default: {settings.ORDER_ARCHIVE_AFTER_MONTHS})'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Orders moved per statement and transaction (default: 5000)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only count the orders that would be archived'
+        )
+
+    def handle(self, *args, **kwargs):
+        cutoff = get_archive_cutoff(kwargs['months'])
+        if kwargs['dry_run']:
+            count = Order.objects.filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff).count()
+            self.stdout.write(self.style.SUCCESS(f'{count} orders created before {cutoff:%Y-%m-%d} would be archived'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'Archiving finished orders created before {cutoff:%Y-%m-%d}...'))
+        started = time.perf_counter()
+
+        order_total = item_total = 0
+        while True:
+            order_count, item_count = archive_orders(cutoff, kwargs['batch_size'])
+            if not order_count:
+                break
+            order_total += order_count
+            item_total += item_count
+            self.stdout.write(f'… {order_total} orders archived')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Archiving complete!'))
+        self.stdout.write(f'Orders archived: {order_total}')
+        self.stdout.write(f'Items archived: {item_total}')
+        self.stdout.write(f'Elapsed: {time.perf_counter() - started:.2f}s')
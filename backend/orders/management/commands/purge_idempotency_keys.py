@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Delete expired checkout idempotency keys (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Number of keys deleted per statement (default: 5000)'
+        )
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        now = timezone.now()
+        deleted_count = 0
+
+        while True:
+            # Short deletes keep locks brief while checkouts keep writing keys
+            batch = list(
+                IdempotencyKey.objects.filter(expires_at__lte=now).values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            deleted_count += IdempotencyKey.objects.filter(id__any=batch).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Purged {deleted_count} expired idempotency keys'))
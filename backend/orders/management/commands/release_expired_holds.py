@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+from orders.inventory import release_expired_holds
+from products.cache import invalidate_catalog
+
+
+class Command(BaseCommand):
+    help = 'Return stock held by checkouts that never became orders (run every minute, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Reservations released per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help='Keep running and sweep every SECONDS seconds instead of once'
+        )
+
+    def handle(self, *args, **kwargs):
+        while True:
+            released_count = self.sweep(kwargs['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✅ Released {released_count} expired reservations'))
+            if not kwargs['loop']:
+                break
+            time.sleep(kwargs['loop'])
+
+    def sweep(self, batch_size):
+        released_count = 0
+        while True:
+            # Each batch is its own short transaction (autocommit)
+            released = release_expired_holds(batch_size)
+            released_count += released
+            if released < batch_size:
+                break
+        if released_count:
+            # Released units are available in the catalog again
+            invalidate_catalog(stock_only=True)
+        return released_count
@@ -0,0 +1,158 @@
+import json
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+from django.core.management.base import BaseCommand
+
+
+class StubState:
+    def __init__(self, latency, jitter, failure_rate):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.intents = {}
+        self.idempotent_responses = {}
+        self.lock = threading.Lock()
+
+
+def parse_form(body):
+    """Decode Stripe's form encoding (metadata[key]=value, automatic_payment_methods[enabled]=true)"""
+    data = {}
+    for key, value in parse_qsl(body, keep_blank_values=True):
+        if '[' in key:
+            outer, inner = key.rstrip(']').split('[', 1)
+            data.setdefault(outer, {})[inner] = value
+        else:
+            data[key] = value
+    return data
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    """Just enough of the PaymentIntents API for checkout load tests"""
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status_code, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Request-Id', f'req_stub_{secrets.token_hex(6)}')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate_network(self):
+        """Sleep for the configured latency; return True when this request should fail"""
+        delay = self.state.latency + random.uniform(0, self.state.jitter)
+        if delay:
+            time.sleep(delay / 1000)
+        return random.random() < self.state.failure_rate
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length).decode('utf-8')
+
+        path = self.path.rstrip('/')
+        if path.startswith('/v1/payment_intents/') and path.endswith('/cancel'):
+            return self.cancel(path[len('/v1/payment_intents/'):-len('/cancel')])
+        if path != '/v1/payment_intents':
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+
+        if self.simulate_network():
+            return self.send_json(500, {'error': {'type': 'api_error', 'message': 'Simulated failure'}})
+
+        idempotency_key = self.headers.get('Idempotency-Key')
+        with self.state.lock:
+            if idempotency_key and idempotency_key in self.state.idempotent_responses:
+                return self.send_json(200, self.state.idempotent_responses[idempotency_key])
+
+        data = parse_form(body)
+        try:
+            amount = int(data.get('amount', ''))
+        except ValueError:
+            return self.send_json(400, {'error': {'type': 'invalid_request_error', 'message': 'Missing amount'}})
+
+        intent_id = f'pi_stub_{secrets.token_hex(12)}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': amount,
+            'currency': data.get('currency', 'usd'),
+            'metadata': data.get('metadata', {}),
+            'status': 'requires_payment_method',
+            'client_secret': f'{intent_id}_secret_{secrets.token_hex(8)}',
+            'created': int(time.time()),
+            'livemode': False,
+        }
+        with self.state.lock:
+            self.state.intents[intent_id] = intent
+            if idempotency_key:
+                self.state.idempotent_responses[idempotency_key] = intent
+        self.send_json(200, intent)
+
+    def cancel(self, intent_id):
+        with self.state.lock:
+            intent = self.state.intents.get(intent_id)
+            if intent is not None:
+                intent['status'] = 'canceled'
+        if intent is None:
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent'}})
+        self.send_json(200, intent)
+
+    def do_GET(self):
+        prefix = '/v1/payment_intents/'
+        if not self.path.startswith(prefix):
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'Unknown path'}})
+        if self.simulate_network():
+            return self.send_json(500, {'error': {'type': 'api_error', 'message': 'Simulated failure'}})
+
+        intent = self.state.intents.get(self.path[len(prefix):].rstrip('/'))
+        if intent is None:
+            return self.send_json(404, {'error': {'type': 'invalid_request_error', 'message': 'No such payment_intent'}})
+        self.send_json(200, intent)
+
+
+class Command(BaseCommand):
+    help = 'Run a local stub of the Stripe PaymentIntents API for checkout load tests (no network needed)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on (default: 127.0.0.1)')
+        parser.add_argument('--port', type=int, default=12111, help='Port to listen on (default: 12111)')
+        parser.add_argument(
+            '--latency', type=float, default=0,
+            help='Milliseconds added to every response (default: 0)'
+        )
+        parser.add_argument(
+            '--jitter', type=float, default=0,
+            help='Random extra milliseconds (0..jitter) added to every response (default: 0)'
+        )
+        parser.add_argument(
+            '--failure-rate', type=float, default=0,
+            help='Fraction of requests answered with a 500 error, e.g. 0.1 (default: 0)'
+        )
+
+    def handle(self, *args, **kwargs):
+        handler = type('Handler', (StripeStubHandler,), {
+            'state': StubState(kwargs['latency'], kwargs['jitter'], kwargs['failure_rate']),
+        })
+        server = ThreadingHTTPServer((kwargs['host'], kwargs['port']), handler)
+        server.daemon_threads = True
+
+        address = f"http://{kwargs['host']}:{kwargs['port']}"
+        self.stdout.write(self.style.SUCCESS(f'🧪 Stripe stub listening on {address}'))
+        self.stdout.write(f'Start the backend with STRIPE_API_BASE={address} and any STRIPE_SECRET_KEY (e.g. sk_test_stub)')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write('Stripe stub stopped')
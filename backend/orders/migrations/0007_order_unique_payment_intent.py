@@ -0,0 +1,41 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Orders that share a payment intent are duplicates of one payment. The oldest
+# order keeps the intent; the others lose it (so the constraint can be added)
+# and get a note naming the payment and the order that kept it. Nothing is
+# deleted or cancelled: staff review the noted orders and refund or cancel
+# them (search the notes for "Duplicate order for payment").
+RELEASE_DUPLICATE_INTENTS_SQL = """
+    UPDATE orders_order o
+    SET notes = CONCAT_WS(
+            E'\\n', NULLIF(o.notes, ''),
+            'Duplicate order for payment ' || o.payment_intent_id || ' (kept by order #' || d.kept_id || ')'
+        ),
+        payment_intent_id = ''
+    FROM (
+        SELECT id, MIN(id) OVER (PARTITION BY payment_intent_id) AS kept_id
+        FROM orders_order
+        WHERE payment_intent_id <> ''
+    ) d
+    WHERE o.id = d.id AND d.id <> d.kept_id
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_orderarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunSQL(RELEASE_DUPLICATE_INTENTS_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('payment_intent_id', ''), _negated=True), fields=('payment_intent_id',), name='order_unique_payment_intent'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_unique_payment_intent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryreservation',
+            name='owner',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='inventoryreservation',
+            name='payment_intent_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
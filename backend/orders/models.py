@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
 from products.models import Product
 from decimal import Decimal
+from .pricing import recalculate_totals
 
 
 class Order(models.Model):
@@ -45,19 +47,31 @@ class Order(models.Model):
     class Meta:
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['user', '-created_at']),
+            # Keyset pagination indexes for the -created_at listing (id breaks ties)
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_id_idx'),
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
             models.Index(fields=['status']),
         ]
+        constraints = [
+            # A payment (and the quote and hold behind it) pays for one order only
+            models.UniqueConstraint(
+                fields=['payment_intent_id'], condition=~models.Q(payment_intent_id=''),
+                name='order_unique_payment_intent'
+            ),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user.username} - {self.status}"
 
     def calculate_totals(self):
-        """Calculate order totals from order items"""
-        self.subtotal = sum(item.subtotal for item in self.items.all())
-        self.tax = self.subtotal * Decimal('0.08')  # 8% tax
-        self.total = self.subtotal + self.tax + self.shipping_cost
-        self.save()
+        """
+        Calculate order totals from order items
+        Summed and written by one UPDATE (orders/pricing.py); only the total
+        columns change, so no full save() and no status trigger.
+        """
+        changed = recalculate_totals(self.pk, self.pk)
+        if self.pk in changed:
+            self.subtotal, self.tax, self.total, self.updated_at = changed[self.pk]
 
 
 class OrderItem(models.Model):
@@ -81,3 +95,113 @@ class OrderItem(models.Model):
         """Calculate subtotal before saving"""
         self.subtotal = self.price * self.quantity
         super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """Stored response of a checkout request sent with an Idempotency-Key header (see orders/idempotency.py)"""
+    scope = models.CharField(max_length=100, help_text="Endpoint and user the key belongs to")
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    
+    # Both empty while the request that claimed the key is still running
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
+
+
+class InventoryReservation(models.Model):
+    """
+    Units held for a checkout between payment intent and order (see orders/inventory.py)
+    Held units are already taken out of Product.stock_quantity.
+    """
+    hold_id = models.UUIDField(db_index=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.IntegerField(validators=[MinValueValidator(1)])
+    
+    # Shopper the hold belongs to ('user:<id>' or 'session:<key>'); a new hold replaces theirs
+    owner = models.CharField(max_length=100, blank=True, db_index=True)
+    payment_intent_id = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} held until {self.expires_at}"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Delivered and cancelled orders moved out of orders_order by archive_orders
+    Same columns and ids as Order, so the hot table and its indexes only hold
+    recent and open orders. Archived orders are read-only.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    
+    shipping_name = models.CharField(max_length=200, default='')
+    shipping_address = models.TextField()
+    shipping_city = models.CharField(max_length=100)
+    shipping_state = models.CharField(max_length=100)
+    shipping_zip = models.CharField(max_length=20)
+    shipping_phone = models.CharField(max_length=20)
+    
+    payment_intent_id = models.CharField(max_length=255, blank=True)
+    
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    tax = models.DecimalField(max_digits=10, decimal_places=2)
+    shipping_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    notes = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='archorder_user_created_id_idx'),
+            models.Index(fields=['created_at'], name='archorder_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.status}"
+
+
+class ArchivedOrderItem(models.Model):
+    """Items of an ArchivedOrder (same ids as the OrderItem rows they replace)"""
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+')
+    
+    quantity = models.IntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product.name}"
@@ -0,0 +1,182 @@
+"""
+Server-side checkout pricing
+
+build_quote() prices a cart from the database, never from client-supplied
+prices: all product ids are resolved in one query, or straight from an
+in-process price map that is dropped whenever the catalog price version moves
+on (see products/cache.py), and at least every PRICE_MAP_TTL seconds for
+writes that do not move it. Placing a hold or an order re-checks the prices
+on the locked product rows (orders/inventory.py). The resulting quote is
+signed so that order creation can reuse it instead of pricing the cart a
+second time.
+
+recalculate_totals() re-totals stored orders from their items entirely in
+SQL, one statement for any range of orders.
+"""
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+from products.cache import get_price_version
+from products.models import Product
+
+
+TAX_RATE = Decimal('0.08')  # 8% tax
+SHIPPING_COST = Decimal('5.00')  # Flat rate
+CENT = Decimal('0.01')
+
+QUOTE_SALT = 'orders.quote'
+
+# Only rows whose totals actually change are written (and get a new updated_at)
+RECALCULATE_TOTALS_SQL = """
+    UPDATE orders_order o
+    SET subtotal = t.subtotal,
+        tax = t.tax,
+        total = t.subtotal + t.tax + o.shipping_cost,
+        updated_at = NOW()
+    FROM (
+        SELECT s.order_id, s.subtotal, ROUND(s.subtotal * %(tax_rate)s, 2) AS tax
+        FROM (
+            SELECT o2.id AS order_id, COALESCE(SUM(oi.subtotal), 0) AS subtotal
+            FROM orders_order o2
+            LEFT JOIN orders_orderitem oi ON oi.order_id = o2.id
+            WHERE o2.id >= %(first_id)s AND o2.id <= %(last_id)s
+            GROUP BY o2.id
+        ) s
+    ) t
+    WHERE o.id = t.order_id
+      AND (o.subtotal, o.tax, o.total) IS DISTINCT FROM (t.subtotal, t.tax, t.subtotal + t.tax + o.shipping_cost)
+    RETURNING o.id, o.subtotal, o.tax, o.total, o.updated_at
+"""
+
+
+class QuoteError(Exception):
+    """The cart cannot be priced, or a quote token is invalid or expired"""
+
+
+class PriceMap:
+    """Process-wide cache of {product_id: (name, price, is_active)}"""
+
+    def __init__(self):
+        self.version = None
+        self.expires_at = 0
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, product_ids):
+        version = get_price_version()
+        with self.lock:
+            if version != self.version or time.monotonic() >= self.expires_at:
+                self.entries = {}
+                self.version = version
+                self.expires_at = time.monotonic() + settings.PRICE_MAP_TTL
+            found = {pid: self.entries[pid] for pid in product_ids if pid in self.entries}
+
+        missing = [pid for pid in product_ids if pid not in found]
+        if missing:
+            loaded = {
+                pid: (name, price, is_active)
+                for pid, name, price, is_active in Product.objects.filter(id__any=missing).values_list(
+                    'id', 'name', 'price', 'is_active'
+                ).order_by()
+            }
+            with self.lock:
+                # Only keep what was read under the version that is still current
+                if self.version == version:
+                    self.entries.update(loaded)
+            found.update(loaded)
+        return found
+
+
+price_map = PriceMap()
+
+
+def quantize(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def build_quote(cart_items):
+    """
+    Price [{'product_id': 1, 'quantity': 2}, ...] with current catalog prices
+    Returns a dict of priced lines and totals (Decimals); raises QuoteError.
+    """
+    if not cart_items:
+        raise QuoteError('Cart is empty')
+
+    lines = []
+    for item in cart_items:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+        except (KeyError, TypeError, ValueError):
+            raise QuoteError('Each cart item needs a product_id and a quantity')
+        if quantity < 1:
+            raise QuoteError(f'Invalid quantity for product ID {product_id}')
+        lines.append((product_id, quantity))
+
+    prices = price_map.get({product_id for product_id, _ in lines})
+
+    items = []
+    for product_id, quantity in lines:
+        if product_id not in prices:
+            raise QuoteError(f'Product ID {product_id} does not exist')
+        name, price, is_active = prices[product_id]
+        if not is_active:
+            raise QuoteError(f'{name} is no longer available')
+        items.append({'product_id': product_id, 'quantity': quantity, 'price': price})
+
+    subtotal = sum((item['price'] * item['quantity'] for item in items), Decimal('0.00'))
+    tax = quantize(subtotal * TAX_RATE)
+    return {
+        'items': items,
+        'subtotal': subtotal,
+        'tax': tax,
+        'shipping': SHIPPING_COST,
+        'total': subtotal + tax + SHIPPING_COST,
+    }
+
+
+def sign_quote(quote, **extra):
+    """Return a tamper-proof token for the quote (plus extra values such as the payment intent id)"""
+    payload = {
+        'items': [[item['product_id'], item['quantity'], str(item['price'])] for item in quote['items']],
+        'subtotal': str(quote['subtotal']),
+        'tax': str(quote['tax']),
+        'shipping': str(quote['shipping']),
+        'total': str(quote['total']),
+        **extra,
+    }
+    return signing.dumps(payload, salt=QUOTE_SALT, compress=True)
+
+
+def load_quote(token):
+    """Return the quote signed into token; raises QuoteError if it was altered or has expired"""
+    try:
+        payload = signing.loads(token, salt=QUOTE_SALT, max_age=settings.QUOTE_MAX_AGE)
+    except signing.SignatureExpired:
+        raise QuoteError('Quote has expired, please review your cart again')
+    except signing.BadSignature:
+        raise QuoteError('Invalid quote')
+
+    quote = {key: value for key, value in payload.items() if key != 'items'}
+    for key in ('subtotal', 'tax', 'shipping', 'total'):
+        quote[key] = Decimal(payload[key])
+    quote['items'] = [
+        {'product_id': product_id, 'quantity': quantity, 'price': Decimal(price)}
+        for product_id, quantity, price in payload['items']
+    ]
+    return quote
+
+
+def recalculate_totals(first_id, last_id):
+    """
+    Re-total the orders with first_id <= id <= last_id from their items in one statement
+    Returns {order_id: (subtotal, tax, total, updated_at)} for the orders that changed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RECALCULATE_TOTALS_SQL, {'tax_rate': TAX_RATE, 'first_id': first_id, 'last_id': last_id})
+        return {row[0]: row[1:] for row in cursor.fetchall()}
@@ -1,20 +1,90 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
-from .models import Order, OrderItem
+from .inventory import InsufficientStock, PriceChanged, place_order_items
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .pricing import QuoteError, build_quote, load_quote
+from products.cache import invalidate_catalog
 from products.serializers import ProductSerializer
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    # Plain id: products are checked (in one query) when the order is priced
+    product = serializers.IntegerField(source='product_id')
     product_name = serializers.CharField(source='product.name', read_only=True)
     
     class Meta:
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'quantity', 'price', 'subtotal']
-        read_only_fields = ['subtotal']
+        # Prices are always set by the server (orders/pricing.py)
+        read_only_fields = ['price', 'subtotal']
+
+
+def order_items_prefetch():
+    """Items with their product names in one query, for OrderSerializer"""
+    return Prefetch('items', queryset=OrderItem.objects.select_related('product').only(
+        'id', 'order_id', 'product_id', 'quantity', 'price', 'subtotal', 'product__name'
+    ))
+
+
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """Order history rows without items; counts are annotated in SQL by OrderViewSet"""
+    item_count = serializers.IntegerField(read_only=True)
+    total_quantity = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'status', 'subtotal', 'tax', 'shipping_cost', 'total',
+            'item_count', 'total_quantity', 'created_at'
+        ]
+
+
+class OrderHistorySerializer(serializers.Serializer):
+    """Rows of get_customer_order_history (orders/history.py)"""
+    id = serializers.IntegerField()
+    status = serializers.CharField()
+    total = serializers.DecimalField(max_digits=10, decimal_places=2)
+    item_count = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    """Body of POST /api/orders/bulk-status/"""
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=50000)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name', read_only=True)
+    
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product', 'product_name', 'quantity', 'price', 'subtotal']
+        read_only_fields = fields
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """Read-only; same shape as OrderSerializer plus archived_at"""
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    username = serializers.CharField(source='user.username', read_only=True)
+    
+    class Meta:
+        model = ArchivedOrder
+        fields = [
+            'id', 'user', 'username', 'status',
+            'shipping_name', 'shipping_address', 'shipping_city', 'shipping_state', 'shipping_zip', 'shipping_phone',
+            'payment_intent_id', 'subtotal', 'tax', 'shipping_cost', 'total',
+            'notes', 'items', 'created_at', 'updated_at', 'archived_at'
+        ]
+        read_only_fields = fields
 
 
 class OrderSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+    items = OrderItemSerializer(many=True, required=False)
     username = serializers.CharField(source='user.username', read_only=True)
+    # Signed quote from create-payment-intent; replaces items and totals when given
+    quote_token = serializers.CharField(write_only=True, required=False)
     
     class Meta:
         model = Order
@@ -23,15 +93,66 @@ class OrderSerializer(serializers.ModelSerializer):
             'shipping_name', 'shipping_address', 'shipping_city', 'shipping_state',
             'shipping_zip', 'shipping_phone', 'payment_intent_id',
             'subtotal', 'tax', 'shipping_cost', 'total',
-            'notes', 'items', 'created_at', 'updated_at'
+            'notes', 'items', 'quote_token', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['created_at', 'updated_at']
+        read_only_fields = ['subtotal', 'tax', 'shipping_cost', 'total', 'created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        if self.instance is not None:
+            return attrs
+        
+        token = attrs.pop('quote_token', None)
+        items = attrs.pop('items', None)
+        try:
+            if token:
+                # Already priced when the payment intent was created
+                quote = load_quote(token)
+            elif items:
+                quote = build_quote([
+                    {'product_id': item['product_id'], 'quantity': item['quantity']} for item in items
+                ])
+            else:
+                raise serializers.ValidationError({'items': ['An order needs items or a quote_token']})
+        except QuoteError as e:
+            raise serializers.ValidationError({'quote_token' if token else 'items': [str(e)]})
+        
+        quoted_intent = quote.get('payment_intent_id')
+        if quoted_intent and attrs.get('payment_intent_id', quoted_intent) != quoted_intent:
+            raise serializers.ValidationError({'quote_token': ['Quote belongs to another payment']})
+        
+        attrs['quote'] = quote
+        return attrs
     
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        quote = validated_data.pop('quote')
+        items_data = quote['items']
+        validated_data.update(
+            subtotal=quote['subtotal'],
+            tax=quote['tax'],
+            shipping_cost=quote['shipping'],
+            total=quote['total'],
+        )
+        if quote.get('payment_intent_id'):
+            validated_data['payment_intent_id'] = quote['payment_intent_id']
         
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        # One stock UPDATE and one bulk INSERT for all lines; a short line fails the whole order
+        try:
+            with transaction.atomic():
+                order = Order.objects.create(**validated_data)
+                # Converts the stock held for the quote, if any
+                place_order_items(order, items_data, hold_id=quote.get('hold_id'))
+        except IntegrityError as e:
+            # The quote (and its payment) has already been turned into an order
+            if getattr(getattr(e.__cause__, 'diag', None), 'constraint_name', None) != 'order_unique_payment_intent':
+                raise
+            raise serializers.ValidationError({'payment_intent_id': ['An order was already placed for this payment']})
+        except InsufficientStock as e:
+            raise serializers.ValidationError({'items': [str(e)]})
+        except PriceChanged as e:
+            # The price map missed a price write; make every process reload it
+            invalidate_catalog()
+            raise serializers.ValidationError({'items': [str(e)]})
         
+        # The response lists the items with product names; load them in one query
+        prefetch_related_objects([order], order_items_prefetch())
         return order
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .history import invalidate_order_history
+from .models import Order, OrderItem
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def invalidate_history_on_order_change(sender, instance, **kwargs):
+    """New, edited (including admin status changes) and deleted orders invalidate the owner's history"""
+    invalidate_order_history(instance.user_id)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_history_on_item_change(sender, instance, **kwargs):
+    """Item counts are part of the history (bulk-created items are covered by their order's save)"""
+    invalidate_order_history(instance.order.user_id)
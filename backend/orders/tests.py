@@ -1,3 +1,267 @@
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+from .models import IdempotencyKey, InventoryReservation, Order, OrderItem
+from .inventory import place_hold
+from .pricing import build_quote, price_map, sign_quote
+
+
+class OrderQueryCountTests(TestCase):
+    """The order endpoints must run the same number of queries for any number of orders or items"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', password='secret')
+        category = Category.objects.create(name='Pain Relief')
+        cls.products = [
+            Product.objects.create(
+                name=f'Product {i}', description='Test product', category=category,
+                price=Decimal('4.99'), stock_quantity=100
+            )
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_order(self, item_count):
+        order = Order.objects.create(
+            user=self.user, shipping_name='Test Shopper', shipping_address='1 Main St',
+            shipping_city='Springfield', shipping_state='IL', shipping_zip='62701',
+            shipping_phone='555-0100'
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=self.products[i % len(self.products)],
+                      quantity=2, price=Decimal('4.99'), subtotal=Decimal('9.98'))
+            for i in range(item_count)
+        ])
+        return order
+
+    def test_summary_list(self):
+        self.create_order(1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/', {'mode': 'summary'})
+        self.assertEqual(response.data['results'][0]['item_count'], 1)
+
+        for _ in range(5):
+            self.create_order(20)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/orders/', {'mode': 'summary'})
+
+        order = response.data['results'][0]
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(order['item_count'], 20)
+        self.assertEqual(order['total_quantity'], 40)
+        self.assertNotIn('items', order)
+
+    def test_detail_list(self):
+        self.create_order(1)
+        with self.assertNumQueries(2):
+            self.client.get('/api/orders/')
+
+        for _ in range(5):
+            self.create_order(20)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/orders/')
+
+        order = response.data['results'][0]
+        self.assertEqual(order['username'], 'shopper')
+        self.assertEqual(len(order['items']), 20)
+        self.assertEqual(order['items'][0]['product_name'], 'Product 0')
+
+    def test_retrieve(self):
+        small = self.create_order(1)
+        large = self.create_order(50)
+        for order in (small, large):
+            with self.assertNumQueries(2):
+                response = self.client.get(f'/api/orders/{order.pk}/')
+            self.assertEqual(len(response.data['items']), order.items.count())
+
+
+class OrderPlacementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', password='secret')
+        category = Category.objects.create(name='Pain Relief')
+        cls.product = Product.objects.create(
+            name='Ibuprofen', description='Test product', category=category,
+            price=Decimal('4.99'), stock_quantity=10
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place_order(self, **data):
+        return self.client.post('/api/orders/', {
+            'user': self.user.pk, 'shipping_name': 'Test Shopper', 'shipping_address': '1 Main St',
+            'shipping_city': 'Springfield', 'shipping_state': 'IL', 'shipping_zip': '62701',
+            'shipping_phone': '555-0100', 'items': [{'product': self.product.pk, 'quantity': 2}],
+            **data,
+        }, format='json')
+
+    def test_price_written_without_invalidation(self):
+        price_map.get({self.product.pk})
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE products_product SET price = 5.49 WHERE id = %s', [self.product.pk])
+
+        # The price map still has the old price; the locked row does not
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.place_order()
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items', response.data)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 10)
+
+        # The rejection dropped the stale price map
+        response = self.place_order()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('10.98'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 8)
+
+    def test_one_order_per_payment(self):
+        quote = build_quote([{'product_id': self.product.pk, 'quantity': 2}])
+        hold_id = place_hold(quote['items'])
+        token = sign_quote(quote, payment_intent_id='pi_test', hold_id=str(hold_id))
+
+        response = self.place_order(quote_token=token)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['payment_intent_id'], 'pi_test')
+
+        response = self.place_order(quote_token=token)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('payment_intent_id', response.data)
+        self.assertEqual(Order.objects.filter(payment_intent_id='pi_test').count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 8)
+
+
+@mock.patch('orders.views.cancel_payment_intent')
+class PaymentIntentHoldTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='shopper', password='secret')
+        category = Category.objects.create(name='Pain Relief')
+        cls.product = Product.objects.create(
+            name='Ibuprofen', description='Test product', category=category,
+            price=Decimal('4.99'), stock_quantity=20
+        )
+
+    def create_intent(self, client, quantity, intent_id, **headers):
+        with mock.patch('orders.views.create_payment_intent', return_value=SimpleNamespace(
+            id=intent_id, client_secret=f'{intent_id}_secret'
+        )) as create_intent:
+            response = client.post('/api/create-payment-intent/', {
+                'cart_items': [{'product_id': self.product.pk, 'quantity': quantity}],
+            }, format='json', headers=headers)
+        self.stripe_calls = create_intent.call_args_list
+        return response
+
+    def assert_held(self, quantity):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 20 - quantity)
+        self.assertEqual(
+            sum(InventoryReservation.objects.values_list('quantity', flat=True)), quantity
+        )
+
+    def test_new_checkout_replaces_the_users_hold(self, cancel_intent):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(self.create_intent(client, 3, 'pi_first').status_code, 200)
+        self.assertEqual(self.create_intent(client, 2, 'pi_second').status_code, 200)
+        self.assert_held(2)
+        cancel_intent.assert_called_once_with('pi_first')
+
+    def test_anonymous_holds_are_kept_per_session(self, cancel_intent):
+        client = APIClient()
+        self.assertEqual(self.create_intent(client, 3, 'pi_first').status_code, 200)
+        self.assertEqual(self.create_intent(client, 2, 'pi_second').status_code, 200)
+        self.assert_held(2)
+
+        # Another shopper's checkout leaves this hold alone
+        self.assertEqual(self.create_intent(APIClient(), 1, 'pi_other').status_code, 200)
+        self.assert_held(3)
+
+    def test_hold_size_is_capped(self, cancel_intent):
+        response = self.create_intent(APIClient(), 11, 'pi_large')
+        self.assertEqual(response.status_code, 400)
+        self.assert_held(0)
+
+    def test_idempotency_key_replays_the_response(self, cancel_intent):
+        client = APIClient()
+        response = self.create_intent(client, 3, 'pi_first', **{'Idempotency-Key': 'checkout-1'})
+        self.assertEqual(response.status_code, 200)
+
+        replayed = self.create_intent(client, 3, 'pi_second', **{'Idempotency-Key': 'checkout-1'})
+        self.assertEqual(replayed.status_code, 200)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+        self.assertEqual(replayed.data['client_secret'], 'pi_first_secret')
+        self.assertEqual(self.stripe_calls, [])
+        self.assert_held(3)
+
+    def test_stale_quote_is_not_replayed(self, cancel_intent):
+        client = APIClient()
+        with self.settings(QUOTE_MAX_AGE=600):
+            response = self.create_intent(client, 3, 'pi_first', **{'Idempotency-Key': 'checkout-5'})
+        stored = IdempotencyKey.objects.get(key='checkout-5')
+        self.assertLessEqual(stored.expires_at, timezone.now() + timedelta(seconds=300))
+        self.assertIn('quote_expires_at', response.data)
+
+        # Past the replay window the key runs again, with a fresh quote and hold
+        IdempotencyKey.objects.filter(pk=stored.pk).update(expires_at=timezone.now())
+        response = self.create_intent(client, 3, 'pi_second', **{'Idempotency-Key': 'checkout-5'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(response.data['client_secret'], 'pi_second_secret')
+        self.assert_held(3)
+
+    def test_key_is_not_claimed_inside_a_transaction(self, cancel_intent):
+        # Stripe must be called with no transaction (and no row lock) left open by the decorator
+        outer_blocks = len(connection.atomic_blocks)
+        blocks_during_call = []
+
+        def create_intent(**kwargs):
+            blocks_during_call.append(len(connection.atomic_blocks))
+            self.assertTrue(IdempotencyKey.objects.filter(key='checkout-2', status_code__isnull=True).exists())
+            return SimpleNamespace(id='pi_first', client_secret='pi_first_secret')
+
+        with mock.patch('orders.views.create_payment_intent', side_effect=create_intent):
+            response = APIClient().post('/api/create-payment-intent/', {
+                'cart_items': [{'product_id': self.product.pk, 'quantity': 1}],
+            }, format='json', headers={'Idempotency-Key': 'checkout-2'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(blocks_during_call, [outer_blocks])
+        self.assertEqual(IdempotencyKey.objects.get(key='checkout-2').status_code, 200)
+
+    def test_failed_request_releases_the_key(self, cancel_intent):
+        client = APIClient()
+        response = self.create_intent(client, 11, 'pi_large', **{'Idempotency-Key': 'checkout-3'})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(key='checkout-3').exists())
+
+    def test_retry_after_a_failed_attempt_gets_a_new_intent(self, cancel_intent):
+        client = APIClient()
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=2)
+        response = self.create_intent(client, 3, 'pi_first', **{'Idempotency-Key': 'checkout-4'})
+        self.assertEqual(response.status_code, 409)
+        cancel_intent.assert_called_once_with('pi_first')
 
-# Create your tests here.
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=20)
+        response = self.create_intent(client, 3, 'pi_second', **{'Idempotency-Key': 'checkout-4'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['client_secret'], 'pi_second_secret')
+        # The client's key is never reused for Stripe, which would return the cancelled intent
+        self.assertNotIn('idempotency_key', self.stripe_calls[0].kwargs)
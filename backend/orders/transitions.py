@@ -0,0 +1,94 @@
+"""
+Bulk order status transitions
+
+transition_orders() moves any number of orders to a new status with one
+UPDATE. Only orders whose current status allows the move (ALLOWED_TRANSITIONS)
+are changed; the rest are reported as skipped. Cancelling thousands of orders
+therefore fires the statement-level restore_inventory_on_cancel trigger
+(database_schema.sql) once, which restores stock for all cancelled lines
+together instead of once per order.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+
+from products.cache import invalidate_catalog
+from .history import invalidate_order_history
+
+
+# Current status -> statuses it may move to
+ALLOWED_TRANSITIONS = {
+    'pending': ('processing', 'cancelled'),
+    'processing': ('shipped', 'cancelled'),
+    'shipped': ('delivered',),
+    'delivered': (),
+    'cancelled': (),
+}
+
+# One statement: lock the orders (in id order), move the allowed ones and
+# count both groups per previous status
+TRANSITION_SQL = """
+    WITH locked AS (
+        SELECT id, status, user_id FROM orders_order
+        WHERE id = ANY(%(ids)s)
+        ORDER BY id
+        FOR UPDATE
+    ),
+    moved AS (
+        UPDATE orders_order o
+        SET status = %(status)s, updated_at = NOW()
+        FROM locked l
+        WHERE o.id = l.id AND l.status = ANY(%(from_statuses)s)
+        RETURNING o.id
+    )
+    SELECT l.status, m.id IS NOT NULL, COUNT(*), ARRAY_AGG(DISTINCT l.user_id)
+    FROM locked l
+    LEFT JOIN moved m ON m.id = l.id
+    GROUP BY l.status, m.id IS NOT NULL
+"""
+
+
+class InvalidTransition(Exception):
+    """No order status can move to the requested status"""
+
+
+def get_source_statuses(new_status):
+    return [status for status, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+
+def transition_orders(order_ids, new_status):
+    """
+    Move the given orders to new_status where ALLOWED_TRANSITIONS permits it
+    Returns {'updated': {previous status: count}, 'skipped': {previous status: count},
+    'missing': count of ids that matched no order}.
+    """
+    from_statuses = get_source_statuses(new_status)
+    if not from_statuses:
+        raise InvalidTransition(f'Orders cannot be moved to {new_status!r}')
+
+    order_ids = sorted(set(order_ids))
+    updated, skipped = Counter(), Counter()
+    user_ids = set()
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(TRANSITION_SQL, {
+                'ids': order_ids, 'status': new_status, 'from_statuses': from_statuses,
+            })
+            for status, moved, count, users in cursor.fetchall():
+                if moved:
+                    updated[status] = count
+                    user_ids.update(users)
+                else:
+                    skipped[status] = count
+
+        if updated:
+            invalidate_order_history(*user_ids)
+            if new_status == 'cancelled':
+                # The trigger put the cancelled units back into stock
+                invalidate_catalog(stock_only=True)
+
+    return {
+        'updated': dict(updated),
+        'skipped': dict(skipped),
+        'missing': len(order_ids) - sum(updated.values()) - sum(skipped.values()),
+    }
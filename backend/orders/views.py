@@ -1,62 +1,132 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404
+from django.utils import timezone
 from rest_framework import viewsets, permissions, status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
-from .models import Order, OrderItem
-from .serializers import OrderSerializer, OrderItemSerializer
-from mediguide.stripe_utils import create_payment_intent
-from decimal import Decimal
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from .models import ArchivedOrder, Order, OrderItem
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from .serializers import (
+    ArchivedOrderSerializer, BulkStatusSerializer, OrderHistorySerializer, OrderSerializer, OrderItemSerializer, OrderSummarySerializer, order_items_prefetch
+)
+from .history import InvalidCursor, get_order_history
+from .transitions import InvalidTransition, transition_orders
+from .inventory import HoldTooLarge, InsufficientStock, PriceChanged, check_hold_size, place_hold, release_owner_holds
+from .pricing import QuoteError, build_quote, sign_quote
+from .idempotency import idempotent
+from mediguide.pagination import KeysetPagination
+from mediguide.stripe_utils import PaymentGatewayUnavailable, cancel_payment_intent, create_payment_intent
+from products.cache import invalidate_catalog
+
+
+def get_hold_owner(request):
+    """Who an inventory hold belongs to: the signed-in user, or else the session"""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key is None:
+        request.session.create()
+    return f'session:{request.session.session_key}'
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])  # Allow unauthenticated users for now
+# A replay hands out the stored quote_token and hold; only replay while the quote
+# still has at least half of its life left to be paid and turned into an order
+@idempotent('create-payment-intent', ttl=lambda: settings.QUOTE_MAX_AGE // 2)
 def create_payment_intent_view(request):
     """
     Create a Stripe Payment Intent for checkout
+    Prices come from the catalog, not from the request; the response carries a
+    signed quote_token to pass along when creating the order. The quoted units
+    are held for the shopper (INVENTORY_HOLD_TTL) until the order is placed;
+    the shopper's previous hold is released and its payment intent cancelled.
+    Holds are capped by INVENTORY_HOLD_MAX_LINE_QUANTITY and
+    INVENTORY_HOLD_MAX_QUANTITY.
+    Retries may send an Idempotency-Key header to get the same intent back
+    (while the quote is fresh; quote_expires_at tells clients when it lapses).
     Expected request body:
     {
-        "cart_items": [{"product_id": 1, "quantity": 2, "price": 10.99}, ...],
-        "shipping_cost": 5.00
+        "cart_items": [{"product_id": 1, "quantity": 2}, ...]
     }
     """
     try:
-        cart_items = request.data.get('cart_items', [])
-        shipping_cost = Decimal(str(request.data.get('shipping_cost', 0)))
-        
-        if not cart_items:
+        try:
+            quote = build_quote(request.data.get('cart_items', []))
+            check_hold_size(quote['items'])
+        except (QuoteError, HoldTooLarge) as e:
             return Response(
-                {'error': 'Cart is empty'},
+                {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
-        # Calculate totals
-        subtotal = sum(Decimal(str(item['price'])) * item['quantity'] for item in cart_items)
-        tax = subtotal * Decimal('0.08')  # 8% tax
-        total = subtotal + tax + shipping_cost
+        owner = get_hold_owner(request)
         
         # Convert to cents for Stripe
-        amount_cents = int(total * 100)
+        amount_cents = int(quote['total'] * 100)
         
-        # Create payment intent
+        # Create payment intent. The client's Idempotency-Key is not forwarded: the key
+        # already runs this view once (orders/idempotency.py), and a retry after a
+        # failed attempt must not get Stripe's cached, cancelled intent back.
+        # stripe-python keys its own network retries.
         intent = create_payment_intent(
             amount=amount_cents,
             metadata={
-                'subtotal': str(subtotal),
-                'tax': str(tax),
-                'shipping': str(shipping_cost),
-                'total': str(total),
-            }
+                'subtotal': str(quote['subtotal']),
+                'tax': str(quote['tax']),
+                'shipping': str(quote['shipping']),
+                'total': str(quote['total']),
+            },
         )
         
+        # Reserve the stock only now, so hot products are never locked while Stripe is called
+        try:
+            with transaction.atomic():
+                released_intents = release_owner_holds(owner, quote['items'])
+                hold_id = place_hold(quote['items'], owner, intent.id)
+        except (InsufficientStock, PriceChanged) as e:
+            cancel_payment_intent(intent.id)
+            if isinstance(e, PriceChanged):
+                # The price map missed a price write; make every process reload it
+                invalidate_catalog()
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_409_CONFLICT
+            )
+        # The previous checkout's payment can no longer be turned into an order with its hold
+        for previous_intent in released_intents:
+            if previous_intent != intent.id:
+                cancel_payment_intent(previous_intent)
+        # Held units are no longer available in the catalog
+        invalidate_catalog(stock_only=True)
+        
         return Response({
             'client_secret': intent.client_secret,
             'amount': amount_cents,
-            'subtotal': float(subtotal),
-            'tax': float(tax),
-            'shipping': float(shipping_cost),
-            'total': float(total),
+            'subtotal': float(quote['subtotal']),
+            'tax': float(quote['tax']),
+            'shipping': float(quote['shipping']),
+            'total': float(quote['total']),
+            'items': [
+                {'product_id': item['product_id'], 'quantity': item['quantity'], 'price': float(item['price'])}
+                for item in quote['items']
+            ],
+            'quote_token': sign_quote(quote, payment_intent_id=intent.id, hold_id=str(hold_id)),
+            'quote_expires_at': timezone.now() + timedelta(seconds=settings.QUOTE_MAX_AGE),
         })
         
+    except PaymentGatewayUnavailable as e:
+        # Timed out, or the circuit breaker is open: the client may retry later
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -67,15 +137,92 @@ def create_payment_intent_view(request):
 class OrderViewSet(viewsets.ModelViewSet):
     """
     API endpoint for orders
+    Newest first, paginated by opaque cursors (or page numbers with ?page=)
+    Creation honours the Idempotency-Key header; a payment intent (and the
+    quote_token carrying it) pays for one order only, whatever the key
+    ?mode=summary lists orders without items, with item counts computed in SQL
+    /history/ serves the signed-in user's order history from cache (orders/history.py)
+    Archived orders (orders/archive.py) are listed with /history/?archived=include
+    and retrieved by id like any other order
+    /bulk-status/ moves many orders to a new status at once (staff only, orders/transitions.py)
+    Query counts do not grow with the number of orders or items (see tests.py)
     """
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
     permission_classes = [permissions.AllowAny]  # Temporarily allow any for testing
     
+    def is_summary(self):
+        return self.action == 'list' and self.request.query_params.get('mode') == 'summary'
+    
+    def get_serializer_class(self):
+        if self.is_summary():
+            return OrderSummarySerializer
+        return super().get_serializer_class()
+    
     def get_queryset(self):
+        queryset = Order.objects.all()  # For testing, anonymous requests see all orders
         # Users can only see their own orders
         if self.request.user.is_authenticated:
-            return Order.objects.filter(user=self.request.user).prefetch_related('items')
-        return Order.objects.all()  # For testing, show all orders
+            queryset = queryset.filter(user=self.request.user)
+        
+        if self.is_summary():
+            return queryset.annotate(
+                item_count=Count('items'),
+                total_quantity=Coalesce(Sum('items__quantity'), 0),
+            )
+        return queryset.select_related('user').prefetch_related(order_items_prefetch())
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def history(self, request):
+        """Date, status, total and item count of the user's orders, newest first"""
+        cursor = request.query_params.get('cursor')
+        include_archived = request.query_params.get('archived') == 'include'
+        try:
+            rows, next_cursor = get_order_history(request.user.pk, api_settings.PAGE_SIZE, cursor, include_archived)
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        
+        next_link = None
+        if next_cursor:
+            next_link = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({
+            'next': next_link,
+            'results': OrderHistorySerializer(rows, many=True).data,
+        })
+    
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            pass
+        
+        # Not a live order; it may have been archived
+        archived = ArchivedOrder.objects.select_related('user').prefetch_related('items__product')
+        if request.user.is_authenticated:
+            archived = archived.filter(user=request.user)
+        try:
+            order = archived.get(pk=int(kwargs[self.lookup_field]))
+        except (ValueError, ArchivedOrder.DoesNotExist):
+            raise Http404
+        return Response(ArchivedOrderSerializer(order).data)
+    
+    @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[permissions.IsAdminUser])
+    def bulk_status(self, request):
+        """
+        Move orders to a new status: {"ids": [1, 2, 3], "status": "cancelled"}
+        Returns how many orders were updated and skipped, per previous status.
+        """
+        serializer = BulkStatusSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            result = transition_orders(serializer.validated_data['ids'], serializer.validated_data['status'])
+        except InvalidTransition as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result)
+    
+    @idempotent('orders')
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
     
     def perform_create(self, serializer):
         # Automatically set the user to the current user if authenticated
@@ -84,3 +231,10 @@ class OrderViewSet(viewsets.ModelViewSet):
             serializer.save(user=self.request.user)
         else:
             serializer.save()
+        # Placing the order changed stock levels shown by the catalog
+        invalidate_catalog(stock_only=True)
+    
+    def perform_update(self, serializer):
+        serializer.save()
+        # Cancelling an order restores stock through a trigger
+        invalidate_catalog(stock_only=True)
@@ -12,7 +12,12 @@ class CategoryAdmin(admin.ModelAdmin):
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ['name', 'category', 'price', 'stock_quantity', 'is_low_stock', 'is_active', 'requires_prescription']
-    list_filter = ['category', 'is_active', 'requires_prescription', 'created_at']
+    list_filter = [
+        'category', 'is_active', 'requires_prescription',
+        ('is_in_stock', admin.BooleanFieldListFilter),
+        ('is_low_stock', admin.BooleanFieldListFilter),
+        'created_at',
+    ]
     search_fields = ['name', 'description', 'manufacturer']
     readonly_fields = ['created_at', 'updated_at']
     list_editable = ['price', 'stock_quantity', 'is_active']
@@ -37,3 +42,4 @@ class ProductAdmin(admin.ModelAdmin):
         return obj.is_low_stock
     is_low_stock.boolean = True
     is_low_stock.short_description = 'Low Stock'
+    is_low_stock.admin_order_field = 'is_low_stock'
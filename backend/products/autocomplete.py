@@ -0,0 +1,156 @@
+"""
+Typeahead suggestions for product names, manufacturers and categories
+
+Suggestions are answered from an in-process prefix index: every word of every
+label becomes a sorted key, so a prefix lookup is a binary search instead of a
+database round trip. The index is rebuilt in the background when the catalog
+version moves on (at most once per AUTOCOMPLETE_REBUILD_INTERVAL seconds, since
+stock-only changes bump the version too), and the previous index keeps serving
+meanwhile. Queries the index has no match for fall back to pg_trgm similarity.
+"""
+import bisect
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .cache import get_catalog_version
+from .models import Category, Product
+
+
+# Suggestion types in display order
+SUGGESTION_TYPES = ('product', 'manufacturer', 'category')
+
+# Minimum pg_trgm similarity for fuzzy matches
+FUZZY_THRESHOLD = 0.3
+
+# Prefix matches inspected before ranking; bounds the cost of one-letter queries
+MAX_SCANNED_MATCHES = 500
+
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+
+class PrefixIndex:
+    """Sorted word keys pointing at suggestions"""
+
+    def __init__(self, suggestions):
+        self.suggestions = suggestions
+        entries = []
+        for number, suggestion in enumerate(suggestions):
+            for position, word in enumerate(tokenize(suggestion['label'])):
+                entries.append((word, position, number))
+        entries.sort()
+        self.words = [word for word, _, _ in entries]
+        self.entries = entries
+
+    def search(self, query, limit):
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        # Candidates come from the first token; the others must prefix some word too
+        first, rest = tokens[0], tokens[1:]
+        matches = {}
+        start = bisect.bisect_left(self.words, first)
+        for word, position, number in self.entries[start:start + MAX_SCANNED_MATCHES]:
+            if not word.startswith(first):
+                break
+            if number in matches and matches[number] <= position:
+                continue
+            label_words = tokenize(self.suggestions[number]['label'])
+            if all(any(label_word.startswith(token) for label_word in label_words) for token in rest):
+                matches[number] = position
+
+        # Labels that start with the query first, then by type and label
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (
+                item[1] > 0,
+                SUGGESTION_TYPES.index(self.suggestions[item[0]]['type']),
+                self.suggestions[item[0]]['label'].lower(),
+            )
+        )
+        return [dict(self.suggestions[number], match='prefix') for number, _ in ranked[:limit]]
+
+
+def build_index():
+    suggestions = [
+        {'type': 'product', 'id': product_id, 'label': name}
+        for product_id, name in Product.objects.filter(is_active=True).values_list('id', 'name')
+    ]
+    manufacturers = Product.objects.filter(is_active=True).exclude(manufacturer='').values_list(
+        'manufacturer', flat=True
+    ).order_by().distinct()
+    suggestions += [{'type': 'manufacturer', 'id': None, 'label': name} for name in manufacturers]
+    suggestions += [
+        {'type': 'category', 'id': category_id, 'label': name}
+        for category_id, name in Category.objects.values_list('id', 'name')
+    ]
+    return PrefixIndex(suggestions)
+
+
+class AutocompleteService:
+    """Process-wide holder of the current prefix index"""
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def get_index(self):
+        version = get_catalog_version()
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.rebuild(version)
+        elif version != self.version and self.is_rebuild_due():
+            if self.lock.acquire(blocking=False):
+                # Keep answering from the current index while the new one builds
+                threading.Thread(target=self.rebuild_in_background, args=(version,), daemon=True).start()
+        return self.index
+
+    def is_rebuild_due(self):
+        return time.monotonic() - self.built_at >= settings.AUTOCOMPLETE_REBUILD_INTERVAL
+
+    def rebuild(self, version):
+        self.index = build_index()
+        self.version = version
+        self.built_at = time.monotonic()
+
+    def rebuild_in_background(self, version):
+        try:
+            self.rebuild(version)
+        finally:
+            self.lock.release()
+            connection.close()
+
+    def suggest(self, query, limit):
+        results = self.get_index().search(query, limit)
+        if not results and len(query.strip()) >= 3:
+            # Only misses pay for a database round trip
+            results = fuzzy_suggestions(query, limit)
+        return results
+
+
+def fuzzy_suggestions(query, limit):
+    """Misspelled queries: trigram similarity on product names and manufacturers"""
+    products = Product.objects.filter(is_active=True).filter(
+        Q(name__trigram_similar=query) | Q(manufacturer__trigram_similar=query)
+    ).annotate(
+        similarity=Greatest(TrigramSimilarity('name', query), TrigramSimilarity('manufacturer', query))
+    ).filter(similarity__gte=FUZZY_THRESHOLD).order_by('-similarity').values_list('id', 'name')[:limit]
+    return [
+        {'type': 'product', 'id': product_id, 'label': name, 'match': 'fuzzy'}
+        for product_id, name in products
+    ]
+
+
+autocomplete_service = AutocompleteService()
@@ -0,0 +1,190 @@
+"""
+Versioned response cache for the catalog endpoints
+
+Rendered list and detail responses of CategoryViewSet and ProductViewSet are
+stored under the current catalog version. Any catalog write bumps the version
+(see products/signals.py and the explicit invalidate_catalog() calls in the
+import command, the order endpoints and the batch price report), which makes
+every older entry unreachable; they simply expire from the cache backend.
+The version counters are kept in PostgreSQL (CacheVersion), so a bump from
+any process, the import command included, reaches every web worker.
+
+Responses carry a strong ETag so browsers and the nginx front end can
+revalidate with If-None-Match and get a 304 instead of the full JSON.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+
+CATALOG_VERSION_KEY = 'catalog:version'
+PRICE_VERSION_KEY = 'catalog:price-version'
+
+# Headers replayed from the cached entry on a hit
+CACHED_HEADERS = ('Content-Type', 'Vary', 'Allow')
+
+
+# Versions live in products_cacheversion (CacheVersion), not in the cache
+# backend: the default backend is per process, and the import command, the
+# hold release and rollup commands and the report worker run in processes of
+# their own. Cached entries may stay per process; once the version moves in
+# the database, every process stops reading the entries of the old version.
+GET_VERSION_SQL = 'SELECT version FROM products_cacheversion WHERE key = %s'
+
+# Seeded from the clock so a lost version row never resurrects old entries
+# that a persistent cache backend still holds
+SEED_VERSION_SQL = """
+    INSERT INTO products_cacheversion (key, version) VALUES (%s, %s)
+    ON CONFLICT (key) DO NOTHING
+"""
+
+BUMP_VERSION_SQL = """
+    INSERT INTO products_cacheversion (key, version) VALUES (%s, %s)
+    ON CONFLICT (key) DO UPDATE SET version = products_cacheversion.version + 1
+    RETURNING version
+"""
+
+
+def get_version(key):
+    """Return the version stored under key, initialising it if needed"""
+    with connection.cursor() as cursor:
+        cursor.execute(GET_VERSION_SQL, [key])
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute(SEED_VERSION_SQL, [key, int(time.time() * 1000)])
+            cursor.execute(GET_VERSION_SQL, [key])
+            row = cursor.fetchone()
+    return row[0]
+
+
+def bump_version(key):
+    with connection.cursor() as cursor:
+        cursor.execute(BUMP_VERSION_SQL, [key, int(time.time() * 1000)])
+        return cursor.fetchone()[0]
+
+
+def get_catalog_version():
+    """Return the current catalog version"""
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def get_price_version():
+    """Return the current price version (moves only when prices or active flags may have changed)"""
+    return get_version(PRICE_VERSION_KEY)
+
+
+def bump_catalog_version():
+    """Move the catalog to a new version, orphaning every cached response"""
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def invalidate_catalog(stock_only=False):
+    """
+    Bump the catalog version once the current transaction commits
+    Bumping earlier would let a concurrent request cache pre-commit data
+    under the new version. Writes that only move stock levels (orders) pass
+    stock_only=True and leave the price version, and the price map built on
+    it (orders/pricing.py), alone.
+    """
+    transaction.on_commit(bump_catalog_version)
+    if not stock_only:
+        transaction.on_commit(lambda: bump_version(PRICE_VERSION_KEY))
+
+
+class CatalogCacheMixin:
+    """
+    ViewSet mixin that serves list/retrieve from the versioned catalog cache
+    Only JSON renderings are cached; the browsable API is always rendered live.
+    """
+    catalog_cache_actions = ('list', 'retrieve')
+    catalog_cache_formats = ('json',)
+
+    def get_catalog_cache_key(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        raw_key = '|'.join([
+            self.basename,
+            self.action,
+            str(self.kwargs.get(self.lookup_url_kwarg or self.lookup_field, '')),
+            request.accepted_renderer.format,
+            request.get_host(),
+            urlencode(params),
+        ])
+        digest = hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+        return f'catalog:{get_catalog_version()}:{digest}'
+
+    def is_catalog_cacheable(self, request):
+        return (
+            request.method == 'GET'
+            and self.action in self.catalog_cache_actions
+            and request.accepted_renderer.format in self.catalog_cache_formats
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.catalog_cache_key = None
+        if self.is_catalog_cacheable(request):
+            self.catalog_cache_key = self.get_catalog_cache_key(request)
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(request) or super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(request) or super().retrieve(request, *args, **kwargs)
+
+    def get_cached_response(self, request):
+        if not self.catalog_cache_key:
+            return None
+
+        entry = cache.get(self.catalog_cache_key)
+        if entry is None:
+            return None
+
+        response = get_conditional_response(request._request, etag=entry['etag'])
+        if response is None:
+            response = HttpResponse(entry['content'])
+        for header, value in entry['headers'].items():
+            response[header] = value
+        self.set_validation_headers(response, entry['etag'])
+        # Nothing left to store for this request
+        self.catalog_cache_key = None
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not getattr(self, 'catalog_cache_key', None):
+            return response
+        if not isinstance(response, Response) or response.status_code != 200:
+            return response
+
+        response.render()
+        etag = f'"{hashlib.sha1(response.content).hexdigest()}"'
+        cache.set(self.catalog_cache_key, {
+            'content': response.content,
+            'etag': etag,
+            'headers': {
+                header: response[header] for header in CACHED_HEADERS if response.has_header(header)
+            },
+        }, settings.CATALOG_CACHE_TIMEOUT)
+        self.set_validation_headers(response, etag)
+
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            self.set_validation_headers(not_modified, etag)
+            return not_modified
+        return response
+
+    def set_validation_headers(self, response, etag):
+        response['ETag'] = etag
+        # Let clients keep a copy but always revalidate it against the catalog version
+        response['Cache-Control'] = 'no-cache'
@@ -0,0 +1,116 @@
+"""
+Faceted counts for the catalog filter sidebar
+
+All facets are computed in one aggregate pass over the filtered product
+queryset with GROUPING SETS, instead of one COUNT query per filter option.
+
+Facets are disjunctive: the counts of a facet ignore that facet's own
+filter, so with ?category=1 the category facet still counts every category
+that matches the other filters, and the sidebar can offer them. The pass
+therefore runs over the products that match all filters except the facet
+filters (FACET_FILTERS); each of those becomes a boolean column, and each
+grouping set counts the rows that match the filters of the other facets.
+"""
+from django.db import connection
+from django.db.models import BooleanField, ExpressionWrapper, F, Q, Value
+
+
+# Upper bounds of the price buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = [5, 10, 20, 50]
+
+# Filters of ProductFilter that are also facets, with the lookup each one applies
+FACET_FILTERS = {
+    'category': 'category',
+    'requires_prescription': 'requires_prescription',
+}
+
+# GROUPING(category, prescription, manufacturer, price_bucket) for each grouping set
+CATEGORY_SET, PRESCRIPTION_SET, MANUFACTURER_SET, PRICE_SET, TOTAL_SET = 7, 11, 13, 14, 15
+
+FACETS_SQL = """
+    SELECT
+        GROUPING(facet_category, facet_prescription, facet_manufacturer, price_bucket),
+        facet_category, MAX(facet_category_name),
+        facet_prescription, facet_manufacturer, price_bucket,
+        COUNT(*) FILTER (WHERE facet_match_prescription),
+        COUNT(*) FILTER (WHERE facet_match_category),
+        COUNT(*) FILTER (WHERE facet_match_category AND facet_match_prescription)
+    FROM (
+        SELECT base.*, width_bucket(base.facet_price, %s::numeric[]) AS price_bucket
+        FROM ({base_sql}) base
+    ) products
+    GROUP BY GROUPING SETS (
+        (facet_category), (facet_prescription), (facet_manufacturer), (price_bucket), ()
+    )
+"""
+
+
+def price_bucket_range(bucket):
+    """Return (min, max) for a width_bucket index; max is None for the last bucket"""
+    low = PRICE_BUCKET_BOUNDS[bucket - 1] if bucket > 0 else 0
+    high = PRICE_BUCKET_BOUNDS[bucket] if bucket < len(PRICE_BUCKET_BOUNDS) else None
+    return low, high
+
+
+def match_expression(name, value):
+    """Boolean column telling whether a row passes the facet filter name=value"""
+    if value is None:
+        return Value(True, output_field=BooleanField())
+    return ExpressionWrapper(Q(**{FACET_FILTERS[name]: value}), output_field=BooleanField())
+
+
+def compute_facets(queryset, selected=None):
+    """
+    Count products per category, prescription flag, manufacturer and price bucket
+    queryset must not be filtered by the facet filters; selected maps the
+    names in FACET_FILTERS to their requested value (None when not filtered).
+    """
+    selected = selected or {}
+    base = queryset.order_by().annotate(
+        facet_category=F('category_id'),
+        facet_category_name=F('category__name'),
+        facet_prescription=F('requires_prescription'),
+        facet_manufacturer=F('manufacturer'),
+        facet_price=F('price'),
+        facet_match_category=match_expression('category', selected.get('category')),
+        facet_match_prescription=match_expression('requires_prescription', selected.get('requires_prescription')),
+    ).values(
+        'facet_category', 'facet_category_name', 'facet_prescription',
+        'facet_manufacturer', 'facet_price', 'facet_match_category', 'facet_match_prescription',
+    )
+    base_sql, base_params = base.query.sql_with_params()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            FACETS_SQL.format(base_sql=base_sql),
+            [PRICE_BUCKET_BOUNDS, *base_params]
+        )
+        rows = cursor.fetchall()
+
+    facets = {
+        'total': 0,
+        'category': [],
+        'requires_prescription': [],
+        'manufacturer': [],
+        'price': [],
+    }
+    for row in rows:
+        grouping, category_id, category_name, prescription, manufacturer, bucket = row[:6]
+        # Each facet counts the rows that pass the other facets' filters
+        category_count, prescription_count, count = row[6:]
+        if grouping == TOTAL_SET:
+            facets['total'] = count
+        elif grouping == CATEGORY_SET and category_count:
+            facets['category'].append({'id': category_id, 'name': category_name, 'count': category_count})
+        elif grouping == PRESCRIPTION_SET and prescription_count:
+            facets['requires_prescription'].append({'value': prescription, 'count': prescription_count})
+        elif grouping == MANUFACTURER_SET and manufacturer and count:
+            facets['manufacturer'].append({'value': manufacturer, 'count': count})
+        elif grouping == PRICE_SET and count:
+            low, high = price_bucket_range(bucket)
+            facets['price'].append({'bucket': bucket, 'min': low, 'max': high, 'count': count})
+
+    facets['category'].sort(key=lambda item: item['name'])
+    facets['manufacturer'].sort(key=lambda item: item['value'])
+    facets['price'].sort(key=lambda item: item['bucket'])
+    return facets
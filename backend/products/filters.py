@@ -0,0 +1,13 @@
+from django_filters import rest_framework as filters
+
+from .models import Product
+
+
+class ProductFilter(filters.FilterSet):
+    """Catalog filters; the stock statuses are generated columns, so they filter in SQL"""
+    in_stock = filters.BooleanFilter(field_name='is_in_stock')
+    low_stock = filters.BooleanFilter(field_name='is_low_stock')
+
+    class Meta:
+        model = Product
+        fields = ['category', 'requires_prescription', 'in_stock', 'low_stock']
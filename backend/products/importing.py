@@ -0,0 +1,40 @@
+"""
+Helpers shared by the catalog importers (the import_products command and import_csv_data.py)
+
+Each imported product stores a hash of the feed values it was last written
+from (Product.content_hash). Comparing hashes lets an import skip rows that
+did not change instead of rewriting them, which would bump updated_at, run
+the price audit trigger and invalidate the catalog cache for nothing.
+
+Both importers hash the same Product columns (HASHED_FIELDS), so a product
+written by one is recognized as unchanged by the other. Any other write to
+one of these columns (admin, stored procedures, stock moved by orders)
+clears the stored hash through the trigger_clear_product_content_hash
+trigger in database_schema.sql, so the next import rewrites the product
+instead of trusting a hash of values it no longer holds.
+"""
+import hashlib
+import json
+from decimal import Decimal
+
+
+# Product columns covered by Product.content_hash - keep in sync with
+# clear_product_content_hash() in database_schema.sql
+HASHED_FIELDS = (
+    'name', 'description', 'category_id', 'price', 'stock_quantity', 'manufacturer',
+    'dosage', 'ingredients', 'image', 'is_active', 'requires_prescription',
+)
+
+
+def normalize_value(value):
+    if isinstance(value, Decimal):
+        return str(value.quantize(Decimal('0.01')))
+    if isinstance(value, float):
+        return str(Decimal(str(value)).quantize(Decimal('0.01')))
+    return value
+
+
+def compute_content_hash(values):
+    """SHA-256 over the HASHED_FIELDS of an imported row (Product field values)"""
+    payload = json.dumps([normalize_value(values[field]) for field in HASHED_FIELDS], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,23 @@
+from django.db.models import Field, Lookup
+
+
+@Field.register_lookup
+class AnyLookup(Lookup):
+    """
+    field__any=[1, 2, 3] compiles to `field = ANY(%s)` with the values bound
+    as a single array parameter, so the statement stays the same size no
+    matter how many values are looked up.
+    """
+    lookup_name = 'any'
+    prepare_rhs = False
+
+    def get_db_prep_lookup(self, value, connection):
+        output_field = self.lhs.output_field
+        return '%s', [[output_field.get_db_prep_value(item, connection) for item in value]]
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        # The explicit cast keeps empty arrays typed
+        array_type = self.lhs.output_field.db_type(connection)
+        return f'{lhs} = ANY({rhs}::{array_type}[])', (*lhs_params, *rhs_params)
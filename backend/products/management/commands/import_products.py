@@ -1,5 +1,13 @@
 import csv
+import io
+import time
+from decimal import Decimal
+from itertools import islice
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from products.cache import invalidate_catalog
+from products.importing import compute_content_hash
 from products.models import Category, Product
 
 
@@ -14,88 +22,344 @@ CATEGORY_MAP = {
     '7': 'First Aid',
 }
 
+# Columns loaded into the staging table by the bulk mode (in COPY order)
+STAGING_COLUMNS = [
+    'name', 'description', 'category_id', 'price', 'stock_quantity',
+    'manufacturer', 'dosage', 'ingredients', 'is_active', 'image', 'content_hash',
+]
+
+# In CSV mode COPY reads an unquoted empty field as NULL; blank feed values
+# of these columns are empty strings instead
+STAGING_TEXT_COLUMNS = ['name', 'description', 'manufacturer', 'dosage', 'ingredients', 'image']
+
+COPY_STAGING_SQL = (
+    f"COPY import_products_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN "
+    f"WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(STAGING_TEXT_COLUMNS)}))"
+)
+
+CREATE_STAGING_SQL = """
+    CREATE TEMPORARY TABLE import_products_staging (
+        seq SERIAL,
+        name VARCHAR(200) NOT NULL,
+        description TEXT NOT NULL,
+        category_id BIGINT NOT NULL,
+        price NUMERIC(10, 2) NOT NULL,
+        stock_quantity INTEGER NOT NULL,
+        manufacturer VARCHAR(200) NOT NULL,
+        dosage VARCHAR(100) NOT NULL,
+        ingredients TEXT NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        image VARCHAR(500) NOT NULL,
+        content_hash VARCHAR(64) NOT NULL
+    ) ON COMMIT DROP
+"""
+
+# The last row wins when a feed repeats a name, like update_or_create did
+LATEST_STAGED_ROWS = """
+    SELECT DISTINCT ON (name) *
+    FROM import_products_staging
+    ORDER BY name, seq DESC
+"""
+
+UPDATE_FROM_STAGING_SQL = f"""
+    UPDATE products_product p
+    SET description = s.description,
+        category_id = s.category_id,
+        price = s.price,
+        stock_quantity = s.stock_quantity,
+        low_stock_threshold = 10,
+        manufacturer = s.manufacturer,
+        dosage = s.dosage,
+        ingredients = s.ingredients,
+        requires_prescription = FALSE,
+        is_active = s.is_active,
+        image = s.image,
+        content_hash = s.content_hash,
+        updated_at = NOW()
+    FROM ({LATEST_STAGED_ROWS}) s
+    WHERE p.name = s.name
+"""
+
+INSERT_FROM_STAGING_SQL = f"""
+    INSERT INTO products_product (
+        name, description, category_id, price, stock_quantity, low_stock_threshold,
+        manufacturer, dosage, ingredients, recommended_usage, requires_prescription,
+        image, is_active, content_hash, created_at, updated_at
+    )
+    SELECT s.name, s.description, s.category_id, s.price, s.stock_quantity, 10,
+           s.manufacturer, s.dosage, s.ingredients, '', FALSE,
+           s.image, s.is_active, s.content_hash, NOW(), NOW()
+    FROM ({LATEST_STAGED_ROWS}) s
+    WHERE NOT EXISTS (SELECT 1 FROM products_product p WHERE p.name = s.name)
+"""
+
 
 class Command(BaseCommand):
     help = 'Import products from CSV file'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file')
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Load rows with COPY into a staging table and upsert them set-based in one transaction'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Rows streamed into the staging table per COPY in bulk mode (default: 5000)'
+        )
+        parser.add_argument(
+            '--deactivate-missing', action='store_true',
+            help='Deactivate active products that are not in the feed (use with full feeds only)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be inserted, updated and deactivated'
+        )
+        parser.add_argument(
+            '--diff-file', type=str,
+            help='Write the change diff (action, product id, name) to this CSV file'
+        )
 
     def handle(self, *args, **kwargs):
         csv_file = kwargs['csv_file']
-        
+        self.dry_run = kwargs['dry_run']
+
         self.stdout.write(self.style.SUCCESS(f'Importing products from {csv_file}...'))
-        
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING('Dry run: no changes will be written'))
+        started = time.perf_counter()
+
+        # Stored hashes of the whole catalog in one query: name -> (id, content_hash, is_active)
+        self.existing = {
+            name: (product_id, content_hash, is_active)
+            for product_id, name, content_hash, is_active in Product.objects.values_list(
+                'id', 'name', 'content_hash', 'is_active'
+            )
+        }
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        self.seen_names = set()
+        self.diff = []
+        self.unchanged_count = 0
+
+        if kwargs['bulk'] and not self.dry_run:
+            with transaction.atomic():
+                imported_count, skipped_count = self.import_bulk(csv_file, kwargs['chunk_size'])
+                if kwargs['deactivate_missing']:
+                    self.deactivate_missing()
+        else:
+            imported_count, skipped_count = self.import_rows(csv_file)
+            if kwargs['deactivate_missing']:
+                self.deactivate_missing()
+
+        elapsed = time.perf_counter() - started
+        if self.diff and not self.dry_run:
+            invalidate_catalog()
+
+        if kwargs['diff_file']:
+            self.write_diff(kwargs['diff_file'])
+
+        counts = {action: 0 for action in ('insert', 'update', 'deactivate')}
+        for action, _, _ in self.diff:
+            counts[action] += 1
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Import complete!' if not self.dry_run else '\n✅ Dry run complete!'))
+        self.stdout.write(f'Inserted: {counts["insert"]}')
+        self.stdout.write(f'Updated: {counts["update"]}')
+        self.stdout.write(f'Unchanged (skipped): {self.unchanged_count}')
+        self.stdout.write(f'Deactivated: {counts["deactivate"]}')
+        self.stdout.write(f'Skipped: {skipped_count}')
+        self.stdout.write(f'Elapsed: {elapsed:.2f}s ({(imported_count + skipped_count) / max(elapsed, 1e-9):.0f} rows/sec)')
+        self.stdout.write(f'Total categories: {Category.objects.count()}')
+        self.stdout.write(f'Total products: {Product.objects.count()}')
+
+    def classify(self, values):
+        """Return 'insert', 'update' or None (unchanged) for a parsed row and record it in the diff"""
+        name = values['name']
+        self.seen_names.add(name)
+        stored = self.existing.get(name)
+        if stored is None:
+            action, product_id = 'insert', None
+        elif stored[1] != values['content_hash']:
+            action, product_id = 'update', stored[0]
+        else:
+            self.unchanged_count += 1
+            return None
+
+        self.diff.append((action, product_id, name))
+        return action
+
+    def skip_row(self, row, error):
+        """Report a row that could not be imported"""
+        # Its product is still in the feed, so --deactivate-missing must leave it alone
+        if row.get('Name'):
+            self.seen_names.add(row['Name'])
+        self.stdout.write(self.style.ERROR(f'✗ Error importing {row.get("Name", "unknown")}: {str(error)}'))
+
+    def get_category_id(self, category_name):
+        """Id of the named category, created on first use (None for a new category in a dry run)"""
+        if category_name not in self.categories:
+            if self.dry_run:
+                return None
+            category, _ = Category.objects.get_or_create(
+                name=category_name,
+                defaults={'description': f'{category_name} products'}
+            )
+            self.categories[category_name] = category.id
+        return self.categories[category_name]
+
+    def deactivate_missing(self):
+        """Deactivate active products absent from the feed with one UPDATE"""
+        missing = [
+            (product_id, name)
+            for name, (product_id, _, is_active) in self.existing.items()
+            if is_active and name not in self.seen_names
+        ]
+        self.diff += [('deactivate', product_id, name) for product_id, name in missing]
+        if missing and not self.dry_run:
+            Product.objects.filter(id__any=[product_id for product_id, _ in missing]).update(
+                # Clearing the hash makes a product that reappears in a later feed count as changed
+                is_active=False, content_hash='', updated_at=timezone.now()
+            )
+
+    def write_diff(self, path):
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(['action', 'product_id', 'name'])
+            writer.writerows(self.diff)
+        self.stdout.write(f'Diff written to {path}')
+
+    def parse_row(self, row):
+        """Convert a CSV row into Product field values"""
+        # Get category name from Category_ID
+        category_id = row.get('Category_ID', '1')
+        category_name = CATEGORY_MAP.get(category_id, 'General')
+
+        # Parse price (remove $ if present)
+        price_str = row.get('Price', '0').replace('$', '').strip()
+        price = Decimal(price_str) if price_str else Decimal('0.00')
+
+        # Convert Imgur URL to direct image URL
+        image_url = row.get('Image_URL', '')
+        if image_url and 'imgur.com/' in image_url:
+            # Extract image ID from URL
+            image_id = image_url.split('/')[-1]
+            # Convert to direct image URL
+            image_url = f'https://i.imgur.com/{image_id}.jpg'
+
+        values = {
+            'name': row['Name'],
+            'description': row.get('Description', ''),
+            'category_id': self.get_category_id(category_name),
+            'price': price,
+            'stock_quantity': int(row.get('Stock', 0)),
+            'manufacturer': row.get('Brand', ''),
+            'dosage': row.get('Size', ''),  # Size column holds the dosage/pack size
+            'ingredients': row.get('Ingredients', ''),
+            'requires_prescription': False,  # None in your CSV require prescription
+            'is_active': row.get('is_active', 'TRUE').upper() == 'TRUE',
+            'image': image_url,  # Store converted direct image URL
+        }
+        values['content_hash'] = compute_content_hash(values)
+        return values
+
+    def import_rows(self, csv_file):
+        """Row-by-row import with update_or_create (small files and dry runs)"""
         imported_count = 0
         skipped_count = 0
-        
+
         with open(csv_file, 'r', encoding='utf-8') as file:
             # Use DictReader to automatically map column names
             reader = csv.DictReader(file)
-            
+
             for row in reader:
                 try:
-                    # Get category name from Category_ID
-                    category_id = row.get('Category_ID', '1')
-                    category_name = CATEGORY_MAP.get(category_id, 'General')
-                    
-                    # Get or create category
-                    category, _ = Category.objects.get_or_create(
-                        name=category_name,
-                        defaults={'description': f'{category_name} products'}
-                    )
-                    
-                    # Parse price (remove $ if present)
-                    price_str = row.get('Price', '0').replace('$', '').strip()
-                    price = float(price_str) if price_str else 0.0
-                    
-                    # Parse stock
-                    stock = int(row.get('Stock', 0))
-                    
-                    # Parse is_active
-                    is_active = row.get('is_active', 'TRUE').upper() == 'TRUE'
-                    
-                    # Extract size/dosage from Size column
-                    size = row.get('Size', '')
-                    
-                    # Convert Imgur URL to direct image URL
-                    image_url = row.get('Image_URL', '')
-                    if image_url and 'imgur.com/' in image_url:
-                        # Extract image ID from URL
-                        image_id = image_url.split('/')[-1]
-                        # Convert to direct image URL
-                        image_url = f'https://i.imgur.com/{image_id}.jpg'
-                    
+                    values = self.parse_row(row)
+
+                    # Unchanged rows are not written at all
+                    if self.classify(values) is None or self.dry_run:
+                        imported_count += 1
+                        continue
+
                     # Create or update product using Name as unique identifier
                     product, created = Product.objects.update_or_create(
-                        name=row['Name'],
+                        name=values['name'],
                         defaults={
-                            'description': row.get('Description', ''),
-                            'category': category,
-                            'price': price,
-                            'stock_quantity': stock,
+                            'description': values['description'],
+                            'category_id': values['category_id'],
+                            'price': values['price'],
+                            'stock_quantity': values['stock_quantity'],
                             'low_stock_threshold': 10,  # Default threshold
-                            'manufacturer': row.get('Brand', ''),
-                            'dosage': size,
-                            'requires_prescription': False,  # None in your CSV require prescription
-                            'is_active': is_active,
-                            'image': image_url,  # Store converted direct image URL
+                            'manufacturer': values['manufacturer'],
+                            'dosage': values['dosage'],
+                            'ingredients': values['ingredients'],
+                            'requires_prescription': values['requires_prescription'],
+                            'is_active': values['is_active'],
+                            'image': values['image'],
+                            'content_hash': values['content_hash'],
                         }
                     )
-                    
+
+                    imported_count += 1
                     if created:
-                        imported_count += 1
                         self.stdout.write(f'✓ Created: {product.name} (${product.price})')
                     else:
-                        imported_count += 1
                         self.stdout.write(f'↻ Updated: {product.name} (${product.price})')
-                        
+
                 except Exception as e:
                     skipped_count += 1
-                    self.stdout.write(self.style.ERROR(f'✗ Error importing {row.get("Name", "unknown")}: {str(e)}'))
-        
-        self.stdout.write(self.style.SUCCESS(f'\n✅ Import complete!'))
-        self.stdout.write(f'Imported/Updated: {imported_count}')
-        self.stdout.write(f'Skipped: {skipped_count}')
-        self.stdout.write(f'Total categories: {Category.objects.count()}')
-        self.stdout.write(f'Total products: {Product.objects.count()}')
+                    self.skip_row(row, e)
+
+        return imported_count, skipped_count
+
+    def import_bulk(self, csv_file, chunk_size):
+        """
+        Set-based import for large supplier feeds
+        Rows are streamed in chunks into a temporary staging table with COPY,
+        then applied with one UPDATE and one INSERT. The whole run is a single
+        transaction, so a failed import leaves the catalog untouched. Only
+        new and changed rows (by content hash) are staged.
+        """
+        staged_count = 0
+        processed_count = 0
+        skipped_count = 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_SQL)
+
+            with open(csv_file, 'r', encoding='utf-8') as file:
+                reader = csv.DictReader(file)
+
+                while True:
+                    chunk = list(islice(reader, chunk_size))
+                    if not chunk:
+                        break
+
+                    buffer = io.StringIO()
+                    writer = csv.writer(buffer)
+                    for row in chunk:
+                        try:
+                            values = self.parse_row(row)
+                        except Exception as e:
+                            skipped_count += 1
+                            self.skip_row(row, e)
+                            continue
+
+                        if self.classify(values) is None:
+                            continue
+
+                        writer.writerow([values[column] for column in STAGING_COLUMNS])
+                        staged_count += 1
+
+                    processed_count += len(chunk)
+                    buffer.seek(0)
+                    cursor.copy_expert(COPY_STAGING_SQL, buffer)
+                    self.stdout.write(f'… Read {processed_count} rows, staged {staged_count} changed rows')
+
+            cursor.execute(UPDATE_FROM_STAGING_SQL)
+            updated_count = cursor.rowcount
+            cursor.execute(INSERT_FROM_STAGING_SQL)
+            created_count = cursor.rowcount
+
+        self.stdout.write(f'✓ Created: {created_count}')
+        self.stdout.write(f'↻ Updated: {updated_count}')
+        return processed_count - skipped_count, skipped_count
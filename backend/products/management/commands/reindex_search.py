@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from products.models import Product
+from products.search import product_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search vectors of products (backfill after imports or schema changes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of product ids updated per statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--only-missing', action='store_true',
+            help='Only index products that have no search vector yet'
+        )
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        queryset = Product.objects.all()
+        if kwargs['only_missing']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        bounds = queryset.aggregate(first_id=Min('id'), last_id=Max('id'))
+        if bounds['first_id'] is None:
+            self.stdout.write(self.style.SUCCESS('Nothing to index.'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Rebuilding product search vectors...'))
+
+        indexed_count = 0
+        start_id = bounds['first_id']
+        while start_id <= bounds['last_id']:
+            # One set-based UPDATE per id range keeps each statement short
+            indexed_count += queryset.filter(
+                id__gte=start_id, id__lt=start_id + batch_size
+            ).update(search_vector=product_search_vector())
+            start_id += batch_size
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Reindex complete!'))
+        self.stdout.write(f'Indexed products: {indexed_count}')
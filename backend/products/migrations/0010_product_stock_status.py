@@ -0,0 +1,31 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_in_stock',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('stock_quantity__gt', 0)), output_field=models.BooleanField()),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.GeneratedField(db_persist=True, expression=models.Q(('stock_quantity__lte', models.F('low_stock_threshold'))), output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_low_stock', True)), fields=['name', 'id'], name='product_low_stock_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_in_stock', False)), fields=['name', 'id'], name='product_out_of_stock_name_idx'),
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
@@ -30,6 +32,17 @@ class Product(models.Model):
     # Inventory
     stock_quantity = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     low_stock_threshold = models.IntegerField(default=10, validators=[MinValueValidator(0)])
+    # Stock status computed and stored by the database, so it can be filtered and indexed
+    is_low_stock = models.GeneratedField(
+        expression=models.Q(stock_quantity__lte=models.F('low_stock_threshold')),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
+    is_in_stock = models.GeneratedField(
+        expression=models.Q(stock_quantity__gt=0),
+        output_field=models.BooleanField(),
+        db_persist=True,
+    )
     
     # Product details
     manufacturer = models.CharField(max_length=200, blank=True)
@@ -44,6 +57,12 @@ class Product(models.Model):
     # Status
     is_active = models.BooleanField(default=True)
     
+    # Full-text search document (maintained by trigger_update_product_search_vector)
+    search_vector = SearchVectorField(null=True, editable=False)
+    
+    # Hash of the feed values this product was last imported from (see products/importing.py)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -54,17 +73,33 @@ class Product(models.Model):
             models.Index(fields=['name']),
             models.Index(fields=['category']),
             models.Index(fields=['is_active']),
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+            # Trigram indexes for fuzzy autocomplete (requires the pg_trgm extension)
+            GinIndex(fields=['name'], name='product_name_trgm_idx', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['manufacturer'], name='product_manufacturer_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Keyset pagination indexes for the storefront orderings (field + id tie-breaker)
+            models.Index(fields=['name', 'id'], name='product_active_name_id_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['price', 'id'], name='product_active_price_id_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['created_at', 'id'], name='product_active_created_id_idx', condition=models.Q(is_active=True)),
+            # Stock status filters only ever select the small low/out-of-stock slice
+            models.Index(fields=['name', 'id'], name='product_low_stock_name_idx', condition=models.Q(is_low_stock=True)),
+            models.Index(fields=['name', 'id'], name='product_out_of_stock_name_idx', condition=models.Q(is_in_stock=False)),
         ]
 
     def __str__(self):
         return f"{self.name} ({self.dosage})"
 
-    @property
-    def is_low_stock(self):
-        """Check if product is low on stock"""
-        return self.stock_quantity <= self.low_stock_threshold
 
-    @property
-    def is_in_stock(self):
-        """Check if product is available"""
-        return self.stock_quantity > 0
+
+class CacheVersion(models.Model):
+    """
+    Version counters of the versioned caches (products/cache.py)
+    Kept in the database rather than the cache backend so that a bump made
+    by any process (web workers, management commands, the report worker)
+    is seen by all of them.
+    """
+    key = models.CharField(max_length=200, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key} = {self.version}"
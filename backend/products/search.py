@@ -0,0 +1,86 @@
+"""
+Full-text search for the product catalog
+
+Products carry a weighted tsvector (Product.search_vector) that is kept up to
+date by the trigger_update_product_search_vector trigger in database_schema.sql
+and backfilled with `python manage.py reindex_search`. The filters below keep
+the existing `?search=` contract of ProductViewSet but answer it from the GIN
+index and order the results by relevance.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+from rest_framework import filters
+
+
+# Text search configuration used by both the trigger and the queries below
+SEARCH_CONFIG = 'english'
+
+# Field weights - keep in sync with update_product_search_vector() in database_schema.sql
+SEARCH_FIELD_WEIGHTS = {
+    'name': 'A',
+    'manufacturer': 'B',
+    'ingredients': 'C',
+    'description': 'D',
+}
+
+# Rank multipliers for weights D, C, B, A (the order PostgreSQL expects)
+SEARCH_RANK_WEIGHTS = [0.1, 0.3, 0.5, 1.0]
+
+SEARCH_RANK_ANNOTATION = 'search_rank'
+
+
+def product_search_vector():
+    """Build the weighted search vector expression for Product rows"""
+    vector = None
+    for field, weight in SEARCH_FIELD_WEIGHTS.items():
+        part = SearchVector(field, weight=weight, config=SEARCH_CONFIG)
+        vector = part if vector is None else vector + part
+    return vector
+
+
+def build_search_query(terms):
+    """
+    Turn raw search terms into a prefix-matching tsquery
+
+    Every word must match (AND), and the last characters typed may be an
+    incomplete word, so each word is matched as a prefix ("ibu" finds "ibuprofen").
+    Returns None when the terms contain nothing searchable.
+    """
+    words = re.findall(r'\w+', ' '.join(terms).lower())
+    if not words:
+        return None
+    raw_query = ' & '.join(f'{word}:*' for word in words)
+    return SearchQuery(raw_query, search_type='raw', config=SEARCH_CONFIG)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Ranked full-text search over Product.search_vector
+    Replaces the ILIKE scans of DRF's SearchFilter with a GIN index lookup
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = build_search_query(self.get_search_terms(request))
+        if query is None:
+            return queryset
+
+        return queryset.filter(search_vector=query).annotate(**{
+            SEARCH_RANK_ANNOTATION: SearchRank(
+                F('search_vector'), query, weights=SEARCH_RANK_WEIGHTS
+            )
+        })
+
+
+class RankedOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter that sorts search results by relevance
+    An explicit ?ordering= still wins over the rank.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        if (not request.query_params.get(self.ordering_param)
+                and SEARCH_RANK_ANNOTATION in queryset.query.annotations):
+            return [f'-{SEARCH_RANK_ANNOTATION}', *(self.get_default_ordering(view) or [])]
+        return super().get_ordering(request, queryset, view)
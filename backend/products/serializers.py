@@ -2,13 +2,39 @@ from rest_framework import serializers
 from .models import Category, Product
 
 
+class SparseFieldsetMixin:
+    """
+    Limit the serialized fields to the ones named in ?fields=id,name,price
+    Unknown names are ignored; without the parameter every field is kept.
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+    def get_requested_fields(self):
+        request = self.context.get('request')
+        if request is None:
+            return set()
+        raw = request.query_params.get(self.fields_query_param, '')
+        return {name.strip() for name in raw.split(',') if name.strip()}
+
+    def get_source_fields(self):
+        """Top-level model attributes read by the remaining fields"""
+        return {field.source.split('.')[0] for field in self.fields.values()}
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'description', 'created_at']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     category_name = serializers.CharField(source='category.name', read_only=True)
     is_low_stock = serializers.BooleanField(read_only=True)
     is_in_stock = serializers.BooleanField(read_only=True)
@@ -23,3 +49,23 @@ class ProductSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+
+
+class ProductListSerializer(ProductSerializer):
+    """Compact product representation for catalog grids (no long text fields)"""
+
+    class Meta(ProductSerializer.Meta):
+        fields = [
+            'id', 'name', 'category', 'category_name',
+            'price', 'stock_quantity', 'manufacturer', 'dosage', 'requires_prescription',
+            'image', 'is_active', 'is_low_stock', 'is_in_stock',
+        ]
+
+
+class ProductAvailabilitySerializer(serializers.ModelSerializer):
+    """Current price and stock of a product, used to revalidate carts"""
+    is_in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'price', 'stock_quantity', 'is_active', 'is_in_stock']
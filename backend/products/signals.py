@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import invalidate_catalog
+from .models import Category, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalog_on_change(sender, **kwargs):
+    """Any saved product or category (including admin list_editable saves) invalidates the catalog cache"""
+    invalidate_catalog()
@@ -1,3 +1,131 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .models import Category, Product
+
+
+class ProductBulkTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Pain Relief')
+        cls.product = Product.objects.create(
+            name='Ibuprofen', description='Test product', category=category,
+            price=Decimal('4.99'), stock_quantity=10
+        )
+
+    def test_known_and_missing_ids(self):
+        response = APIClient().get('/api/products/bulk/', {'ids': f'{self.product.pk},{2**63 - 1}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(str(self.product.pk), response.data['products'])
+        self.assertEqual(response.data['missing'], [2**63 - 1])
+
+    def test_out_of_range_ids(self):
+        client = APIClient()
+        for ids in ('99999999999999999999', str(-2**63 - 1)):
+            response = client.get('/api/products/bulk/', {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+        response = client.post('/api/products/bulk/', {'ids': [2**63]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ProductFacetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pain = Category.objects.create(name='Pain Relief')
+        cls.vitamins = Category.objects.create(name='Vitamins')
+        for name, category, prescription, manufacturer in [
+            ('Ibuprofen', cls.pain, False, 'Advil'),
+            ('Codeine', cls.pain, True, 'Pharma'),
+            ('Vitamin C', cls.vitamins, False, 'Nature'),
+        ]:
+            Product.objects.create(
+                name=name, description='Test product', category=category, price=Decimal('4.99'),
+                stock_quantity=10, requires_prescription=prescription, manufacturer=manufacturer
+            )
+
+    def get_facets(self, **params):
+        response = APIClient().get('/api/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_facets_ignore_their_own_filter(self):
+        facets = self.get_facets(category=self.pain.pk)
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(
+            {item['name']: item['count'] for item in facets['category']},
+            {'Pain Relief': 2, 'Vitamins': 1}
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in facets['requires_prescription']},
+            {False: 1, True: 1}
+        )
+        self.assertEqual([item['value'] for item in facets['manufacturer']], ['Advil', 'Pharma'])
+
+    def test_other_facet_filters_still_apply(self):
+        facets = self.get_facets(category=self.pain.pk, requires_prescription='false')
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(
+            {item['name']: item['count'] for item in facets['category']},
+            {'Pain Relief': 1, 'Vitamins': 1}
+        )
+        self.assertEqual(
+            {item['value']: item['count'] for item in facets['requires_prescription']},
+            {False: 1, True: 1}
+        )
+        self.assertEqual([item['value'] for item in facets['manufacturer']], ['Advil'])
+
+    def test_invalid_filter(self):
+        response = APIClient().get('/api/products/facets/', {'category': 999999})
+        self.assertEqual(response.status_code, 400)
+
+
+class ImportProductsTests(TestCase):
+
+    def write_feed(self, content):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return file.name
+
+    def test_bulk_import_with_blank_fields(self):
+        path = self.write_feed(
+            'Name,Description,Category_ID,Price,Stock,Brand,Size,is_active,Image_URL\n'
+            'Ibuprofen,,1,$4.99,10,,,TRUE,\n'
+            'Vitamin C,Daily vitamin,3,2.50,5,Nature,100 tablets,TRUE,\n'
+        )
+        call_command('import_products', path, '--bulk', stdout=StringIO())
+
+        product = Product.objects.get(name='Ibuprofen')
+        self.assertEqual(product.manufacturer, '')
+        self.assertEqual(product.dosage, '')
+        self.assertEqual(product.description, '')
+        self.assertEqual(product.image, '')
+        self.assertEqual(product.price, Decimal('4.99'))
+        self.assertEqual(Product.objects.get(name='Vitamin C').manufacturer, 'Nature')
 
-# Create your tests here.
+    def test_failed_rows_are_not_deactivated(self):
+        category = Category.objects.create(name='Pain Relief')
+        Product.objects.create(
+            name='Aspirin', description='Test product', category=category,
+            price=Decimal('3.99'), stock_quantity=10
+        )
+        Product.objects.create(
+            name='Discontinued', description='Test product', category=category,
+            price=Decimal('1.99'), stock_quantity=10
+        )
+        path = self.write_feed(
+            'Name,Description,Category_ID,Price,Stock,Brand,Size,is_active,Image_URL\n'
+            'Aspirin,Test product,1,3.99,not a number,,,TRUE,\n'
+        )
+        for options in ([], ['--bulk']):
+            call_command('import_products', path, '--deactivate-missing', *options, stdout=StringIO())
+            self.assertTrue(Product.objects.get(name='Aspirin').is_active)
+            self.assertFalse(Product.objects.get(name='Discontinued').is_active)
@@ -1,26 +1,153 @@
-from rest_framework import viewsets, filters
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from django_filters import utils as filter_utils
 from django_filters.rest_framework import DjangoFilterBackend
+from mediguide.pagination import KeysetPagination
+from .autocomplete import autocomplete_service
+from .cache import CatalogCacheMixin
+from .facets import FACET_FILTERS, compute_facets
+from .filters import ProductFilter
 from .models import Category, Product
-from .serializers import CategorySerializer, ProductSerializer
+from .search import ProductSearchFilter, RankedOrderingFilter
+from .serializers import (
+    CategorySerializer, ProductAvailabilitySerializer, ProductListSerializer, ProductSerializer,
+    SparseFieldsetMixin,
+)
 
 
-class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
+# Product ids are bigint; larger values would fail in PostgreSQL, not just miss
+BIGINT_MIN, BIGINT_MAX = -2**63, 2**63 - 1
+
+
+class CategoryViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for product categories
+    Served from the versioned catalog cache with ETag revalidation
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
 
-class ProductViewSet(viewsets.ReadOnlyModelViewSet):
+class ProductViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for products
-    Supports filtering, searching, and ordering
+    Supports filtering (including ?in_stock= and ?low_stock=), ranked full-text search (?search=), and ordering
+    Paginated by opaque cursors (?cursor=), or by page numbers when ?page= is given
+    Served from the versioned catalog cache with ETag revalidation
+    Lists use a compact representation; ?fields=a,b,c picks any subset of the full one
     """
     queryset = Product.objects.filter(is_active=True).select_related('category')
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'requires_prescription']
-    search_fields = ['name', 'description', 'manufacturer']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, RankedOrderingFilter]
+    filterset_class = ProductFilter
     ordering_fields = ['name', 'price', 'created_at']
     ordering = ['name']
+    catalog_cache_actions = ('list', 'retrieve', 'facets')
+    # Wide columns that are only loaded when the response actually contains them
+    deferrable_fields = ['description', 'ingredients', 'recommended_usage', 'search_vector', 'content_hash']
+
+    def get_serializer_class(self):
+        if self.action == 'list' and SparseFieldsetMixin.fields_query_param not in self.request.query_params:
+            return ProductListSerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        needed = self.get_serializer().get_source_fields()
+        deferred = [name for name in self.deferrable_fields if name not in needed]
+        return queryset.defer(*deferred) if deferred else queryset
+
+    @action(detail=False, methods=['get', 'post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Current price, stock and active status for many products in one query
+        GET /api/products/bulk/?ids=1,2,3 or POST {"ids": [1, 2, 3]} for large carts.
+        Inactive products are included so carts can drop them.
+        """
+        if request.method == 'POST':
+            raw_ids = request.data.get('ids', [])
+        else:
+            raw_ids = request.query_params.get('ids', '')
+        if isinstance(raw_ids, str):
+            raw_ids = raw_ids.split(',')
+
+        try:
+            ids = {int(raw_id) for raw_id in raw_ids if str(raw_id).strip()}
+            if any(not BIGINT_MIN <= product_id <= BIGINT_MAX for product_id in ids):
+                raise ValueError('product id out of range')
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'ids must be a list of product ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not ids:
+            return Response(
+                {'error': 'ids is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        products = Product.objects.filter(id__any=sorted(ids)).only(
+            'id', 'price', 'stock_quantity', 'is_active', 'is_in_stock'
+        ).order_by()
+        data = ProductAvailabilitySerializer(products, many=True).data
+
+        return Response({
+            'products': {str(item['id']): item for item in data},
+            'missing': sorted(ids - {item['id'] for item in data}),
+        })
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Product counts per category, prescription flag, manufacturer and price bucket
+        Accepts the same filter and ?search= parameters as the list endpoint and is
+        cached per parameter combination with the rest of the catalog.
+        """
+        cached = self.get_cached_response(request)
+        if cached is not None:
+            return cached
+
+        queryset, selected = self.get_facet_queryset(request)
+        return Response(compute_facets(queryset, selected))
+
+    def get_facet_queryset(self, request):
+        """
+        Products filtered like the list, except by the facet filters
+        Returns (queryset, {facet filter: requested value or None}).
+        """
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise filter_utils.translate_validation(filterset.errors)
+
+        queryset = filterset.queryset
+        selected = {}
+        for name, value in filterset.form.cleaned_data.items():
+            if name in FACET_FILTERS:
+                selected[name] = value
+            else:
+                queryset = filterset.filters[name].filter(queryset, value)
+        queryset = ProductSearchFilter().filter_queryset(request, queryset, self)
+        return queryset, selected
+
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Search-as-you-type suggestions: GET /api/products/autocomplete/?q=ibu&limit=8
+        Prefix matches on product names, manufacturers and categories come from an
+        in-process index. Only when there is no prefix match at all (and the query has
+        at least 3 characters) are fuzzy (trigram) matches looked up in the database.
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 25)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be a number'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = autocomplete_service.suggest(query, limit) if query else []
+        return Response({'query': query, 'results': results})
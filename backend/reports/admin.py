@@ -1,3 +1,13 @@
 from django.contrib import admin
+from .models import ReportJob
 
-# Register your models here.
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    """Report jobs are created through the API and updated by the run_report_jobs worker"""
+    list_display = ['id', 'report', 'format', 'status', 'requested_by', 'file_size', 'created_at', 'finished_at']
+    list_filter = ['status', 'report', 'format']
+    readonly_fields = [field.name for field in ReportJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,147 @@
+"""
+Report result cache
+
+Running a report again returns the same rows until the data behind it
+changes, so results are cached per report, normalized parameters and data
+version. The data version combines two counters:
+
+- the catalog version (products/cache.py), which moves on every product,
+  category, price or stock change, including the stock moved by orders;
+- the order data version below, bumped by order and order item writes
+  (reports/signals.py) and by rebuild_sales_rollup.
+
+Either bump makes every cached result unreachable. Both counters are kept in
+PostgreSQL, so a bump from any process (a web worker, the report worker or
+the rebuild_sales_rollup command) reaches all of them. An entry holds the
+columns and row tuples, not a rendering, so JSON, CSV, NDJSON and PDF
+downloads of the same report share it. Entries live in the 'reports' cache,
+the database cache by default, so the background report jobs
+(run_report_jobs) and the web workers share them too. Results with more than
+REPORT_CACHE_MAX_ROWS rows are not kept. Streamed exports fill the cache as
+they stream.
+
+Every result comes with metadata on where it came from: cache 'hit' or
+'miss', the data version, when it was generated and its age in seconds.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from contextlib import closing
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.cache import bump_version, get_catalog_version, get_version
+from .export import iter_batches
+from .queries import get_report
+
+
+REPORT_DATA_VERSION_KEY = 'reports:order-data-version'
+
+# Shared by every process that renders reports (see CACHES in settings.py)
+cache = caches['reports']
+
+# meta: {'cache', 'data_version', 'generated_at', 'age'}
+ReportResult = namedtuple('ReportResult', ['columns', 'rows', 'meta'])
+
+
+def get_report_data_version():
+    return f'{get_catalog_version()}.{get_version(REPORT_DATA_VERSION_KEY)}'
+
+
+def invalidate_reports():
+    """Bump the order data version once the current transaction commits"""
+    transaction.on_commit(lambda: bump_version(REPORT_DATA_VERSION_KEY))
+
+
+def get_report_cache_key(report, params, data_version):
+    raw_key = json.dumps([report, params], sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(raw_key.encode('utf-8')).hexdigest()
+    return f'reports:result:{data_version}:{digest}'
+
+
+def build_meta(state, data_version, generated_at):
+    return {
+        'cache': state,
+        'data_version': data_version,
+        'generated_at': generated_at.isoformat(),
+        'age': max(int((timezone.now() - generated_at).total_seconds()), 0),
+    }
+
+
+def store_result(key, columns, rows, generated_at):
+    if len(rows) <= settings.REPORT_CACHE_MAX_ROWS:
+        cache.set(key, {
+            'columns': columns,
+            'rows': rows,
+            'generated_at': generated_at.isoformat(),
+        }, settings.REPORT_CACHE_TIMEOUT)
+
+
+def lookup(report, params):
+    """(cache key, data version, cached entry or None)"""
+    data_version = get_report_data_version()
+    key = get_report_cache_key(report, params, data_version)
+    return key, data_version, cache.get(key)
+
+
+def fetch_report(report, params):
+    """The whole result as a ReportResult, from the cache or from the database"""
+    key, data_version, entry = lookup(report, params)
+    if entry is not None:
+        generated_at = parse_datetime(entry['generated_at'])
+        return ReportResult(entry['columns'], entry['rows'], build_meta('hit', data_version, generated_at))
+
+    generated_at = timezone.now()
+    query = get_report(report, params)
+    with connection.cursor() as cursor:
+        cursor.execute(query.sql, query.params)
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+    store_result(key, columns, rows, generated_at)
+    return ReportResult(columns, rows, build_meta('miss', data_version, generated_at))
+
+
+def iter_cached_batches(columns, rows, batch_size):
+    """Same shape as export.iter_batches(), from rows in memory"""
+    yield columns
+    for offset in range(0, len(rows), batch_size):
+        yield rows[offset:offset + batch_size]
+
+
+def iter_caching_batches(batches, key, generated_at):
+    """Pass the batches through and cache the result once it has been read completely"""
+    with closing(batches):
+        columns = next(batches)
+        yield columns
+        rows = []
+        for batch in batches:
+            yield batch
+            if rows is not None:
+                rows.extend(batch)
+                if len(rows) > settings.REPORT_CACHE_MAX_ROWS:
+                    # Too large to keep; stop collecting
+                    rows = None
+    if rows is not None:
+        store_result(key, columns, rows, generated_at)
+
+
+def get_report_batches(report, params):
+    """
+    (batches, meta) for streaming: the column names, then lists of row tuples
+    A miss streams from a server-side cursor and caches the rows on the way.
+    """
+    batch_size = settings.REPORT_EXPORT_FETCH_SIZE
+    key, data_version, entry = lookup(report, params)
+    if entry is not None:
+        generated_at = parse_datetime(entry['generated_at'])
+        batches = iter_cached_batches(entry['columns'], entry['rows'], batch_size)
+        return batches, build_meta('hit', data_version, generated_at)
+
+    generated_at = timezone.now()
+    query = get_report(report, params)
+    batches = iter_caching_batches(iter_batches(query.sql, query.params, batch_size), key, generated_at)
+    return batches, build_meta('miss', data_version, generated_at)
@@ -0,0 +1,135 @@
+"""
+Background report jobs
+
+Rendering a large PDF takes longer than a web worker should be tied up, and
+longer than proxies wait. Instead, a job is submitted (POST /api/reports/jobs/)
+and the run_report_jobs worker process renders it into REPORT_RESULTS_DIR.
+The client polls the job's status and downloads the file when it is done.
+
+Identical requests (same report, parameters and format) share one job while
+it is pending or running. submit_report_job() returns the active job, and a
+partial unique index on ReportJob.request_key settles concurrent submits.
+The worker claims jobs with SELECT ... FOR UPDATE SKIP LOCKED, so several
+workers can run side by side. Each worker renders into a temporary file and
+renames it into place. A job left running longer than REPORT_JOB_TIMEOUT
+(its worker died) is picked up again. Finished jobs and their files are
+deleted after REPORT_RESULTS_MAX_AGE_DAYS.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .cache import fetch_report, get_report_batches
+from .export import build_pdf, write_csv
+from .models import ReportJob
+from .queries import get_report
+
+
+RESULT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'pdf': 'application/pdf',
+}
+
+
+def get_request_key(report, params, format_type):
+    data = json.dumps([report, params, format_type], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def get_results_dir():
+    results_dir = Path(settings.REPORT_RESULTS_DIR)
+    results_dir.mkdir(parents=True, exist_ok=True)
+    return results_dir
+
+
+def submit_report_job(report, params, format_type, user=None):
+    """Queue a report, or join the identical job already queued or running: (job, created)"""
+    request_key = get_request_key(report, params, format_type)
+    while True:
+        job = ReportJob.objects.filter(request_key=request_key, status__in=ReportJob.ACTIVE_STATUSES).first()
+        if job is not None:
+            return job, False
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    report=report, params=params, format=format_type,
+                    request_key=request_key, requested_by=user
+                )
+            return job, True
+        except IntegrityError:
+            # A concurrent request queued the same report first; join it
+            continue
+
+
+def claim_next_job():
+    """Mark the oldest pending (or abandoned running) job as running and return it, or None"""
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.REPORT_JOB_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            ReportJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', started_at__lt=stale_before))
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.started_at = now
+        job.save(update_fields=['status', 'started_at'])
+    return job
+
+
+def render_report(job, path):
+    """Write the job's report to path in the job's format, using the report result cache"""
+    if job.format == 'csv':
+        batches, meta = get_report_batches(job.report, job.params)
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            write_csv(file, batches)
+    else:
+        # A PDF table needs all rows at once
+        result = fetch_report(job.report, job.params)
+        results = [dict(zip(result.columns, row)) for row in result.rows]
+        with open(path, 'wb') as file:
+            build_pdf(file, results, result.columns, get_report(job.report, job.params).title)
+
+
+def run_job(job):
+    """Render a claimed job into REPORT_RESULTS_DIR and record the outcome"""
+    file_name = f'{job.id}.{job.format}'
+    path = get_results_dir() / file_name
+    temp_path = path.with_name(f'{file_name}.{os.getpid()}.part')
+    try:
+        render_report(job, temp_path)
+        os.replace(temp_path, path)
+    except Exception as e:
+        temp_path.unlink(missing_ok=True)
+        job.status = 'failed'
+        job.error = str(e)
+    else:
+        job.status = 'done'
+        job.file_name = file_name
+        job.file_size = path.stat().st_size
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'file_name', 'file_size', 'finished_at'])
+    return job
+
+
+def get_result_path(job):
+    return Path(settings.REPORT_RESULTS_DIR) / job.file_name
+
+
+def purge_report_jobs(max_age_days):
+    """Delete finished jobs older than max_age_days with their files; returns the count"""
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    jobs = ReportJob.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff)
+    for file_name in jobs.exclude(file_name='').values_list('file_name', flat=True):
+        (Path(settings.REPORT_RESULTS_DIR) / file_name).unlink(missing_ok=True)
+    return jobs.delete()[0]
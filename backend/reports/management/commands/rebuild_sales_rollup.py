@@ -0,0 +1,41 @@
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from reports.cache import invalidate_reports
+from reports.rollup import get_first_order_day, iter_month_chunks, rebuild_days
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily sales rollup from live and archived orders (backfill after deploying the triggers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start', type=date.fromisoformat,
+            help='First day to rebuild, YYYY-MM-DD (default: day of the first order)'
+        )
+        parser.add_argument(
+            '--end', type=date.fromisoformat,
+            help='Last day to rebuild, YYYY-MM-DD (default: today, UTC)'
+        )
+
+    def handle(self, *args, **kwargs):
+        first_day = kwargs['start'] or get_first_order_day()
+        if first_day is None:
+            self.stdout.write(self.style.SUCCESS('No orders to roll up.'))
+            return
+        last_day = kwargs['end'] or datetime.now(dt_timezone.utc).date()
+        if last_day < first_day:
+            raise CommandError('--end must not be before --start')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilding daily sales from {first_day} to {last_day}...'))
+        started = time.perf_counter()
+
+        # One short transaction per month
+        for chunk_start, chunk_end in iter_month_chunks(first_day, last_day + timedelta(days=1)):
+            rebuild_days(chunk_start, chunk_end)
+            invalidate_reports()
+            self.stdout.write(f'… {chunk_start:%Y-%m} done')
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Rollup rebuilt!'))
+        self.stdout.write(f'Elapsed: {time.perf_counter() - started:.2f}s')
@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from reports.jobs import claim_next_job, purge_report_jobs, run_job
+
+
+# Seconds between purges of expired jobs while the worker keeps running
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Render queued report jobs (CSV/PDF) into REPORT_RESULTS_DIR; keep running as a worker process'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once the queue is empty instead of waiting for new jobs'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=settings.REPORT_JOB_POLL_INTERVAL,
+            help=f'Seconds to wait before checking an empty queue again '
+                 f'(default: {settings.REPORT_JOB_POLL_INTERVAL})'
+        )
+
+    def handle(self, *args, **kwargs):
+        self.stdout.write(self.style.SUCCESS(f'📄 Report worker started (results in {settings.REPORT_RESULTS_DIR})'))
+
+        next_purge = 0
+        try:
+            while True:
+                # Checked between jobs as well, so a queue that never empties is purged too
+                if time.monotonic() >= next_purge:
+                    self.purge()
+                    next_purge = time.monotonic() + PURGE_INTERVAL
+
+                job = claim_next_job()
+                if job is None:
+                    if kwargs['once']:
+                        break
+                    time.sleep(kwargs['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                job = run_job(job)
+                elapsed = time.perf_counter() - started
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✅ {job.id} {job.report} ({job.format}): {job.file_size} bytes in {elapsed:.2f}s'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'❌ {job.id} {job.report} ({job.format}): {job.error}'))
+        except KeyboardInterrupt:
+            self.stdout.write('\nReport worker stopped')
+
+    def purge(self):
+        purged = purge_report_jobs(settings.REPORT_RESULTS_MAX_AGE_DAYS)
+        if purged:
+            self.stdout.write(f'Purged {purged} expired jobs')
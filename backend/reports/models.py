@@ -1,3 +1,79 @@
+import uuid
+
+from django.contrib.auth.models import User
 from django.db import models
+from products.models import Product
+from .queries import REPORT_CHOICES
+
+
+class DailyProductSales(models.Model):
+    """
+    Units sold and revenue per product per day (UTC), excluding cancelled orders
+    Kept current by the sales rollup triggers in database_schema.sql; rebuild
+    any range (and backfill after deploying) with rebuild_sales_rollup.
+    Includes archived orders, which stay counted when they are archived.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='daily_sales_day_product_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.product_id}: {self.quantity} units"
+
+
+class ReportJob(models.Model):
+    """
+    A report rendered to a file by the run_report_jobs worker (reports/jobs.py)
+    At most one pending or running job exists per request_key, so identical
+    requests made while a job is queued or rendering share it.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('pdf', 'PDF'),
+    ]
+    ACTIVE_STATUSES = ('pending', 'running')
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    report = models.CharField(max_length=30, choices=REPORT_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    request_key = models.CharField(max_length=64, help_text="Hash of report, params and format")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='report_jobs')
+    
+    # Result, relative to REPORT_RESULTS_DIR
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['request_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='report_job_active_request_uniq',
+            ),
+        ]
 
-# Create your models here.
+    def __str__(self):
+        return f"{self.report} ({self.format}) - {self.status}"
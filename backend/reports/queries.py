@@ -0,0 +1,45 @@
+"""
+Report definitions
+
+Every downloadable report is a query plus a title and a file name, built
+from its name and normalized parameters by get_report(). The report views
+and the background report jobs (reports/jobs.py) share these definitions,
+so a report renders the same wherever it is requested.
+"""
+from collections import namedtuple
+from datetime import date, timedelta
+
+from .rollup import month_range, sales_by_product
+
+
+LOW_STOCK_REPORT_SQL = "SELECT * FROM generate_low_stock_report();"
+
+REPORT_CHOICES = [
+    ('low_stock', 'Low stock'),
+    ('monthly_sales', 'Monthly sales'),
+    ('sales', 'Sales'),
+]
+
+# filename has no extension; the format adds it
+ReportQuery = namedtuple('ReportQuery', ['sql', 'params', 'title', 'filename'])
+
+
+def get_report(report, params):
+    """
+    ReportQuery for a report name and its normalized parameters:
+    low_stock {}, monthly_sales {'month', 'year'}, sales {'start', 'end'} (ISO dates, end inclusive)
+    """
+    if report == 'low_stock':
+        return ReportQuery(LOW_STOCK_REPORT_SQL, [], 'Low Stock Report', 'low_stock_report')
+
+    if report == 'monthly_sales':
+        month, year = params['month'], params['year']
+        sql, sql_params = sales_by_product(*month_range(year, month))
+        return ReportQuery(sql, sql_params, f'Monthly Sales Report - {month}/{year}', f'monthly_sales_{month}_{year}')
+
+    if report == 'sales':
+        start, end = date.fromisoformat(params['start']), date.fromisoformat(params['end'])
+        sql, sql_params = sales_by_product(start, end + timedelta(days=1))
+        return ReportQuery(sql, sql_params, f'Sales Report - {start} to {end}', f'sales_{start}_{end}')
+
+    raise ValueError(f'Unknown report {report!r}')
@@ -0,0 +1,102 @@
+"""
+Daily sales rollup
+
+Sales reports read reports_dailyproductsales (DailyProductSales), one row
+per product and UTC day, instead of joining every order and order line, so
+their cost depends on the number of days in the range, not on the size of
+the order history. Statement-level triggers on orders_orderitem and
+orders_order (database_schema.sql) keep the rollup current as orders are
+placed, edited and cancelled. rebuild_days() recomputes a range from the
+live and archived orders: it backfills the table after deploying and
+repairs it after manual data fixes.
+"""
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.db import connection, transaction
+
+
+SALES_BY_PRODUCT_SQL = """
+    SELECT
+        p.id AS product_id,
+        p.name AS product_name,
+        SUM(s.quantity)::integer AS total_quantity,
+        SUM(s.revenue) AS total_revenue
+    FROM reports_dailyproductsales s
+    JOIN products_product p ON p.id = s.product_id
+    WHERE s.day >= %s AND s.day < %s
+    GROUP BY p.id, p.name
+    HAVING SUM(s.quantity) <> 0
+    ORDER BY total_revenue DESC, p.id
+"""
+
+# Rows of the range are replaced while the lock keeps triggers from adding
+# deltas in between; they queue and apply on top of the rebuilt rows
+REBUILD_DAYS_SQL = """
+    LOCK TABLE reports_dailyproductsales IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM reports_dailyproductsales WHERE day >= %(first_day)s AND day < %(end_day)s;
+
+    INSERT INTO reports_dailyproductsales (day, product_id, quantity, revenue)
+    SELECT (s.created_at AT TIME ZONE 'UTC')::date, s.product_id, SUM(s.quantity), SUM(s.subtotal)
+    FROM (
+        SELECT o.created_at, oi.product_id, oi.quantity, oi.subtotal
+        FROM orders_orderitem oi
+        JOIN orders_order o ON o.id = oi.order_id
+        WHERE o.created_at >= %(start)s AND o.created_at < %(end)s
+        AND o.status != 'cancelled'
+        UNION ALL
+        SELECT ao.created_at, ai.product_id, ai.quantity, ai.subtotal
+        FROM orders_archivedorderitem ai
+        JOIN orders_archivedorder ao ON ao.id = ai.order_id
+        WHERE ao.created_at >= %(start)s AND ao.created_at < %(end)s
+        AND ao.status != 'cancelled'
+    ) s
+    GROUP BY 1, 2;
+"""
+
+FIRST_ORDER_DAY_SQL = """
+    SELECT (MIN(created_at) AT TIME ZONE 'UTC')::date FROM (
+        SELECT MIN(created_at) AS created_at FROM orders_order
+        UNION ALL
+        SELECT MIN(created_at) FROM orders_archivedorder
+    ) firsts
+"""
+
+
+def month_range(year, month):
+    """(first day, first day of the next month)"""
+    start = date(year, month, 1)
+    end = date(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def sales_by_product(first_day, end_day):
+    """Report query for first_day <= day < end_day: (sql, params)"""
+    return SALES_BY_PRODUCT_SQL, [first_day, end_day]
+
+
+def get_first_order_day():
+    with connection.cursor() as cursor:
+        cursor.execute(FIRST_ORDER_DAY_SQL)
+        return cursor.fetchone()[0]
+
+
+def rebuild_days(first_day, end_day):
+    """Recompute the rollup for first_day <= day < end_day in one transaction"""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(REBUILD_DAYS_SQL, {
+            'first_day': first_day,
+            'end_day': end_day,
+            'start': datetime.combine(first_day, time.min, tzinfo=dt_timezone.utc),
+            'end': datetime.combine(end_day, time.min, tzinfo=dt_timezone.utc),
+        })
+
+
+def iter_month_chunks(first_day, end_day):
+    """Split [first_day, end_day) at month boundaries"""
+    while first_day < end_day:
+        next_month = month_range(first_day.year, first_day.month)[1]
+        chunk_end = min(next_month, end_day)
+        yield first_day, chunk_end
+        first_day = chunk_end
+
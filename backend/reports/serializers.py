@@ -0,0 +1,54 @@
+from rest_framework import serializers
+from django.urls import reverse
+from .models import ReportJob
+from .queries import REPORT_CHOICES
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    """
+    Body of POST /api/reports/jobs/
+    validated_data holds report, format and the normalized params used to
+    recognize identical requests
+    """
+    report = serializers.ChoiceField(choices=REPORT_CHOICES)
+    # Named like the report views' query parameter; ?format= is taken by DRF
+    report_format = serializers.ChoiceField(choices=ReportJob.FORMAT_CHOICES)
+    month = serializers.IntegerField(min_value=1, max_value=12, required=False)
+    year = serializers.IntegerField(min_value=1, max_value=9999, required=False)
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+
+    def validate(self, data):
+        report = data['report']
+        if report == 'monthly_sales':
+            if 'month' not in data or 'year' not in data:
+                raise serializers.ValidationError('month and year are required for monthly_sales')
+            params = {'month': data['month'], 'year': data['year']}
+        elif report == 'sales':
+            if 'start' not in data or 'end' not in data:
+                raise serializers.ValidationError('start and end are required for sales')
+            if data['end'] < data['start']:
+                raise serializers.ValidationError('end must not be before start')
+            params = {'start': data['start'].isoformat(), 'end': data['end'].isoformat()}
+        else:
+            params = {}
+        return {'report': report, 'format': data['report_format'], 'params': params}
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = [
+            'id', 'report', 'params', 'format', 'status', 'file_size', 'error',
+            'download_url', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != 'done':
+            return None
+        url = reverse('report-job-download', args=[obj.id])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
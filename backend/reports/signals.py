@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from orders.models import Order, OrderItem
+from .cache import invalidate_reports
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def invalidate_reports_on_order_change(sender, **kwargs):
+    """
+    Order writes change the sales figures (bulk status updates and order
+    placement also move stock, which bumps the catalog version)
+    """
+    invalidate_reports()
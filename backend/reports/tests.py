@@ -1,3 +1,194 @@
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+from .jobs import claim_next_job, run_job
+from .models import DailyProductSales, ReportJob
+
+
+SALES_CSV = (
+    'product_id,product_name,total_quantity,total_revenue\r\n'
+    '{ibuprofen},Ibuprofen,5,24.95\r\n'
+    '{bandages},Bandages,1,5.00\r\n'
+)
+
+
+class ReportTestCase(TestCase):
+    """
+    March 2024: Ibuprofen 2 + 3 units over two days, Bandages 1 unit, plus a
+    cancelled order that must not count. The test database has no rollup
+    triggers, so the rollup is built with rebuild_sales_rollup.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+        category = Category.objects.create(name='Pain Relief')
+        cls.ibuprofen = Product.objects.create(
+            name='Ibuprofen', description='Test product', category=category,
+            price=Decimal('4.99'), stock_quantity=100
+        )
+        cls.bandages = Product.objects.create(
+            name='Bandages', description='Test product', category=category,
+            price=Decimal('5.00'), stock_quantity=100
+        )
+        cls.create_order(datetime(2024, 3, 5, 10), [(cls.ibuprofen, 2, '9.98'), (cls.bandages, 1, '5.00')])
+        cls.create_order(datetime(2024, 3, 6, 23, 30), [(cls.ibuprofen, 3, '14.97')])
+        cls.create_order(datetime(2024, 3, 6, 12), [(cls.bandages, 10, '50.00')], status='cancelled')
+        cls.create_order(datetime(2024, 4, 1, 9), [(cls.bandages, 4, '20.00')])
+        call_command('rebuild_sales_rollup', start=date(2024, 3, 1), end=date(2024, 4, 30), stdout=StringIO())
+
+    @classmethod
+    def create_order(cls, created_at, items, status='delivered'):
+        order = Order.objects.create(
+            user=cls.admin, status=status, shipping_name='Test Shopper', shipping_address='1 Main St',
+            shipping_city='Springfield', shipping_state='IL', shipping_zip='62701',
+            shipping_phone='555-0100'
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=product, quantity=quantity,
+                      price=Decimal(subtotal) / quantity, subtotal=Decimal(subtotal))
+            for product, quantity, subtotal in items
+        ])
+        Order.objects.filter(pk=order.pk).update(created_at=created_at.replace(tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        results_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(results_dir.cleanup)
+        settings_override = self.settings(REPORT_RESULTS_DIR=results_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def expected_csv(self):
+        return SALES_CSV.format(ibuprofen=self.ibuprofen.pk, bandages=self.bandages.pk).encode()
+
+    def submit_job(self, report_format='csv'):
+        return self.client.post('/api/reports/jobs/', {
+            'report': 'sales', 'report_format': report_format, 'start': '2024-03-01', 'end': '2024-03-31',
+        }, format='json')
+
+
+class SalesReportTests(ReportTestCase):
+
+    def test_rollup_values(self):
+        rows = DailyProductSales.objects.filter(day__month=3).order_by('day', 'product_id')
+        self.assertEqual(
+            [(row.day, row.product_id, row.quantity, row.revenue) for row in rows],
+            [
+                (date(2024, 3, 5), self.ibuprofen.pk, 2, Decimal('9.98')),
+                (date(2024, 3, 5), self.bandages.pk, 1, Decimal('5.00')),
+                (date(2024, 3, 6), self.ibuprofen.pk, 3, Decimal('14.97')),
+            ]
+        )
+
+        response = self.client.get('/api/reports/monthly-sales/', {'month': 3, 'year': 2024})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['product_name'], row['total_quantity'], row['total_revenue']) for row in response.data['data']],
+            [('Ibuprofen', 5, Decimal('24.95')), ('Bandages', 1, Decimal('5.00'))]
+        )
+
+    def test_csv_stream(self):
+        response = self.client.get('/api/reports/sales/', {
+            'start': '2024-03-01', 'end': '2024-03-31', 'report_format': 'csv'
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(response['X-Report-Cache'], 'miss')
+        self.assertEqual(b''.join(response.streaming_content), self.expected_csv())
+
+        # The stream filled the cache; the second download is served from it
+        response = self.client.get('/api/reports/sales/', {
+            'start': '2024-03-01', 'end': '2024-03-31', 'report_format': 'csv'
+        })
+        self.assertEqual(response['X-Report-Cache'], 'hit')
+        self.assertEqual(b''.join(response.streaming_content), self.expected_csv())
+
+
+class ReportJobTests(ReportTestCase):
+
+    def run_next_job(self):
+        job = claim_next_job()
+        self.assertIsNotNone(job)
+        return run_job(job)
+
+    def download(self, job, **headers):
+        return self.client.get(f'/api/reports/jobs/{job.id}/download/', headers=headers)
+
+    def test_identical_requests_share_a_job(self):
+        first = self.submit_job()
+        self.assertEqual(first.status_code, 202)
+        self.assertTrue(first.data['created'])
+
+        second = self.submit_job()
+        self.assertFalse(second.data['created'])
+        self.assertEqual(second.data['job']['id'], first.data['job']['id'])
+
+        other_format = self.submit_job('pdf')
+        self.assertTrue(other_format.data['created'])
+        self.assertEqual(ReportJob.objects.count(), 2)
+
+        # A finished job is not joined; the report is rendered again
+        self.run_next_job()
+        self.run_next_job()
+        self.assertTrue(self.submit_job().data['created'])
+
+    def test_range_download(self):
+        self.submit_job()
+        job = self.run_next_job()
+        self.assertEqual(job.status, 'done')
+        content = self.expected_csv()
+        self.assertEqual(job.file_size, len(content))
+
+        response = self.download(job)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+        response = self.download(job, Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(content)}')
+        self.assertEqual(b''.join(response.streaming_content), content[10:20])
+
+        response = self.download(job, Range='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), content[-5:])
+
+        # A changed file (another ETag) gets the whole content again
+        response = self.download(job, Range='bytes=10-19', **{'If-Range': '"stale"'})
+        self.assertEqual(response.status_code, 200)
+
+        response = self.download(job, Range=f'bytes={len(content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(content)}')
+
+    def test_report_is_cached_after_a_job_run(self):
+        self.submit_job()
+        self.run_next_job()
+
+        response = self.client.get('/api/reports/sales/', {'start': '2024-03-01', 'end': '2024-03-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cache']['cache'], 'hit')
+        self.assertEqual(response['X-Report-Cache'], 'hit')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_worker_purges_expired_jobs(self):
+        self.submit_job()
+        job = self.run_next_job()
+        ReportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=30))
+        self.submit_job('pdf')
 
-# Create your tests here.
+        call_command('run_report_jobs', once=True, stdout=StringIO())
+        self.assertFalse(ReportJob.objects.filter(pk=job.pk).exists())
+        self.assertEqual(list(ReportJob.objects.values_list('status', flat=True)), ['done'])
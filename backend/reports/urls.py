@@ -3,10 +3,17 @@ URL configuration for reports app
 """
 
 from django.urls import path
-from .views import LowStockReportView, MonthlySalesReportView, BatchPriceUpdateView
+from .views import (
+    LowStockReportView, MonthlySalesReportView, SalesReportView, BatchPriceUpdateView,
+    ReportJobCreateView, ReportJobDetailView, ReportJobDownloadView,
+)
 
 urlpatterns = [
     path('low-stock/', LowStockReportView.as_view(), name='low-stock-report'),
     path('monthly-sales/', MonthlySalesReportView.as_view(), name='monthly-sales-report'),
+    path('sales/', SalesReportView.as_view(), name='sales-report'),
+    path('jobs/', ReportJobCreateView.as_view(), name='report-job-create'),
+    path('jobs/<uuid:job_id>/', ReportJobDetailView.as_view(), name='report-job-detail'),
+    path('jobs/<uuid:job_id>/download/', ReportJobDownloadView.as_view(), name='report-job-download'),
     path('batch-price-update/', BatchPriceUpdateView.as_view(), name='batch-price-update'),
 ]
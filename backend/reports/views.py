@@ -2,113 +2,100 @@
 Admin Reports API Views
 
 This module provides API endpoints for executing stored procedures
-and generating reports in various formats (JSON, CSV, PDF).
+and generating reports in various formats (JSON, CSV, NDJSON, PDF).
+CSV and NDJSON are streamed from a server-side cursor (reports/export.py).
+Report results are cached until stock, prices or orders change (reports/cache.py).
 """
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 from rest_framework import status
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.db import connection
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
-import csv
+from django.shortcuts import get_object_or_404
+from products.cache import invalidate_catalog
+from .cache import fetch_report, get_report_batches
+from .export import STREAMING_FORMATS, build_pdf, stream_report
+from .jobs import RESULT_CONTENT_TYPES, get_result_path, submit_report_job
+from .models import ReportJob
+from .queries import get_report
+from .serializers import ReportJobRequestSerializer, ReportJobSerializer
+from datetime import date
 import io
+import re
 
 
-class LowStockReportView(APIView):
+class ReportView(APIView):
     """
-    Execute generate_low_stock_report() stored procedure
-    Returns products with stock below threshold
+    Base for the report endpoints: renders a report (reports/queries.py) as
+    JSON, CSV, NDJSON or PDF from the report result cache (reports/cache.py)
+    Every rendering reports whether the rows came from the cache and how old
+    they are: a 'cache' object in JSON, X-Report-* headers on all formats.
     """
     permission_classes = [IsAdminUser]
     
-    def get(self, request):
-        format_type = request.query_params.get('report_format', 'json')
-        
-        try:
-            with connection.cursor() as cursor:
-                cursor.execute("SELECT * FROM generate_low_stock_report();")
-                columns = [col[0] for col in cursor.description]
-                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            
-            if format_type == 'csv':
-                return self._generate_csv(results, columns, 'low_stock_report.csv')
-            elif format_type == 'pdf':
-                return self._generate_pdf(results, columns, 'Low Stock Report', 'low_stock_report.pdf')
+    def render_report(self, report, params, format_type, **extra):
+        query = get_report(report, params)
+        if format_type in STREAMING_FORMATS:
+            batches, meta = get_report_batches(report, params)
+            response = stream_report(batches, format_type, query.filename)
+        else:
+            result = fetch_report(report, params)
+            meta = result.meta
+            results = [dict(zip(result.columns, row)) for row in result.rows]
+            if format_type == 'pdf':
+                response = self._generate_pdf(results, result.columns, query.title, f'{query.filename}.pdf')
             else:
-                return Response({
+                response = Response({
                     'success': True,
                     'data': results,
-                    'count': len(results)
+                    'count': len(results),
+                    **extra,
+                    'cache': meta
                 })
-                
-        except Exception as e:
-            return Response({
-                'success': False,
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-    
-    def _generate_csv(self, data, columns, filename):
-        """Generate CSV file from data"""
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=columns)
-        writer.writeheader()
-        writer.writerows(data)
         
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Report-Cache'] = meta['cache']
+        response['X-Report-Data-Version'] = meta['data_version']
+        response['X-Report-Generated-At'] = meta['generated_at']
+        response['X-Report-Age'] = meta['age']
         return response
     
     def _generate_pdf(self, data, columns, title, filename):
         """Generate PDF file from data"""
         buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        
-        # Title
-        styles = getSampleStyleSheet()
-        title_para = Paragraph(f"<b>{title}</b>", styles['Title'])
-        elements.append(title_para)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Table data
-        table_data = [columns]
-        for row in data:
-            table_data.append([str(row.get(col, '')) for col in columns])
-        
-        # Create table
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        elements.append(table)
-        doc.build(elements)
+        build_pdf(buffer, data, columns, title)
         
-        buffer.seek(0)
         response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
         return response
 
 
-class MonthlySalesReportView(APIView):
+class LowStockReportView(ReportView):
     """
-    Execute calculate_monthly_sales(month, year) stored procedure
-    Returns sales data for specified month
+    Execute generate_low_stock_report() stored procedure
+    Returns products with stock below threshold
+    """
+    
+    def get(self, request):
+        format_type = request.query_params.get('report_format', 'json')
+        
+        try:
+            return self.render_report('low_stock', {}, format_type)
+                
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MonthlySalesReportView(ReportView):
+    """
+    Sales per product for the specified month
+    Same columns as calculate_monthly_sales(month, year), read from the daily
+    sales rollup (reports/rollup.py); archived orders are included
     """
-    permission_classes = [IsAdminUser]
     
     def get(self, request):
         month = request.query_params.get('month')
@@ -131,30 +118,10 @@ class MonthlySalesReportView(APIView):
                     'error': 'Month must be between 1 and 12'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            with connection.cursor() as cursor:
-                cursor.execute(
-                    "SELECT * FROM calculate_monthly_sales(%s, %s);",
-                    [month, year]
-                )
-                columns = [col[0] for col in cursor.description]
-                results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            
-            if format_type == 'csv':
-                return self._generate_csv(results, columns, f'monthly_sales_{month}_{year}.csv')
-            elif format_type == 'pdf':
-                return self._generate_pdf(
-                    results, columns,
-                    f'Monthly Sales Report - {month}/{year}',
-                    f'monthly_sales_{month}_{year}.pdf'
-                )
-            else:
-                return Response({
-                    'success': True,
-                    'data': results,
-                    'count': len(results),
-                    'month': month,
-                    'year': year
-                })
+            return self.render_report(
+                'monthly_sales', {'month': month, 'year': year}, format_type,
+                month=month, year=year
+            )
                 
         except ValueError:
             return Response({
@@ -166,54 +133,175 @@ class MonthlySalesReportView(APIView):
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class SalesReportView(ReportView):
+    """
+    Sales per product between two dates (inclusive): ?start=2024-01-01&end=2024-03-31
+    Read from the daily sales rollup, so the cost grows with the number of days
+    """
     
-    def _generate_csv(self, data, columns, filename):
-        """Generate CSV file from data"""
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=columns)
-        writer.writeheader()
-        writer.writerows(data)
+    def get(self, request):
+        format_type = request.query_params.get('report_format', 'json')
         
-        response = HttpResponse(output.getvalue(), content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
+        try:
+            start = date.fromisoformat(request.query_params.get('start', ''))
+            end = date.fromisoformat(request.query_params.get('end', ''))
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'start and end dates (YYYY-MM-DD) are required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if end < start:
+            return Response({
+                'success': False,
+                'error': 'end must not be before start'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            return self.render_report(
+                'sales', {'start': start.isoformat(), 'end': end.isoformat()}, format_type,
+                start=start, end=end
+            )
+                
+        except Exception as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class ReportJobCreateView(APIView):
+    """
+    Queue a report for the run_report_jobs worker
+    An identical report already queued or rendering is returned instead of a new job
+    """
+    permission_classes = [IsAdminUser]
     
-    def _generate_pdf(self, data, columns, title, filename):
-        """Generate PDF file from data"""
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
+    def post(self, request):
+        serializer = ReportJobRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'error': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Title
-        styles = getSampleStyleSheet()
-        title_para = Paragraph(f"<b>{title}</b>", styles['Title'])
-        elements.append(title_para)
-        elements.append(Spacer(1, 0.3*inch))
+        job, created = submit_report_job(
+            serializer.validated_data['report'],
+            serializer.validated_data['params'],
+            serializer.validated_data['format'],
+            request.user
+        )
+        return Response({
+            'success': True,
+            'created': created,
+            'job': ReportJobSerializer(job, context={'request': request}).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportJobDetailView(APIView):
+    """Status of a report job; download_url is set once it is done"""
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, job_id):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        return Response({
+            'success': True,
+            'job': ReportJobSerializer(job, context={'request': request}).data
+        })
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single-range Range header, None to send the
+    whole file (no header, several ranges or bad syntax); raises ValueError
+    when the range lies outside the file
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('Range not satisfiable')
+    return start, end
+
+
+def iter_file_range(file, start, length, chunk_size=64 * 1024):
+    with file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+class ReportJobDownloadView(APIView):
+    """
+    The finished report file
+    Honors single byte ranges (Range, If-Range), so interrupted downloads can resume
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request, job_id):
+        job = get_object_or_404(ReportJob, pk=job_id)
+        if job.status != 'done':
+            return Response({
+                'success': False,
+                'error': job.error or f'Report is {job.status}',
+                'status': job.status
+            }, status=status.HTTP_409_CONFLICT)
         
-        # Table data
-        table_data = [columns]
-        for row in data:
-            table_data.append([str(row.get(col, '')) for col in columns])
+        path = get_result_path(job)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return Response({
+                'success': False,
+                'error': 'Report file has expired; submit the report again'
+            }, status=status.HTTP_410_GONE)
         
-        # Create table
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        size = job.file_size
+        filename = f'{get_report(job.report, job.params).filename}.{job.format}'
+        content_type = RESULT_CONTENT_TYPES[job.format]
+        # A job's file never changes, so its id identifies the content
+        etag = f'"{job.id}"'
         
-        elements.append(table)
-        doc.build(elements)
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                file.close()
+                response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
         
-        buffer.seek(0)
-        response = HttpResponse(buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if byte_range is None:
+            response = FileResponse(file, as_attachment=True, filename=filename, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(file, start, end - start + 1),
+                status=status.HTTP_206_PARTIAL_CONTENT, content_type=content_type
+            )
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
         return response
 
 
@@ -245,6 +333,9 @@ class BatchPriceUpdateView(APIView):
                 )
                 updated_count = cursor.fetchone()[0]
             
+            # Prices changed behind the ORM's back, so no save signal fired
+            invalidate_catalog()
+            
             return Response({
                 'success': True,
                 'updated_count': updated_count,
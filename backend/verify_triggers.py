@@ -27,7 +27,8 @@ def check_triggers_exist():
             SELECT trigger_name, event_object_table, action_timing, event_manipulation
             FROM information_schema.triggers
             WHERE trigger_schema = 'public'
-            AND trigger_name IN ('trigger_update_inventory', 'trigger_restore_inventory', 'trigger_log_price_change')
+            AND trigger_name IN ('trigger_update_inventory', 'trigger_restore_inventory', 'trigger_log_price_change',
+                                 'trigger_update_product_search_vector')
             ORDER BY trigger_name;
         """)
         
@@ -29,7 +29,10 @@ api.interceptors.request.use((config) => {
 export const productsAPI = {
     getAll: (params) => api.get('/products/', { params }),
     getById: (id) => api.get(`/products/${id}/`),
+    // Current price/stock for many products in one request (POST keeps large carts out of the URL)
+    getBulk: (ids) => api.post('/products/bulk/', { ids }),
     getCategories: () => api.get('/categories/'),
+    autocomplete: (q, limit = 8) => api.get('/products/autocomplete/', { params: { q, limit } }),
 };
 
 // Categories API
@@ -41,7 +44,10 @@ export const categoriesAPI = {
 export const ordersAPI = {
     create: (orderData) => api.post('/orders/', orderData),
     getById: (id) => api.get(`/orders/${id}/`),
-    getUserOrders: () => api.get('/orders/'), // Fixed path from /orders/my-orders/
+    // Summary rows only (totals and item counts); load items with getById
+    getUserOrders: () => api.get('/orders/', { params: { mode: 'summary' } }),
+    // Cached order history of the signed-in user; pass the `next` URL to load more
+    getHistory: (nextUrl) => api.get(nextUrl || '/orders/history/'),
 };
 
 // Auth API (if implementing authentication)
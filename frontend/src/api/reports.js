@@ -51,6 +51,66 @@ export const reportsAPI = {
         return response;
     },
 
+    /**
+     * Queue a report for the background report worker
+     * Identical requests still queued or rendering share one job.
+     * @param {string} report - 'low_stock', 'monthly_sales' or 'sales'
+     * @param {string} format - 'csv' or 'pdf'
+     * @param {Object} params - { month, year } or { start, end }
+     */
+    submitJob: async (report, format, params = {}) => {
+        const response = await axios.post(`${API_URL}/api/reports/jobs/`, {
+            report,
+            report_format: format,
+            ...params
+        }, {
+            headers: getAuthHeaders()
+        });
+        return response;
+    },
+
+    /**
+     * Get the status of a report job
+     * @param {string} jobId - Job ID
+     */
+    getJob: async (jobId) => {
+        const response = await axios.get(`${API_URL}/api/reports/jobs/${jobId}/`, {
+            headers: getAuthHeaders()
+        });
+        return response;
+    },
+
+    /**
+     * Download the file of a finished report job
+     * @param {string} jobId - Job ID
+     */
+    downloadJob: async (jobId) => {
+        const response = await axios.get(`${API_URL}/api/reports/jobs/${jobId}/download/`, {
+            headers: getAuthHeaders(),
+            responseType: 'blob'
+        });
+        return response;
+    },
+
+    /**
+     * Queue a report, wait for the worker to render it and download the file
+     * @param {string} report - 'low_stock', 'monthly_sales' or 'sales'
+     * @param {string} format - 'csv' or 'pdf'
+     * @param {Object} params - { month, year } or { start, end }
+     * @param {number} pollInterval - Milliseconds between status checks
+     */
+    runJob: async (report, format, params = {}, pollInterval = 2000) => {
+        let job = (await reportsAPI.submitJob(report, format, params)).data.job;
+        while (job.status === 'pending' || job.status === 'running') {
+            await new Promise((resolve) => setTimeout(resolve, pollInterval));
+            job = (await reportsAPI.getJob(job.id)).data.job;
+        }
+        if (job.status !== 'done') {
+            throw new Error(job.error || 'Report generation failed');
+        }
+        return reportsAPI.downloadJob(job.id);
+    },
+
     /**
      * Execute batch price update
      * @param {number} categoryId - Category ID
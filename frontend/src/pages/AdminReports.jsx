@@ -5,14 +5,31 @@ import { downloadBlob } from '../utils/downloadUtils';
 import Toast from '../components/Toast';
 import './AdminReports.css';
 
+/**
+ * Where a report result came from: the server's report cache or a fresh run
+ * @param {Object} cache - { cache: 'hit' | 'miss', generated_at, age }
+ */
+function ReportFreshness({ cache }) {
+    const generatedAt = new Date(cache.generated_at).toLocaleTimeString();
+    return (
+        <p className="report-freshness">
+            {cache.cache === 'hit'
+                ? `Cached result from ${generatedAt} (${cache.age}s old, data unchanged since)`
+                : `Fresh result generated at ${generatedAt}`}
+        </p>
+    );
+}
+
 function AdminReports() {
     // Low Stock Report State
     const [lowStockData, setLowStockData] = useState([]);
     const [lowStockLoading, setLowStockLoading] = useState(false);
+    const [lowStockCache, setLowStockCache] = useState(null);
 
     // Monthly Sales Report State
     const [salesData, setSalesData] = useState([]);
     const [salesLoading, setSalesLoading] = useState(false);
+    const [salesCache, setSalesCache] = useState(null);
     const [salesMonth, setSalesMonth] = useState(new Date().getMonth() + 1);
     const [salesYear, setSalesYear] = useState(new Date().getFullYear());
 
@@ -46,6 +63,7 @@ function AdminReports() {
             const response = await reportsAPI.getLowStockReport('json');
             if (response.data.success) {
                 setLowStockData(response.data.data);
+                setLowStockCache(response.data.cache);
                 setToast({
                     message: `Found ${response.data.count} low stock products`,
                     type: 'success'
@@ -68,12 +86,15 @@ function AdminReports() {
 
     const handleDownloadLowStock = async (format) => {
         try {
-            const response = await reportsAPI.getLowStockReport(format);
             const filename = `low_stock_report.${format}`;
 
             if (format === 'pdf') {
+                // Rendered by the background report worker
+                setToast({ message: 'Generating PDF...', type: 'info' });
+                const response = await reportsAPI.runJob('low_stock', 'pdf');
                 downloadBlob(response.data, filename);
             } else {
+                const response = await reportsAPI.getLowStockReport(format);
                 downloadBlob(new Blob([response.data], { type: 'text/csv' }), filename);
             }
 
@@ -96,6 +117,7 @@ function AdminReports() {
             const response = await reportsAPI.getMonthlySales(salesMonth, salesYear, 'json');
             if (response.data.success) {
                 setSalesData(response.data.data);
+                setSalesCache(response.data.cache);
                 setToast({
                     message: `Found ${response.data.count} products with sales`,
                     type: 'success'
@@ -118,12 +140,18 @@ function AdminReports() {
 
     const handleDownloadMonthlySales = async (format) => {
         try {
-            const response = await reportsAPI.getMonthlySales(salesMonth, salesYear, format);
             const filename = `monthly_sales_${salesMonth}_${salesYear}.${format}`;
 
             if (format === 'pdf') {
+                // Rendered by the background report worker
+                setToast({ message: 'Generating PDF...', type: 'info' });
+                const response = await reportsAPI.runJob('monthly_sales', 'pdf', {
+                    month: salesMonth,
+                    year: salesYear
+                });
                 downloadBlob(response.data, filename);
             } else {
+                const response = await reportsAPI.getMonthlySales(salesMonth, salesYear, format);
                 downloadBlob(new Blob([response.data], { type: 'text/csv' }), filename);
             }
 
@@ -231,6 +259,8 @@ function AdminReports() {
                     </button>
                 </div>
 
+                {lowStockCache && <ReportFreshness cache={lowStockCache} />}
+
                 {lowStockData.length > 0 && (
                     <div className="report-table-container">
                         <table className="report-table">
@@ -316,6 +346,8 @@ function AdminReports() {
                     </button>
                 </div>
 
+                {salesCache && <ReportFreshness cache={salesCache} />}
+
                 {salesData.length > 0 && (
                     <div className="report-table-container">
                         <table className="report-table">
@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { getCart, removeFromCart, updateCartQuantity, getCartTotal } from '../utils/cartUtils';
+import { getCart, removeFromCart, updateCartQuantity, getCartTotal, revalidateCart } from '../utils/cartUtils';
 import Toast from '../components/Toast';
 import './Cart.css';
 
@@ -10,6 +10,10 @@ function Cart() {
 
     useEffect(() => {
         loadCart();
+        // Pick up price and stock changes made since the items were added
+        revalidateCart()
+            .then(setCartItems)
+            .catch((err) => console.error('Error revalidating cart:', err));
     }, []);
 
     const loadCart = () => {
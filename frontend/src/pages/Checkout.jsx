@@ -22,6 +22,31 @@ const CARD_ELEMENT_OPTIONS = {
     },
 };
 
+// Checkouts of the same cart (reloads and other tabs included) reuse one key, so the
+// server hands back the same PaymentIntent and stock hold instead of taking a new one.
+// Once that quote has expired the order could no longer be placed with it, so a new
+// key is used to get a fresh quote.
+const PAYMENT_KEY_STORAGE = 'paymentIdempotency';
+
+const getPaymentIdempotencyKey = (cartItems) => {
+    const cart = JSON.stringify(cartItems);
+    const saved = JSON.parse(localStorage.getItem(PAYMENT_KEY_STORAGE) || 'null');
+    const quoteExpired = saved?.quoteExpiresAt && Date.parse(saved.quoteExpiresAt) <= Date.now();
+    if (saved && saved.cart === cart && !quoteExpired) {
+        return saved.key;
+    }
+    const key = crypto.randomUUID();
+    localStorage.setItem(PAYMENT_KEY_STORAGE, JSON.stringify({ cart, key }));
+    return key;
+};
+
+const savePaymentQuoteExpiry = (quoteExpiresAt) => {
+    const saved = JSON.parse(localStorage.getItem(PAYMENT_KEY_STORAGE) || 'null');
+    if (saved) {
+        localStorage.setItem(PAYMENT_KEY_STORAGE, JSON.stringify({ ...saved, quoteExpiresAt }));
+    }
+};
+
 function CheckoutForm() {
     const navigate = useNavigate();
     const stripe = useStripe();
@@ -31,6 +56,7 @@ function CheckoutForm() {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState('');
     const [clientSecret, setClientSecret] = useState('');
+    const [quoteToken, setQuoteToken] = useState('');
 
     const [shippingInfo, setShippingInfo] = useState({
         name: '',
@@ -61,17 +87,27 @@ function CheckoutForm() {
     }, []);
 
     const createPaymentIntent = async (cartItems) => {
+        const items = cartItems.map(item => ({
+            product_id: item.id,
+            quantity: item.quantity,
+        }));
+        const token = localStorage.getItem('token');
         try {
             const response = await axios.post('http://localhost:8000/api/create-payment-intent/', {
-                cart_items: cartItems.map(item => ({
-                    product_id: item.id,
-                    quantity: item.quantity,
-                    price: item.price,
-                })),
-                shipping_cost: 5.00,
+                cart_items: items,
+            }, {
+                headers: {
+                    'Idempotency-Key': getPaymentIdempotencyKey(items),
+                    ...(token ? { Authorization: `Token ${token}` } : {}),
+                },
+                // The session cookie ties an anonymous shopper's stock hold to them
+                withCredentials: true,
             });
 
             setClientSecret(response.data.client_secret);
+            // Server-side prices, reused when the order is created
+            setQuoteToken(response.data.quote_token);
+            savePaymentQuoteExpiry(response.data.quote_expires_at);
             setPricing({
                 subtotal: response.data.subtotal,
                 tax: response.data.tax,
@@ -79,7 +115,8 @@ function CheckoutForm() {
                 total: response.data.total,
             });
         } catch (err) {
-            setError('Failed to initialize payment. Please try again.');
+            // e.g. a product that is out of stock, or more units than one checkout may hold
+            setError(err.response?.data?.error || 'Failed to initialize payment. Please try again.');
             console.error(err);
         }
     };
@@ -141,23 +178,19 @@ function CheckoutForm() {
                         shipping_zip: shippingInfo.zip,
                         shipping_phone: shippingInfo.phone,
                         payment_intent_id: paymentIntent.id,
-                        subtotal: pricing.subtotal.toFixed(2),
-                        tax: pricing.tax.toFixed(2),
-                        shipping_cost: pricing.shipping.toFixed(2),
-                        total: pricing.total.toFixed(2),
-                        items: cart.map(item => ({
-                            product: item.id,
-                            quantity: item.quantity,
-                            price: typeof item.price === 'number' ? item.price.toFixed(2) : item.price,
-                        })),
+                        quote_token: quoteToken,
                     };
 
                     console.log('Sending order data:', orderData);
-                    const response = await axios.post('http://localhost:8000/api/orders/', orderData);
+                    // One order per payment, however often this request is retried
+                    const response = await axios.post('http://localhost:8000/api/orders/', orderData, {
+                        headers: { 'Idempotency-Key': `order-${paymentIntent.id}` },
+                    });
                     console.log('Order created successfully:', response.data);
 
                     // Clear cart and trigger update
                     localStorage.removeItem('cart');
+                    localStorage.removeItem(PAYMENT_KEY_STORAGE);
                     window.dispatchEvent(new Event('cartUpdated'));
 
                     // Redirect to success page
@@ -6,6 +6,8 @@ function Orders() {
     const [orders, setOrders] = useState([]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState('');
+    const [nextUrl, setNextUrl] = useState(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     useEffect(() => {
         fetchOrders();
@@ -13,24 +15,29 @@ function Orders() {
 
     const fetchOrders = async () => {
         try {
-            const response = await ordersAPI.getUserOrders();
-            console.log('Orders API response:', response.data);
-
-            // Handle both array response and paginated response
-            const ordersData = Array.isArray(response.data)
-                ? response.data
-                : response.data.results || [];
-
-            setOrders(ordersData);
+            const response = await ordersAPI.getHistory();
+            setOrders(response.data.results);
+            setNextUrl(response.data.next);
             setLoading(false);
         } catch (err) {
             console.error('Error fetching orders:', err);
-            // ... keep existing error handling
             setError('Failed to load orders');
             setLoading(false);
         }
     };
 
+    const loadMoreOrders = async () => {
+        setLoadingMore(true);
+        try {
+            const response = await ordersAPI.getHistory(nextUrl);
+            setOrders((current) => [...current, ...response.data.results]);
+            setNextUrl(response.data.next);
+        } catch (err) {
+            console.error('Error fetching more orders:', err);
+        }
+        setLoadingMore(false);
+    };
+
     const formatDate = (dateString) => {
         const date = new Date(dateString);
         return date.toLocaleDateString('en-US', {
@@ -60,9 +67,24 @@ function Orders() {
     };
 
     const [expandedOrder, setExpandedOrder] = useState(null);
+    const [orderDetails, setOrderDetails] = useState({});
 
-    const toggleOrder = (orderId) => {
-        setExpandedOrder(expandedOrder === orderId ? null : orderId);
+    const toggleOrder = async (orderId) => {
+        if (expandedOrder === orderId) {
+            setExpandedOrder(null);
+            return;
+        }
+        setExpandedOrder(orderId);
+
+        // The history only has summaries; fetch items, shipping and pricing once per order
+        if (!orderDetails[orderId]) {
+            try {
+                const response = await ordersAPI.getById(orderId);
+                setOrderDetails((details) => ({ ...details, [orderId]: response.data }));
+            } catch (err) {
+                console.error('Error fetching order details:', err);
+            }
+        }
     };
 
     if (loading) {
@@ -97,7 +119,9 @@ function Orders() {
                 </div>
             ) : (
                 <div className="orders-list">
-                    {orders.map((order) => (
+                    {orders.map((order) => {
+                        const details = orderDetails[order.id];
+                        return (
                         <div key={order.id} className="order-card">
                             <div className="order-header" onClick={() => toggleOrder(order.id)}>
                                 <div className="order-summary-row">
@@ -124,15 +148,21 @@ function Orders() {
                                     <div className="details-grid">
                                         <div className="shipping-info">
                                             <h4>Shipping Address</h4>
-                                            <p>{order.shipping_name}</p>
-                                            <p>{order.shipping_address}</p>
-                                            <p>{order.shipping_city}, {order.shipping_state} {order.shipping_zip}</p>
-                                            <p>Phone: {order.shipping_phone}</p>
+                                            {details ? (
+                                                <>
+                                                    <p>{details.shipping_name}</p>
+                                                    <p>{details.shipping_address}</p>
+                                                    <p>{details.shipping_city}, {details.shipping_state} {details.shipping_zip}</p>
+                                                    <p>Phone: {details.shipping_phone}</p>
+                                                </>
+                                            ) : (
+                                                <p>Loading...</p>
+                                            )}
                                         </div>
 
                                         <div className="order-items">
-                                            <h4>Items ({order.items?.length || 0})</h4>
-                                            {order.items?.map((item, index) => (
+                                            <h4>Items ({order.item_count})</h4>
+                                            {details?.items.map((item, index) => (
                                                 <div key={index} className="order-item">
                                                     <div className="item-info">
                                                         <span className="item-name">{item.product_name}</span>
@@ -143,36 +173,44 @@ function Orders() {
                                             ))}
                                         </div>
 
-                                        <div className="order-pricing">
-                                            <h4>Order Summary</h4>
-                                            <div className="summary-row">
-                                                <span>Subtotal:</span>
-                                                <span>${parseFloat(order.subtotal).toFixed(2)}</span>
-                                            </div>
-                                            <div className="summary-row">
-                                                <span>Tax:</span>
-                                                <span>${parseFloat(order.tax).toFixed(2)}</span>
-                                            </div>
-                                            <div className="summary-row">
-                                                <span>Shipping:</span>
-                                                <span>${parseFloat(order.shipping_cost).toFixed(2)}</span>
-                                            </div>
-                                            <div className="summary-row total">
-                                                <span>Total:</span>
-                                                <span>${parseFloat(order.total).toFixed(2)}</span>
+                                        {details && (
+                                            <div className="order-pricing">
+                                                <h4>Order Summary</h4>
+                                                <div className="summary-row">
+                                                    <span>Subtotal:</span>
+                                                    <span>${parseFloat(details.subtotal).toFixed(2)}</span>
+                                                </div>
+                                                <div className="summary-row">
+                                                    <span>Tax:</span>
+                                                    <span>${parseFloat(details.tax).toFixed(2)}</span>
+                                                </div>
+                                                <div className="summary-row">
+                                                    <span>Shipping:</span>
+                                                    <span>${parseFloat(details.shipping_cost).toFixed(2)}</span>
+                                                </div>
+                                                <div className="summary-row total">
+                                                    <span>Total:</span>
+                                                    <span>${parseFloat(details.total).toFixed(2)}</span>
+                                                </div>
                                             </div>
-                                        </div>
+                                        )}
                                     </div>
 
-                                    {order.payment_intent_id && (
+                                    {details?.payment_intent_id && (
                                         <div className="payment-info">
-                                            <small>Payment ID: {order.payment_intent_id}</small>
+                                            <small>Payment ID: {details.payment_intent_id}</small>
                                         </div>
                                     )}
                                 </div>
                             )}
                         </div>
-                    ))}
+                        );
+                    })}
+                    {nextUrl && (
+                        <button className="btn-shop" onClick={loadMoreOrders} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more orders'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>
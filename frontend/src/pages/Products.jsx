@@ -17,6 +17,7 @@ function Products() {
     const [sortBy, setSortBy] = useState('none');
     const [showFilters, setShowFilters] = useState(false);
     const [toast, setToast] = useState(null);
+    const [suggestions, setSuggestions] = useState([]);
 
     useEffect(() => {
         fetchData();
@@ -26,6 +27,21 @@ function Products() {
         filterAndSortProducts();
     }, [searchQuery, selectedCategory, sortBy, products]);
 
+    useEffect(() => {
+        if (!searchQuery.trim()) {
+            setSuggestions([]);
+            return;
+        }
+
+        // Typeahead suggestions come from the lightweight autocomplete endpoint
+        const timer = setTimeout(() => {
+            productsAPI.autocomplete(searchQuery)
+                .then((res) => setSuggestions(res.data.results))
+                .catch(() => setSuggestions([]));
+        }, 150);
+        return () => clearTimeout(timer);
+    }, [searchQuery]);
+
     const fetchData = async () => {
         try {
             setLoading(true);
@@ -48,12 +64,11 @@ function Products() {
     const filterAndSortProducts = () => {
         let filtered = [...products];
 
-        // Filter by search query
+        // Filter by search query (list rows carry no description; see ProductListSerializer)
         if (searchQuery.trim()) {
             const query = searchQuery.toLowerCase();
             filtered = filtered.filter(product =>
                 product.name.toLowerCase().includes(query) ||
-                product.description?.toLowerCase().includes(query) ||
                 product.manufacturer?.toLowerCase().includes(query)
             );
         }
@@ -219,7 +234,13 @@ function Products() {
                         value={searchQuery}
                         onChange={handleSearchChange}
                         className="search-input"
+                        list="product-suggestions"
                     />
+                    <datalist id="product-suggestions">
+                        {suggestions.map((suggestion) => (
+                            <option key={`${suggestion.type}-${suggestion.id ?? suggestion.label}`} value={suggestion.label} />
+                        ))}
+                    </datalist>
                     {searchQuery ? (
                         <button className="search-icon clear-search" onClick={clearSearch}>
                             ✕
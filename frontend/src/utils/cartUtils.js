@@ -1,4 +1,5 @@
 // Cart utility functions for localStorage management
+import { productsAPI } from '../api/client';
 
 export const getCart = () => {
     const cart = localStorage.getItem('cart');
@@ -83,6 +84,36 @@ export const updateCartQuantity = (productId, quantity) => {
     return cart;
 };
 
+// Refresh stored prices and stock levels with a single bulk lookup.
+// Products that no longer exist or are inactive are dropped, and quantities
+// are capped at the current stock.
+export const revalidateCart = async () => {
+    const cart = getCart();
+    if (cart.length === 0) {
+        return cart;
+    }
+
+    const response = await productsAPI.getBulk(cart.map(item => item.id));
+    const products = response.data.products;
+
+    const updatedCart = cart
+        .filter(item => products[item.id]?.is_active && products[item.id].stock_quantity > 0)
+        .map(item => {
+            const product = products[item.id];
+            return {
+                ...item,
+                price: product.price,
+                stock_quantity: product.stock_quantity,
+                quantity: Math.min(item.quantity, product.stock_quantity),
+            };
+        });
+
+    localStorage.setItem('cart', JSON.stringify(updatedCart));
+    window.dispatchEvent(new Event('cartUpdated'));
+
+    return updatedCart;
+};
+
 export const clearCart = () => {
     localStorage.removeItem('cart');
     window.dispatchEvent(new Event('cartUpdated'));